@@ -0,0 +1,46 @@
+"""
+Per-task dispatch overhead: a wide layer of no-op tasks, run once through the
+thread pool and once on the inline fast path.
+
+    python benchmarks/dispatch_overhead.py [N_TASKS]
+"""
+import logging
+import sys
+import time
+
+from novapipe.runner import PipelineRunner
+from novapipe.tasks import task
+
+
+@task(executor="thread")
+def noop_thread(params):
+    return None
+
+
+@task(trivial=True)
+def noop_inline(params):
+    return None
+
+
+def bench(task_name: str, n: int) -> float:
+    data = {"tasks": [{"name": f"t{i}", "task": task_name} for i in range(n)]}
+    runner = PipelineRunner(data, pipeline_name="bench")
+    start = time.perf_counter()
+    runner.run()
+    return (time.perf_counter() - start) / n
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    logging.getLogger("novapipe").setLevel(logging.WARNING)
+
+    thread_cost = bench("noop_thread", n)
+    inline_cost = bench("noop_inline", n)
+    print(f"tasks:            {n}")
+    print(f"thread pool:      {thread_cost * 1e6:8.1f} µs/task")
+    print(f"inline fast path: {inline_cost * 1e6:8.1f} µs/task")
+    print(f"speed-up:         {thread_cost / inline_cost:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Cost of recording one task outcome (status counter + duration histogram):
+labels() lookups on every call vs children bound once by TaskInstruments.
+
+    python benchmarks/metrics_overhead.py [N_RECORDS]
+"""
+import sys
+import time
+
+from novapipe.metrics import TASK_DURATION, TASK_STATUS, TaskInstruments
+
+
+def per_call(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    def unbound():
+        TASK_STATUS.labels(pipeline="bench", task="t", status="success").inc()
+        TASK_DURATION.labels(pipeline="bench", task="t", status="success").observe(0.01)
+
+    instruments = TaskInstruments("bench", "t")
+
+    def bound():
+        instruments.record("success", 0.01)
+
+    unbound_cost = per_call(unbound, n)
+    bound_cost = per_call(bound, n)
+    print(f"records:        {n}")
+    print(f"labels() calls: {unbound_cost * 1e6:6.2f} µs/task")
+    print(f"pre-bound:      {bound_cost * 1e6:6.2f} µs/task")
+    print(f"speed-up:       {unbound_cost / bound_cost:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
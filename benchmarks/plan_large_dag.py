@@ -0,0 +1,46 @@
+"""
+Planning cost for very large DAGs: interning + CSR build + layering.
+Each task depends on up to three random earlier tasks.
+
+    python benchmarks/plan_large_dag.py [N_TASKS]
+"""
+import random
+import sys
+import time
+import tracemalloc
+
+from novapipe.graph import TaskGraph
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(42)
+    names = [f"task_{i}" for i in range(n)]
+    deps = [
+        [names[rng.randrange(i)] for _ in range(rng.randint(0, 3))] if i else []
+        for i in range(n)
+    ]
+
+    start = time.perf_counter()
+    graph = TaskGraph(names, deps)
+    built = time.perf_counter()
+    layers = graph.layers()
+    done = time.perf_counter()
+
+    # Memory is measured on a second build, since tracing slows it down a lot
+    del graph
+    tracemalloc.start()
+    graph = TaskGraph(names, deps)
+    index_size = sys.getsizeof(graph.index)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"tasks:   {n}   edges: {graph.edge_count}   layers: {len(layers)}")
+    print(f"build:   {built - start:6.2f} s")
+    print(f"layers:  {done - built:6.2f} s")
+    print(f"memory:  {(peak - index_size) / n:6.0f} bytes/task peak, plus "
+          f"{index_size / n:.0f} bytes/task for the name index")
+
+
+if __name__ == "__main__":
+    main()
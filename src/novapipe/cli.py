@@ -4,29 +4,20 @@ import shutil
 import time
 import re
 import textwrap
+from itertools import islice
 
 import click
-import jinja2
-import yaml
 from pathlib import Path
 import inspect as _inspect
-import asyncio
 import logging
-from http.server import HTTPServer, BaseHTTPRequestHandler
-import threading
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
-from .runner import PipelineRunner, PIPELINE_STATUS, PIPELINE_DURATION
-from .tasks import task_registry, load_plugins
-from .tasks import set_plugin_pins
+# Heavy modules (runner, plan, prometheus_client, jinja2, ...) are imported
+# inside the commands that need them, so `novapipe --help`, `report`, etc.
+# start quickly. tests/test_cli_startup.py guards this.
+from .tasks import task_registry, load_plugins, plugin_index, plugin_origin
+from .tasks import set_plugin_pins, get_task_spec
 from .logging_conf import configure_logging
-from typing import List, Dict, Any
-# try:
-#     # Python 3.8+
-#     from importlib.metadata import distributions
-# except ImportError:
-#     # back-port for older versions
-from importlib_metadata import distributions
+from typing import List, Dict, Any, Optional
 
 
 @click.group()
@@ -79,7 +70,15 @@ tasks:
     "summary_path",
     type=click.Path(dir_okay=False, writable=True),
     default=None,
-    help="Path to write task summary JSON after run"
+    help="Path to write task summary JSON after run (also when it fails)"
+)
+@click.option(
+    "--journal",
+    "journal_path",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Append NDJSON events (task start, attempts, finish, skip) to this file "
+         "as the run progresses; `novapipe report` reads it too.",
 )
 @click.option(
     "--metrics-port",
@@ -94,6 +93,28 @@ tasks:
     show_default=True,
     help="HTTP path under which to expose metrics.",
 )
+@click.option(
+    "--metrics-textfile",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Also write metrics to this file (for node_exporter's textfile collector) "
+         "during the run and once more at the end.",
+)
+@click.option(
+    "--metrics-interval",
+    type=float,
+    default=5.0,
+    show_default=True,
+    help="Seconds between --metrics-textfile rewrites during the run.",
+)
+@click.option(
+    "--metrics-linger",
+    type=float,
+    default=15.0,
+    show_default=True,
+    help="After the run, keep serving --metrics-port until the final values have "
+         "been scraped once, for at most this many seconds (0: exit at once).",
+)
 @click.option(
     "--ignore-failures",
     is_flag=True,
@@ -107,11 +128,129 @@ tasks:
     multiple=True,
     help="Pin a plugin distribution to a version, e.g. novapipe-foo==0.2.1"
 )
-def run(pipeline_file: str, vars: list, summary_path: str, metrics_port: int, metrics_path: str,
-        plugin_versions: Any, ignore_failures: bool) -> None:
+@click.option(
+    "--reduce-graph",
+    is_flag=True,
+    default=False,
+    help="Schedule on the transitive reduction of the DAG (drops redundant depends_on edges).",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Don't read or write the compiled plan cache.",
+)
+@click.option(
+    "--rate-limit-backend",
+    "rate_limit_backend",
+    metavar="SPEC",
+    default="local",
+    envvar="NOVAPIPE_RATE_LIMIT_BACKEND",
+    show_default=True,
+    help="Where rate-limit state lives: local (this run), memory (this process), "
+         "file[:DIR] (all processes on this host) or tcp://HOST:PORT (a ratelimit-server).",
+)
+@click.option(
+    "--trace",
+    "trace_path",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write a trace of each task's phases (rendering, rate-limit and queue "
+         "waits, executor queueing, body) to this file.",
+)
+@click.option(
+    "--trace-format",
+    type=click.Choice(["chrome", "otlp"]),
+    default="chrome",
+    show_default=True,
+    help="chrome: trace-event JSON for Perfetto / chrome://tracing; otlp: OpenTelemetry OTLP/JSON.",
+)
+@click.option(
+    "--profile",
+    "profile_glob",
+    is_flag=False,
+    flag_value="*",
+    default=None,
+    metavar="[GLOB]",
+    help="Profile tasks whose name or function matches GLOB (all tasks if omitted).",
+)
+@click.option(
+    "--profile-dir",
+    type=click.Path(file_okay=False, writable=True),
+    default="novapipe-profiles",
+    show_default=True,
+    help="Where --profile writes .pstats files and hotspots.txt.",
+)
+@click.option(
+    "--profile-top",
+    type=int,
+    default=20,
+    show_default=True,
+    help="Functions listed per task function in hotspots.txt.",
+)
+@click.option(
+    "--profiler",
+    type=click.Choice(["cprofile", "pyinstrument"]),
+    default="cprofile",
+    show_default=True,
+    help="cprofile (deterministic, built in) or pyinstrument (sampling, if installed).",
+)
+@click.option(
+    "--trace-malloc",
+    is_flag=True,
+    default=False,
+    help="Record each task's peak Python allocations (alloc_peak_bytes) with "
+         "tracemalloc; slows allocation-heavy tasks down.",
+)
+@click.option(
+    "--history/--no-history",
+    "use_history",
+    default=None,
+    help="Record the run in the history database (see `novapipe history`), and "
+         "start the historically slowest tasks of each layer first [default: off, "
+         "unless --history-db or --history-timeouts is given].",
+)
+@click.option(
+    "--history-db",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="History database [default: $NOVAPIPE_HISTORY_DB, else history.sqlite3 "
+         "in NovaPipe's data directory].",
+)
+@click.option(
+    "--history-timeouts",
+    "history_timeout_factor",
+    type=click.FloatRange(min=1.0),
+    default=None,
+    metavar="FACTOR",
+    help="Give tasks without a timeout FACTOR times their p95 duration in recent runs.",
+)
+def run(pipeline_file: str, vars: list, summary_path: str, journal_path: str,
+        use_history: Optional[bool], history_db: str, history_timeout_factor: float,
+        metrics_port: int, metrics_path: str,
+        metrics_textfile: str, metrics_interval: float, metrics_linger: float,
+        trace_path: str, trace_format: str, profile_glob: str, profile_dir: str,
+        profile_top: int, profiler: str, trace_malloc: bool,
+        plugin_versions: Any, ignore_failures: bool, reduce_graph: bool, no_cache: bool,
+        rate_limit_backend: str) -> None:
     """Run a pipeline YAML file."""
-    with open(pipeline_file) as f:
-        data = yaml.safe_load(f)
+    from .plan import load_plan
+    from .ratelimit import make_backend
+    from .runner import PipelineRunner
+    from .metrics import MetricsExporter, PIPELINE_STATUS, PIPELINE_DURATION
+    from .tracing import Tracer
+    from .profiling import TaskProfiler
+    from .journal import EventJournal
+    from .history import pipeline_key
+    import sqlite3
+
+    try:
+        limiter_backend = make_backend(rate_limit_backend)
+    except ValueError as e:
+        click.echo(f"❌ {e}", err=True)
+        raise SystemExit(1)
+
+    plan = load_plan(pipeline_file, use_cache=not no_cache)
 
     # Parse and set plugin-version pins before loading
     pins: Dict[str, str] = {}
@@ -126,7 +265,30 @@ def run(pipeline_file: str, vars: list, summary_path: str, metrics_port: int, me
 
     # Derive a pipeline name from the file, e.g. 'pipeline.yaml' -> 'pipeline'
     pipeline_name = os.path.splitext(os.path.basename(pipeline_file))[0]
-    runner = PipelineRunner(data, pipeline_name=pipeline_name)
+    tracer = Tracer(pipeline_name) if trace_path else None
+    task_profiler = None
+    if profile_glob is not None:
+        try:
+            task_profiler = TaskProfiler(profile_glob, profile_dir, profiler, profile_top)
+        except RuntimeError as e:
+            click.echo(f"❌ {e}", err=True)
+            raise SystemExit(1)
+    journal = EventJournal(journal_path) if journal_path else None
+    if use_history is None:
+        use_history = bool(history_db or history_timeout_factor)
+    history = _open_history(history_db) if use_history else None
+    hints = None
+    if history is not None:
+        try:
+            hints = history.duration_hints(pipeline_key(pipeline_file))
+        except sqlite3.Error as e:
+            click.echo(f"⚠️  Could not read run history from {history.path}: {e!r}", err=True)
+    runner = PipelineRunner(plan, pipeline_name=pipeline_name, rate_limit_backend=limiter_backend,
+                            tracer=tracer, profiler=task_profiler, trace_malloc=trace_malloc,
+                            journal=journal, history=hints,
+                            history_timeout_factor=history_timeout_factor)
+    if reduce_graph:
+        runner.reduce_graph()
 
     # If global ignore-failures is set, override each task_model.ignore_failure
     if ignore_failures:
@@ -143,53 +305,31 @@ def run(pipeline_file: str, vars: list, summary_path: str, metrics_port: int, me
         key, val = var_pair.split("=", 1)
         runner.context[key] = val
 
+    # Serve / write metrics from background threads while the run goes on
+    exporter = None
+    if metrics_port is not None or metrics_textfile:
+        exporter = MetricsExporter(
+            port=metrics_port, path=metrics_path, textfile=metrics_textfile,
+            interval=metrics_interval, linger=metrics_linger,
+        )
+        exporter.start()
+        if metrics_port is not None:
+            click.echo(f"📊 Metrics available at http://localhost:{exporter.port}{metrics_path}")
+
     start = time.time()
+    status = "failed"
     try:
-        # Start metrics server if requested, on the configured path
-        if metrics_port:
-            class _MetricsHandler(BaseHTTPRequestHandler):
-                def do_GET(self):
-                    if self.path == metrics_path:
-                        self.send_response(200)
-                        self.send_header("Content-Type", CONTENT_TYPE_LATEST)
-                        self.end_headers()
-                        self.wfile.write(generate_latest())
-                    else:
-                        self.send_response(404)
-
-            httpd = HTTPServer(("0.0.0.0", metrics_port), _MetricsHandler)
-            thread = threading.Thread(target=httpd.serve_forever, daemon=True)
-            thread.start()
-            click.echo(f"📊 Metrics available at http://localhost:{metrics_port}{metrics_path}")
-
         # Measure overall pipeline duration & status
         start = time.time()
-        summary = runner.run()  # now returns PipelineRunSummary, with seeded context used in templates
+        runner.run()  # seeded context is used in templates
         dur = time.time() - start
+        status = "success"
 
         # Record pipeline-level metrics
         PIPELINE_STATUS.labels(pipeline=pipeline_name, status="success").inc()
         PIPELINE_DURATION.labels(pipeline=pipeline_name).observe(dur)
 
         click.echo("✅ Pipeline completed (check logs for details).")
-
-        # If we're serving metrics, keep the process alive until Ctrl+C
-        if metrics_port:
-            click.echo("🔒 Metrics server still running. Press Ctrl+C to stop.")
-            try:
-                while True:
-                    time.sleep(1)
-            except KeyboardInterrupt:
-                click.echo("\n👋 Shutting down metrics server and exiting.")
-
-        if summary_path:
-            # Write JSON summary to disk
-            import json
-
-            out = {"tasks": summary.to_list()}
-            with open(summary_path, "w") as jf:
-                json.dump(out, jf, indent=2)
-            click.echo(f"📝 Summary written to {summary_path}")
     except Exception as e:
         # Record pipeline failure metric
         dur = time.time() - start
@@ -198,39 +338,129 @@ def run(pipeline_file: str, vars: list, summary_path: str, metrics_port: int, me
 
         click.echo(f"❌ Pipeline failed: {e}", err=True)
         raise SystemExit(1)
+    finally:
+        if summary_path:
+            # Write JSON summary to disk (on failure: the tasks that got that far)
+            with open(summary_path, "w") as jf:
+                json.dump({"tasks": runner.summary.to_list()}, jf, indent=2)
+            click.echo(f"📝 Summary written to {summary_path}")
+        if journal is not None:
+            journal.close()
+        if history is not None:
+            try:
+                history.record_run(pipeline_key(pipeline_file), start, time.time() - start, status,
+                                   runner.summary.to_list())
+            except sqlite3.Error as e:
+                click.echo(f"⚠️  Could not record the run in {history.path}: {e!r}", err=True)
+            history.close()
+        if tracer is not None:
+            tracer.write(trace_path, trace_format)
+            click.echo(f"🔎 Trace written to {trace_path}")
+        if task_profiler is not None:
+            if not task_profiler.records:
+                click.echo(f"🔬 No task matched --profile {profile_glob!r}")
+            else:
+                report = task_profiler.write_report()
+                click.echo(f"🔬 {len(task_profiler.records)} profile(s) written to {profile_dir}"
+                           + (f"; hotspots in {report}" if report else ""))
+        if exporter is not None:
+            _finish_metrics(exporter)
+        if limiter_backend is not None:
+            limiter_backend.close()
+
+
+def _open_history(path: Optional[str]):
+    """
+    The history database, or None (with a warning) if it can't be opened.
+    """
+    import sqlite3
+    from .history import HistoryStore
 
+    try:
+        return HistoryStore(path)
+    except (OSError, sqlite3.Error) as e:
+        click.echo(f"⚠️  Run history disabled: could not open "
+                   f"{path or 'the history database'}: {e!r}", err=True)
+        return None
 
-@cli.command("report")
-@click.argument(
-    "summary_json",
-    type=click.Path(exists=True, dir_okay=False),
-)
-def report(summary_json):
+
+def _finish_metrics(exporter) -> None:
     """
-    Read a summary JSON (as written by --summary-json) and print a table:
-        name    status  attempts    duration(s)     error
+    Flush the final metric values, wait (bounded) for a last scrape, then stop.
+    """
+    if exporter.port is not None and exporter.linger:
+        click.echo(f"📊 Waiting up to {exporter.linger:g}s for a final metrics scrape "
+                   f"(Ctrl+C to skip)...")
+    try:
+        if not exporter.finish():
+            click.echo("📊 No final scrape arrived; exiting.")
+    except KeyboardInterrupt:
+        click.echo("\n👋 Shutting down metrics server and exiting.")
+    finally:
+        exporter.close()
+
+
+@cli.command("ratelimit-server")
+@click.option("--host", default="127.0.0.1", show_default=True, help="Interface to listen on.")
+@click.option("--port", default=7070, show_default=True, type=int, help="TCP port to listen on.")
+def ratelimit_server(host: str, port: int) -> None:
+    """
+    Serve shared rate limits to runs on other hosts
+    (`novapipe run --rate-limit-backend tcp://HOST:PORT`).
     """
-    # Load the JSON
-    with open(summary_json) as f:
-        data = json.load(f)
+    from .ratelimit import RateLimitServer
+
+    with RateLimitServer(host, port) as server:
+        click.echo(f"🚦 Rate-limit server listening on {host}:{server.server_address[1]}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            click.echo("\n👋 Shutting down rate-limit server.")
+
+
+@cli.command("compile")
+@click.argument("pipeline_file", type=click.Path(exists=True, dir_okay=False))
+def compile_(pipeline_file):
+    """
+    Validate a pipeline and cache its compiled plan (models, DAG and templates),
+    so later `run` and `dag` calls on the unchanged file skip parsing.
+    """
+    from .plan import compile_plan
+
+    try:
+        path = compile_plan(pipeline_file)
+    except Exception as e:
+        click.echo(f"❌ Failed to compile {pipeline_file}: {e}", err=True)
+        raise SystemExit(1)
+    click.echo(f"✅ Compiled plan cached at {path}")
 
-    tasks: List[Dict[str, Any]] = data.get("tasks", [])
-    if not tasks:
-        click.echo("No tasks found in summary.", err=True)
-        return
 
-    # Prepare rows
-    headers = ["Name", "Status", "Attempts", "Duration(s)", "Error"]
-    rows = []
-    for t in tasks:
-        rows.append([
-            t.get("name", ""),
-            t.get("status", ""),
-            str(t.get("attempts", "")),
-            f"{t.get('duration_secs', 0):.3f}",
-            t.get("error") or "",
-        ])
+def _format_bytes(n: int) -> str:
+    if abs(n) < 1024:
+        return f"{n}B"
+    size = float(n)
+    for unit in ("KiB", "MiB"):
+        size /= 1024
+        if abs(size) < 1024:
+            return f"{size:.1f}{unit}"
+    return f"{size / 1024:.1f}GiB"
 
+
+# (header, summary key, formatter) of the optional resource columns of `report`
+_USAGE_COLUMNS = [
+    ("CPU user(s)", "cpu_user_secs", lambda v: f"{v:.3f}"),
+    ("CPU sys(s)", "cpu_system_secs", lambda v: f"{v:.3f}"),
+    ("RSS peak +", "max_rss_delta_bytes", _format_bytes),
+    ("Alloc peak", "alloc_peak_bytes", _format_bytes),
+    ("Read", "read_bytes", _format_bytes),
+    ("Written", "write_bytes", _format_bytes),
+]
+
+# Tasks per table printed by `report` when it streams the summary
+_REPORT_CHUNK = 1000
+
+
+def _echo_table(headers: List[str], rows: List[List[str]]) -> None:
     # Try using tabulate if available
     try:
         from tabulate import tabulate
@@ -254,10 +484,325 @@ def report(summary_json):
             click.echo(line)
 
 
+def _format_stat(value, fmt: str) -> str:
+    return "" if value is None else format(value, fmt)
+
+
+@cli.command("report")
+@click.argument(
+    "summary_json",
+    type=click.Path(exists=True, dir_okay=False),
+)
+@click.option(
+    "--group-by",
+    type=click.Choice(["task", "status", "resource_tag"]),
+    default=None,
+    help="One row per task function, status or resource_tag, with counts and "
+         "p50/p95/p99/max of duration and attempts.",
+)
+@click.option(
+    "--sort",
+    type=click.Choice(["name", "status", "duration", "attempts", "count"]),
+    default=None,
+    help="Order rows by this (duration and attempts: highest first; for groups, by p95). "
+         "count needs --group-by.",
+)
+@click.option(
+    "--top",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Only the first N rows (by --sort; slowest first if --sort isn't given).",
+)
+@click.option(
+    "--critical-path",
+    is_flag=True,
+    default=False,
+    help="Analyse the run's timeline instead: its critical path, time lost to layer "
+         "barriers and waits, achieved vs. possible parallelism, and the tasks whose "
+         "speed-up would shorten the run most (--top of them, default 5).",
+)
+def report(summary_json, group_by, sort, top, critical_path):
+    """
+    Read a summary JSON (as written by --summary-json) or an event journal
+    (--journal, also while the run is in progress) and print a table:
+        name    status  attempts    duration(s)     error
+    plus CPU user/system seconds, peak RSS growth, peak allocations and
+    bytes read/written per task, where the summary has them.
+
+    The file is read one task at a time, and without --sort the table is
+    printed in blocks of 1000 tasks as they are read (resource columns are
+    chosen from the first block); --group-by and --top keep memory and
+    output small for runs with very many tasks.
+
+    --critical-path rebuilds the run's timeline from the tasks' start and
+    finish times and dependencies (this holds every task in memory).
+    """
+    from .journal import iter_events, replay
+    from .reporting import aggregate, is_journal, iter_summary_tasks, select_groups, select_tasks
+
+    if sort == "count" and not group_by:
+        raise click.UsageError("--sort count needs --group-by")
+    if critical_path and (group_by or sort):
+        raise click.UsageError("--critical-path can't be combined with --group-by or --sort")
+
+    if is_journal(summary_json):
+        records, ended = replay(iter_events(summary_json))
+        if not ended:
+            running = sum(t["status"] == "running" for t in records)
+            click.echo(f"Run in progress or interrupted: {running} task(s) running.\n")
+    else:
+        records = iter_summary_tasks(summary_json)
+
+    if critical_path:
+        _report_critical_path(summary_json, records, top or 5)
+        return
+
+    totals = {"tasks": 0, "hedges": 0, "hedge_wins": 0}
+
+    def unreadable(e: ValueError):
+        click.echo(f"❌ Could not read {summary_json}: {e}", err=True)
+        raise SystemExit(1)
+
+    def tally(records):
+        for t in records:
+            totals["tasks"] += 1
+            totals["hedges"] += t.get("hedges", 0)
+            totals["hedge_wins"] += t.get("hedge_wins", 0)
+            yield t
+
+    try:
+        if group_by:
+            all_groups = aggregate(tally(records), group_by)
+            groups = select_groups(all_groups, sort, top)
+        else:
+            tasks = iter(select_tasks(tally(records), sort, top))
+            chunk: List[Dict[str, Any]] = list(islice(tasks, _REPORT_CHUNK))
+    except ValueError as e:
+        unreadable(e)
+    if not totals["tasks"]:
+        click.echo("No tasks found in summary.", err=True)
+        return
+
+    if group_by:
+        headers = [group_by, "Count", "Success", "Failed", "Skipped",
+                   "p50(s)", "p95(s)", "p99(s)", "max(s)",
+                   "Attempts p50", "p95", "p99", "max"]
+        rows = []
+        for g in groups:
+            stats = g.stats()
+            rows.append([
+                g.key, str(g.count), str(g.success), str(g.failed), str(g.skipped),
+                *(_format_stat(stats[f"duration_{p}"], ".3f") for p in ("p50", "p95", "p99", "max")),
+                *(_format_stat(stats[f"attempts_{p}"], "d") for p in ("p50", "p95", "p99", "max")),
+            ])
+        _echo_table(headers, rows)
+        shown = len(rows)
+    else:
+        # Resource columns appear only if some task has a value for them
+        # (inline tasks and older summaries have none)
+        usage_columns = [
+            (header, key, fmt) for header, key, fmt in _USAGE_COLUMNS
+            if any(t.get(key) is not None for t in chunk)
+        ]
+        headers = ["Name", "Status", "Attempts", "Duration(s)"]
+        headers += [header for header, _, _ in usage_columns] + ["Error"]
+
+        # One table per chunk, so only a chunk of rows is held at a time
+        shown = 0
+        while chunk:
+            if shown:
+                click.echo()
+            _echo_table(headers, [
+                [
+                    t.get("name", ""),
+                    t.get("status", ""),
+                    str(t.get("attempts", "")),
+                    "" if t.get("duration_secs", 0) is None else f"{t.get('duration_secs', 0):.3f}",
+                    *("" if t.get(key) is None else fmt(t[key]) for _, key, fmt in usage_columns),
+                    t.get("error") or "",
+                ]
+                for t in chunk
+            ])
+            shown += len(chunk)
+            try:
+                chunk = list(islice(tasks, _REPORT_CHUNK))
+            except ValueError as e:
+                unreadable(e)
+
+    if top is not None:
+        of = f"{len(all_groups)} groups" if group_by else f"{totals['tasks']} tasks"
+        click.echo(f"\n(top {shown} of {of})")
+    if totals["hedges"]:
+        click.echo(f"\nHedged attempts: {totals['hedges']} ({totals['hedge_wins']} finished first)")
+
+
+def _report_critical_path(path: str, records, top: int) -> None:
+    from .reporting import Timeline
+
+    try:
+        timeline = Timeline(records)
+    except ValueError as e:
+        click.echo(f"❌ Could not analyse {path}: {e}", err=True)
+        raise SystemExit(1)
+
+    click.echo(f"Run time {timeline.makespan:.3f}s; {timeline.work:.3f}s of task time "
+               f"in {len(timeline.tasks)} tasks.")
+    click.echo(f"Parallelism: {timeline.achieved_parallelism:.2f}x achieved, "
+               f"{timeline.theoretical_parallelism:.2f}x possible "
+               f"(dependency-limited run time {timeline.ideal_makespan:.3f}s).")
+    click.echo(f"Waiting (summed over tasks): {timeline.barrier_wait:.3f}s on layer barriers, "
+               f"{timeline.queue_wait:.3f}s on rate limits and resources.")
+
+    running = sum(s.duration for s in timeline.critical_path)
+    click.echo(f"\nCritical path: {len(timeline.critical_path)} tasks, running for {running:.3f}s "
+               f"of the {timeline.makespan:.3f}s")
+    _echo_table(
+        ["Task", "Start(s)", "Barrier wait(s)", "Queued(s)", "Duration(s)", "Blocked by"],
+        [[s.name, f"{s.offset:.3f}", f"{s.barrier_wait:.3f}", f"{s.queue_wait:.3f}",
+          f"{s.duration:.3f}", f"{s.blocked_by} ({s.via})" if s.blocked_by else ""]
+         for s in timeline.critical_path],
+    )
+
+    candidates = timeline.speedups(top)
+    if not candidates:
+        return
+    click.echo("\nSpeed-up candidates (the slowest task of each layer):")
+    _echo_table(
+        ["Task", "Layer", "Duration(s)", "Saved if 2x faster(s)", "Saved if instant(s)"],
+        [[c["name"], str(c["layer"]), f"{c['duration']:.3f}", f"{c['saved_if_2x']:.3f}",
+          f"{c['saved_if_instant']:.3f}"] for c in candidates],
+    )
+
+
+@cli.group("history")
+@click.option(
+    "--db",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="History database [default: $NOVAPIPE_HISTORY_DB, else history.sqlite3 "
+         "in NovaPipe's data directory].",
+)
+@click.option("--pipeline", "pipeline_file", default=None, metavar="PIPELINE_FILE",
+              help="Only runs of this pipeline file (default: all).")
+@click.pass_context
+def history(ctx, db, pipeline_file):
+    """
+    Query the per-task metrics recorded by past `novapipe run --history`s.
+    Runs are recorded per pipeline file (by its absolute path).
+    """
+    from .history import pipeline_key
+
+    ctx.obj = {"db": db, "pipeline": pipeline_key(pipeline_file) if pipeline_file else None}
+
+
+def _history_store(ctx):
+    from .history import HistoryStore, history_path
+
+    path = ctx.obj["db"] or history_path()
+    if not Path(path).exists():
+        click.echo(f"No run history at {path}.", err=True)
+        raise SystemExit(1)
+    return HistoryStore(path)
+
+
+def _history_window(text: str) -> float:
+    from .history import parse_window
+
+    try:
+        return parse_window(text)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+def _timestamp(t: Optional[float]) -> str:
+    return "" if t is None else time.strftime("%Y-%m-%d %H:%M", time.localtime(t))
+
+
+@history.command("runs")
+@click.option("--limit", type=click.IntRange(min=1), default=20, show_default=True)
+@click.pass_context
+def history_runs(ctx, limit):
+    """List the most recent runs."""
+    with _history_store(ctx) as store:
+        runs = store.runs(ctx.obj["pipeline"], limit)
+    rows = [[str(r["id"]), r["pipeline"], _timestamp(r["started"]), _format_stat(r["duration_secs"], ".3f"),
+             r["status"], str(r["tasks"]), str(r["failed"] or 0)] for r in runs]
+    _echo_table(["Run", "Pipeline", "Started", "Duration(s)", "Status", "Tasks", "Failed"], rows)
+
+
+@history.command("trend")
+@click.argument("task_name")
+@click.option("--since", default="30d", show_default=True, help="How far back, e.g. 12h, 7d, 2w.")
+@click.option("--bucket", default="1d", show_default=True, help="Period per row, e.g. 1h, 1d, 1w.")
+@click.pass_context
+def history_trend(ctx, task_name, since, bucket):
+    """Duration percentiles and failures of TASK_NAME per period."""
+    since_secs, bucket_secs = _history_window(since), _history_window(bucket)
+    with _history_store(ctx) as store:
+        periods = store.trend(task_name, ctx.obj["pipeline"], time.time() - since_secs, bucket_secs)
+    if not periods:
+        click.echo(f"No runs of {task_name!r} in the last {since}.", err=True)
+        return
+    rows = [[_timestamp(p["start"]), str(p["runs"]), str(p["failures"]),
+             *(_format_stat(p[k], ".3f") for k in ("p50", "p95", "max"))] for p in periods]
+    _echo_table(["Period", "Runs", "Failures", "p50(s)", "p95(s)", "max(s)"], rows)
+
+
+@history.command("failures")
+@click.option("--since", default="7d", show_default=True, help="How far back, e.g. 12h, 7d, 2w.")
+@click.option("--min-runs", type=click.IntRange(min=1), default=1, show_default=True,
+              help="Leave out tasks that ran fewer times.")
+@click.option("--top", type=click.IntRange(min=1), default=20, show_default=True)
+@click.pass_context
+def history_failures(ctx, since, min_runs, top):
+    """Tasks by failure rate, highest first."""
+    since_secs = _history_window(since)
+    with _history_store(ctx) as store:
+        rates = store.failure_rates(ctx.obj["pipeline"], time.time() - since_secs, min_runs)[:top]
+    rows = [[r["task"], str(r["runs"]), str(r["failures"]), f"{r['rate']:.1%}",
+             f"{r['mean_attempts']:.2f}"] for r in rates]
+    _echo_table(["Task", "Runs", "Failures", "Failure rate", "Mean attempts"], rows)
+
+
+@history.command("regressions")
+@click.option("--window", default="7d", show_default=True, help="Recent period to check.")
+@click.option("--baseline", default="28d", show_default=True,
+              help="Period before --window to compare with.")
+@click.option("--threshold", type=click.FloatRange(min=1.0), default=1.25, show_default=True,
+              help="Report tasks whose median got at least this many times slower.")
+@click.option("--min-samples", type=click.IntRange(min=1), default=3, show_default=True,
+              help="Successful runs needed in each period.")
+@click.pass_context
+def history_regressions(ctx, window, baseline, threshold, min_samples):
+    """Tasks that got slower than in the baseline window before."""
+    window_secs, baseline_secs = _history_window(window), _history_window(baseline)
+    with _history_store(ctx) as store:
+        found = store.regressions(ctx.obj["pipeline"], window_secs, baseline_secs,
+                                  threshold, min_samples)
+    if not found:
+        click.echo(f"No task got {threshold:g}x slower in the last {window}.")
+        return
+    rows = [[r["task"], f"{r['baseline_median']:.3f}", f"{r['recent_median']:.3f}",
+             f"{r['ratio']:.2f}x", f"{r['baseline_runs']}/{r['recent_runs']}"] for r in found]
+    _echo_table(["Task", "Baseline p50(s)", "Recent p50(s)", "Change", "Runs (base/recent)"], rows)
+
+
+@history.command("prune")
+@click.option("--older-than", default="90d", show_default=True, help="Delete runs older than this.")
+@click.pass_context
+def history_prune(ctx, older_than):
+    """Delete old runs."""
+    before = time.time() - _history_window(older_than)
+    with _history_store(ctx) as store:
+        deleted = store.prune(before)
+    click.echo(f"🧹 Deleted {deleted} run(s) older than {older_than}.")
+
+
 @cli.command()
 def inspect() -> None:
     """List all registered tasks."""
     load_plugins()
+    task_registry.load_all()
     click.echo("Registered tasks:")
     for name, func in sorted(task_registry.items()):
         sig = _inspect.signature(func)
@@ -276,24 +821,11 @@ def describe(task_name: str):
         click.echo(f"❌ Task {task_name!r} not found.", err=True)
         raise SystemExit(1)
 
-    # ---- Gather plugin metadata ----
+    # ---- Plugin metadata (from the plugin index; nothing else is imported) ----
     plugin_info = {}
-    for dist in distributions():
-        for ep in dist.entry_points:
-            if ep.group == "novapipe.plugins":
-                module_name = ep.value
-                # Load the plugin module and scan for tasks
-                try:
-                    mod = __import__(module_name, fromlist=["*"])
-                except ImportError:
-                    continue
-                for fname, fobj in vars(mod).items():
-                    if callable(fobj) and getattr(fobj, "__wrapped__", None):
-                        # decorated with @task
-                        plugin_info[fname] = {
-                            "distribution": dist.metadata.get("Name", dist.name),
-                            "version": dist.version,
-                        }
+    origin = plugin_origin(task_name)
+    if origin is not None:
+        plugin_info[task_name] = {"distribution": origin[0], "version": origin[1]}
 
     # Signature
     sig = _inspect.signature(func)
@@ -312,6 +844,19 @@ def describe(task_name: str):
     except ImportError:
         click.echo(doc)
 
+    # Parameter schema declared via @task(schema=...)
+    schema = get_task_spec(func).schema
+    if schema is not None:
+        click.echo()
+        click.echo("Parameters:")
+        for fname, field in schema.model_fields.items():
+            ann = field.annotation
+            type_name = ann.__name__ if isinstance(ann, type) else str(ann).replace("typing.", "")
+            if field.is_required():
+                click.echo(f" • {fname}: {type_name} (required)")
+            else:
+                click.echo(f" • {fname}: {type_name} = {field.default!r}")
+
     # If this is a plugin task, show where it came from
     info = plugin_info.get(task_name)
     if info:
@@ -519,28 +1064,19 @@ def plugin_list(dists, tasks_filter, sources):
     """
     List all installed NovaPipe plugins (distribution, version, module, tasks).
     """
-    load_plugins()
-    # Gather plugins by distribution
+    # Gather plugins by distribution, from the cached entry-point index
     plugins = {}
-    for dist in distributions():
-        name = dist.metadata.get("Name", dist.name)
-        version = dist.version
-        for ep in dist.entry_points:
-            if ep.group == "novapipe.plugins":
-                # ep.name is the entry-point alias (i.e. the task name)
-                task_name = ep.name
-                module = ep.value
-
-                # Apply filters immediately
-                if dists and name not in dists:
-                    continue
-                if tasks_filter and not any(f in task_name for f in tasks_filter):
-                    continue
-                if sources and not any(s in module for s in sources):
-                    continue
-
-                key = f"{name} (v{version})"
-                plugins.setdefault(key, []).append((task_name, module))
+    for task_name, name, version, module in plugin_index():
+        # Apply filters immediately
+        if dists and name not in dists:
+            continue
+        if tasks_filter and not any(f in task_name for f in tasks_filter):
+            continue
+        if sources and not any(s in module for s in sources):
+            continue
+
+        key = f"{name} (v{version})"
+        plugins.setdefault(key, []).append((task_name, module))
 
     if not plugins:
         click.echo("No matching NovaPipe plugins installed.")
@@ -562,18 +1098,50 @@ def plugin_list(dists, tasks_filter, sources):
     default=False,
     help="Output Graphviz DOT instead of ASCII.",
 )
-def dag(pipeline_file, export_dot):
+@click.option(
+    "--full",
+    is_flag=True,
+    default=False,
+    help="Show every declared dependency instead of the transitive reduction.",
+)
+@click.option(
+    "--show-redundant",
+    is_flag=True,
+    default=False,
+    help="List depends_on entries already implied by other dependencies.",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Don't read or write the compiled plan cache.",
+)
+def dag(pipeline_file, export_dot, full, show_redundant, no_cache):
     """
     Show task-dependency graph for a pipeline.
-    By default, prints an ASCII view. Use --dot to emit Graphviz DOT.
+    By default, prints an ASCII view of the transitively reduced graph
+    (edges implied by longer paths are dropped). Use --dot to emit Graphviz DOT.
     """
-    import yaml
+    from .plan import load_plan
+    from .runner import PipelineRunner
 
-    with open(pipeline_file) as f:
-        data = yaml.safe_load(f)
+    plan = load_plan(pipeline_file, use_cache=not no_cache)
 
     # Initialize runner (validates & builds graph)
-    runner = PipelineRunner(data)
+    runner = PipelineRunner(plan)
+
+    if show_redundant:
+        redundant = runner.reduce_graph()
+        if not redundant:
+            click.echo("No redundant dependencies.")
+        else:
+            click.echo("Redundant dependencies (safe to remove from depends_on):")
+            for dep, dependent in redundant:
+                click.echo(f" • {dependent}: {dep}")
+        return
+
+    if not full:
+        runner.reduce_graph()
 
     if export_dot:
         dot_text = runner.to_dot()
@@ -707,11 +1275,9 @@ def playground(vars, template):
     Otherwise enters a REPL: type templates, ENTER to render, or 'exit' or quit.
     """
     # Build the Jinja2 env like NovaPipe uses
-    env = jinja2.Environment(
-        undefined=jinja2.StrictUndefined,
-        autoescape=False,
-    )
-    env.globals.update({'int': int, 'float': float, 'str': str, 'bool': bool, 'len': len})
+    from .templating import make_environment
+
+    env = make_environment()
 
     # Seed context
     context = {}
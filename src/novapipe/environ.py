@@ -0,0 +1,74 @@
+import inspect
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, Optional
+
+# Variables set for the task running in the current context
+_overlay: ContextVar[Optional[Dict[str, str]]] = ContextVar("novapipe_env_overlay", default=None)
+
+
+def current_env() -> Dict[str, str]:
+    """
+    The current task's variables (empty outside a task).
+    """
+    return dict(_overlay.get() or {})
+
+
+def task_environ() -> Dict[str, str]:
+    """
+    The environment the current task should see: the process environment with
+    the task's `env:` applied. Pass it on to child processes, e.g.
+    subprocess.run(cmd, env=task_environ()). Outside a task it's a copy of
+    os.environ.
+    """
+    env = dict(os.environ)
+    env.update(_overlay.get() or {})
+    return env
+
+
+def takes_env(func: Callable) -> bool:
+    """
+    True if a task function accepts an `env` argument, which the runner fills
+    with task_environ().
+    """
+    try:
+        return "env" in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+@contextmanager
+def task_env(env: Dict[str, str]) -> Iterator[None]:
+    """
+    Make env the current task's variables for the current context only (the
+    calling asyncio task, or a copy_context() made from it). os.environ is left
+    alone, so tasks running concurrently never see each other's variables.
+    """
+    token = _overlay.set(dict(env))
+    try:
+        yield
+    finally:
+        _overlay.reset(token)
+
+
+@contextmanager
+def process_env(env: Optional[Dict[str, str]]) -> Iterator[None]:
+    """
+    Apply env to the real process environment and restore it on exit, so child
+    processes and C libraries see the variables too. Only for one task at a
+    time: in a process-pool worker, or under the runner's environ lock.
+    """
+    if not env:
+        yield
+        return
+    old = {k: os.environ.get(k) for k in env}
+    try:
+        os.environ.update(env)
+        yield
+    finally:
+        for k, v in old.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
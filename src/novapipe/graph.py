@@ -0,0 +1,170 @@
+import gc
+from array import array
+from itertools import accumulate, chain, repeat
+from typing import Dict, List, Sequence, Set, Tuple
+
+
+class CycleError(RuntimeError):
+    """
+    Raised when task dependencies form a cycle. `cycle` holds the task names
+    along the loop, with the first name repeated at the end.
+    """
+    def __init__(self, cycle: List[str]):
+        self.cycle = cycle
+        super().__init__(
+            "Cycle detected in task dependencies: " + " -> ".join(cycle)
+        )
+
+
+class TaskGraph:
+    """
+    Compact DAG over integer task ids, built in O(N + E):
+      - names: id -> task name; index: task name -> id
+      - succ_offsets / succ_targets: CSR successors; the tasks depending on
+        task i are succ_targets[succ_offsets[i]:succ_offsets[i + 1]]
+      - pred_offsets / pred_targets: CSR predecessors (the dependencies of i)
+      - indegree: number of dependencies of each task
+    Apart from the name index, each task costs a handful of machine words.
+    """
+    def __init__(self, names: Sequence[str], deps: Sequence[Sequence[str]]):
+        n = len(names)
+        self.names: List[str] = list(names)
+        self.index: Dict[str, int] = dict(zip(self.names, range(n)))
+        if len(self.index) != n:
+            raise ValueError("Duplicate task 'name' detected in pipeline.")
+
+        # Building allocates ~N short-lived lists; pause the cyclic GC meanwhile
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self._build(deps)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    def _build(self, deps: Sequence[Sequence[str]]) -> None:
+        n = len(self.names)
+
+        # Predecessors come straight from depends_on, in declaration order
+        try:
+            pred_targets = array("q", map(self.index.__getitem__, chain.from_iterable(deps)))
+        except KeyError as e:
+            owner = next(i for i, d in enumerate(deps) if e.args[0] in d)
+            raise ValueError(
+                f"Task '{self.names[owner]}' depends on unknown task name '{e.args[0]}'"
+            ) from None
+        indegree = array("q", map(len, deps))
+        pred_offsets = array("q", accumulate(indegree, initial=0))
+
+        # Successors: bucket each edge under its dependency, then flatten
+        dependents = chain.from_iterable(map(repeat, range(n), indegree))
+        succ: List[List[int]] = [[] for _ in range(n)]
+        for j, i in zip(pred_targets, dependents):
+            succ[j].append(i)
+
+        self.pred_offsets = pred_offsets
+        self.pred_targets = pred_targets
+        self.succ_offsets = array("q", accumulate(map(len, succ), initial=0))
+        self.succ_targets = array("q", chain.from_iterable(succ))
+        self.indegree = indegree
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.pred_targets)
+
+    def predecessors(self, i: int) -> array:
+        return self.pred_targets[self.pred_offsets[i]:self.pred_offsets[i + 1]]
+
+    def successors(self, i: int) -> array:
+        return self.succ_targets[self.succ_offsets[i]:self.succ_offsets[i + 1]]
+
+    def layers(self) -> List[List[int]]:
+        """
+        Kahn's algorithm, one frontier at a time: each layer holds the tasks whose
+        dependencies all sit in earlier layers. O(N + E); raises CycleError with
+        the offending loop if some tasks can never become ready.
+        """
+        indegree = array("q", self.indegree)
+        offsets, targets = self.succ_offsets, self.succ_targets
+        frontier = [i for i in range(len(self.names)) if indegree[i] == 0]
+        result: List[List[int]] = []
+        placed = 0
+        while frontier:
+            result.append(frontier)
+            placed += len(frontier)
+            nxt: List[int] = []
+            for u in frontier:
+                for v in targets[offsets[u]:offsets[u + 1]]:
+                    indegree[v] -= 1
+                    if indegree[v] == 0:
+                        nxt.append(v)
+            frontier = nxt
+
+        if placed != len(self.names):
+            raise CycleError(self._find_cycle(indegree))
+        return result
+
+    def topo_order(self) -> List[int]:
+        return [i for layer in self.layers() for i in layer]
+
+    def _find_cycle(self, indegree: array) -> List[str]:
+        """
+        Given the indegrees left over by an incomplete Kahn pass, walk back
+        through unfinished dependencies until a task repeats; that loop is a cycle.
+        Every unfinished task has at least one unfinished dependency, so the walk
+        never gets stuck.
+        """
+        start = next(i for i in range(len(self.names)) if indegree[i] > 0)
+        seen: Dict[int, int] = {}
+        path: List[int] = []
+        node = start
+        while node not in seen:
+            seen[node] = len(path)
+            path.append(node)
+            node = next(p for p in self.predecessors(node) if indegree[p] > 0)
+        loop = path[seen[node]:]
+        # We walked dependent -> dependency; report it in dependency order
+        loop.reverse()
+        return [self.names[i] for i in loop] + [self.names[loop[0]]]
+
+    def transitive_reduction(self) -> Tuple["TaskGraph", List[Tuple[str, str]]]:
+        """
+        Drop every edge implied by a longer path (e.g. a -> c when a -> b -> c),
+        plus duplicate edges. Returns the reduced graph and the removed
+        (dependency, dependent) name pairs. The layering is unchanged.
+
+        Ancestor sets are kept as int bitsets, visited in topological order, and
+        freed once a task's last dependent has been processed. Time and memory
+        grow with N x (ancestors per task) / 8 bytes, so this suits typical
+        pipelines rather than million-task graphs with deep random fan-in.
+        """
+        n = len(self.names)
+        remaining_succ = [self.succ_offsets[i + 1] - self.succ_offsets[i] for i in range(n)]
+        ancestors: Dict[int, int] = {}
+        kept: List[List[str]] = [[] for _ in range(n)]
+        redundant: List[Tuple[str, str]] = []
+
+        for v in self.topo_order():
+            preds = self.predecessors(v)
+            reach = 0
+            for p in preds:
+                reach |= ancestors[p]
+            seen: Set[int] = set()
+            for p in preds:
+                if p in seen or (reach >> p) & 1:
+                    redundant.append((self.names[p], self.names[v]))
+                else:
+                    kept[v].append(self.names[p])
+                seen.add(p)
+            for p in preds:
+                reach |= 1 << p
+                remaining_succ[p] -= 1
+                if remaining_succ[p] == 0:
+                    del ancestors[p]
+            if remaining_succ[v]:
+                ancestors[v] = reach
+
+        return TaskGraph(self.names, kept), redundant
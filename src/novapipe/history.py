@@ -0,0 +1,307 @@
+import logging
+import os
+import re
+import sqlite3
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .paths import data_dir
+from .reporting import percentile
+
+logger = logging.getLogger("novapipe")
+
+# Task outcomes, stored as small integers
+STATUS_CODES = {"success": 0, "failed_ignored": 1, "failed_abort": 2, "skipped": 3}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    pipeline TEXT NOT NULL,
+    started REAL NOT NULL,
+    duration REAL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_pipeline ON runs (pipeline, started);
+
+-- Task names are stored once and referred to by id
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    pipeline TEXT NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (pipeline, name)
+);
+
+CREATE TABLE IF NOT EXISTS task_runs (
+    task_id INTEGER NOT NULL REFERENCES tasks (id),
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    status INTEGER NOT NULL,
+    attempts INTEGER NOT NULL,
+    duration REAL,
+    cpu_secs REAL,
+    max_rss_delta INTEGER,
+    PRIMARY KEY (task_id, run_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS task_runs_by_run ON task_runs (run_id);
+"""
+
+_WINDOW = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhdw]?)\s*$")
+_WINDOW_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def history_path() -> Path:
+    """
+    $NOVAPIPE_HISTORY_DB, else history.sqlite3 under data_dir().
+    """
+    return Path(os.environ.get("NOVAPIPE_HISTORY_DB") or data_dir() / "history.sqlite3")
+
+
+def pipeline_key(pipeline_file: str) -> str:
+    """
+    The key a pipeline's runs are stored under: its file's resolved absolute
+    path (two pipeline.yaml files in different directories stay apart).
+    """
+    return str(Path(pipeline_file).resolve())
+
+
+def parse_window(text: str) -> float:
+    """
+    Seconds in a window like "30m", "12h", "7d" or "2w" (plain numbers are seconds).
+    """
+    m = _WINDOW.match(text)
+    if not m:
+        logger.error(f"Invalid time window {text!r}")
+        raise ValueError(f"Invalid time window {text!r}; expected e.g. 30m, 12h, 7d or 2w")
+    return float(m.group(1)) * _WINDOW_UNITS[m.group(2)]
+
+
+class DurationHint:
+    """
+    Typical duration of a task in recent successful runs.
+    """
+    __slots__ = ("median", "p95", "samples")
+
+    def __init__(self, median: float, p95: float, samples: int):
+        self.median = median
+        self.p95 = p95
+        self.samples = samples
+
+    def __repr__(self) -> str:
+        return f"DurationHint(median={self.median:.3f}, p95={self.p95:.3f}, samples={self.samples})"
+
+
+class HistoryStore:
+    """
+    Per-task metrics of past runs in a local SQLite database:
+      - runs: pipeline, start time, duration and status of each run
+      - task_runs: each task's status, attempts, duration, CPU seconds and
+        peak RSS growth, keyed by (task, run)
+
+    Queries take an optional pipeline; without one they cover every pipeline
+    (tasks with the same name in different pipelines are then combined).
+    """
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else history_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Concurrent runs may record at once: wait for each other's writes
+        self._conn = sqlite3.connect(str(self.path), timeout=30)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "HistoryStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ──────────────── Recording ────────────────
+
+    def _task_ids(self, pipeline: str, names: Iterable[str]) -> Dict[str, int]:
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO tasks (pipeline, name) VALUES (?, ?)",
+            ((pipeline, name) for name in names),
+        )
+        return dict(self._conn.execute(
+            "SELECT name, id FROM tasks WHERE pipeline = ?", (pipeline,)
+        ))
+
+    def record_run(self, pipeline: str, started: float, duration: Optional[float],
+                   status: str, tasks: List[Dict[str, Any]]) -> int:
+        """
+        Store one run and its task records (as in --summary-json). Tasks without
+        an outcome (cut off by a failed run) are left out. Returns the run id.
+        """
+        with self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO runs (pipeline, started, duration, status) VALUES (?, ?, ?, ?)",
+                (pipeline, started, duration, status),
+            )
+            run_id = cursor.lastrowid
+            if run_id is None:
+                logger.error(f"No id for the recorded run of {pipeline!r}")
+                raise sqlite3.DatabaseError(f"No id for the recorded run of {pipeline!r}")
+            finished = [t for t in tasks if t.get("status") in STATUS_CODES]
+            ids = self._task_ids(pipeline, (t["name"] for t in finished))
+            rows = []
+            for t in finished:
+                cpu = [t[k] for k in ("cpu_user_secs", "cpu_system_secs") if t.get(k) is not None]
+                rows.append((
+                    ids[t["name"]], run_id, STATUS_CODES[t["status"]], t.get("attempts") or 0,
+                    t.get("duration_secs"), sum(cpu) if cpu else None, t.get("max_rss_delta_bytes"),
+                ))
+            self._conn.executemany("INSERT INTO task_runs VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        logger.debug(f"Recorded run {run_id} of {pipeline!r} ({len(rows)} tasks) in {self.path}")
+        return run_id
+
+    def prune(self, before: float) -> int:
+        """
+        Delete runs started before `before` (Unix time); returns how many.
+        """
+        with self._conn:
+            deleted = self._conn.execute("DELETE FROM runs WHERE started < ?", (before,)).rowcount
+            self._conn.execute(
+                "DELETE FROM tasks WHERE id NOT IN (SELECT DISTINCT task_id FROM task_runs)"
+            )
+        return deleted
+
+    # ──────────────── Queries ────────────────
+
+    @staticmethod
+    def _where(pipeline: Optional[str], since: Optional[float]) -> Tuple[str, List[Any]]:
+        clauses: List[str] = ["1"]
+        args: List[Any] = []
+        if pipeline is not None:
+            clauses.append("r.pipeline = ?")
+            args.append(pipeline)
+        if since is not None:
+            clauses.append("r.started >= ?")
+            args.append(since)
+        return " AND ".join(clauses), args
+
+    def runs(self, pipeline: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        The most recent runs, newest first, with their task counts.
+        """
+        where, args = self._where(pipeline, None)
+        rows = self._conn.execute(f"""
+            SELECT r.id, r.pipeline, r.started, r.duration, r.status, COUNT(tr.task_id),
+                   SUM(tr.status IN (1, 2))
+            FROM runs r LEFT JOIN task_runs tr ON tr.run_id = r.id
+            WHERE {where}
+            GROUP BY r.id ORDER BY r.started DESC LIMIT ?
+        """, args + [limit])
+        keys = ("id", "pipeline", "started", "duration_secs", "status", "tasks", "failed")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def trend(self, task: str, pipeline: Optional[str] = None, since: Optional[float] = None,
+              bucket: float = 86400.0) -> List[Dict[str, Any]]:
+        """
+        One entry per `bucket` seconds (by run start) in which `task` ran:
+        executions, failures, and p50/p95/max duration of its successful ones.
+        """
+        where, args = self._where(pipeline, since)
+        rows = self._conn.execute(f"""
+            SELECT CAST(r.started / ? AS INTEGER), tr.status, tr.duration
+            FROM task_runs tr JOIN runs r ON r.id = tr.run_id JOIN tasks t ON t.id = tr.task_id
+            WHERE t.name = ? AND tr.status != ? AND {where}
+            ORDER BY r.started
+        """, [bucket, task, STATUS_CODES["skipped"]] + args)
+
+        periods: Dict[int, Dict[str, Any]] = {}
+        for period, status, duration in rows:
+            p = periods.setdefault(period, {"start": period * bucket, "runs": 0, "failures": 0,
+                                            "durations": []})
+            p["runs"] += 1
+            if status == STATUS_CODES["success"]:
+                if duration is not None:
+                    p["durations"].append(duration)
+            else:
+                p["failures"] += 1
+        out = []
+        for p in periods.values():
+            durations = sorted(p.pop("durations"))
+            p["p50"] = percentile(durations, 50) if durations else None
+            p["p95"] = percentile(durations, 95) if durations else None
+            p["max"] = durations[-1] if durations else None
+            out.append(p)
+        return out
+
+    def failure_rates(self, pipeline: Optional[str] = None, since: Optional[float] = None,
+                      min_runs: int = 1) -> List[Dict[str, Any]]:
+        """
+        Per task: executions, failures and failure rate (highest first).
+        """
+        where, args = self._where(pipeline, since)
+        rows = self._conn.execute(f"""
+            SELECT t.name, COUNT(*), SUM(tr.status IN (1, 2)), AVG(tr.attempts)
+            FROM task_runs tr JOIN runs r ON r.id = tr.run_id JOIN tasks t ON t.id = tr.task_id
+            WHERE tr.status != ? AND {where}
+            GROUP BY t.name HAVING COUNT(*) >= ?
+        """, [STATUS_CODES["skipped"]] + args + [min_runs])
+        out = [
+            {"task": name, "runs": runs, "failures": failures, "rate": failures / runs,
+             "mean_attempts": attempts}
+            for name, runs, failures, attempts in rows
+        ]
+        out.sort(key=lambda r: (-r["rate"], -r["failures"], r["task"]))
+        return out
+
+    def regressions(self, pipeline: Optional[str] = None, window: float = 7 * 86400,
+                    baseline: float = 28 * 86400, threshold: float = 1.25,
+                    min_samples: int = 3, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Tasks whose median successful duration over the last `window` seconds is
+        at least `threshold` times their median over the `baseline` seconds
+        before that (each side needs `min_samples` executions), slowest first.
+        """
+        now = time.time() if now is None else now
+        recent_start = now - window
+        where, args = self._where(pipeline, recent_start - baseline)
+        rows = self._conn.execute(f"""
+            SELECT t.name, r.started, tr.duration
+            FROM task_runs tr JOIN runs r ON r.id = tr.run_id JOIN tasks t ON t.id = tr.task_id
+            WHERE tr.status = ? AND tr.duration IS NOT NULL AND r.started <= ? AND {where}
+        """, [STATUS_CODES["success"], now] + args)
+
+        samples: Dict[str, Tuple[List[float], List[float]]] = {}
+        for name, started, duration in rows:
+            before, recent = samples.setdefault(name, ([], []))
+            (recent if started >= recent_start else before).append(duration)
+        out: List[Dict[str, Any]] = []
+        for name, (before, recent) in samples.items():
+            if len(before) < min_samples or len(recent) < min_samples:
+                continue
+            base, cur = statistics.median(before), statistics.median(recent)
+            ratio = cur / base if base > 0 else float("inf")
+            if ratio >= threshold:
+                out.append({"task": name, "baseline_median": base, "recent_median": cur,
+                            "ratio": ratio, "baseline_runs": len(before), "recent_runs": len(recent)})
+        out.sort(key=lambda r: -r["ratio"])
+        return out
+
+    def duration_hints(self, pipeline: str, runs: int = 20) -> Dict[str, DurationHint]:
+        """
+        Median and p95 duration of each task's successful executions in the
+        pipeline's last `runs` runs.
+        """
+        rows = self._conn.execute("""
+            SELECT t.name, tr.duration
+            FROM task_runs tr JOIN tasks t ON t.id = tr.task_id
+            WHERE tr.status = ? AND tr.duration IS NOT NULL AND tr.run_id IN (
+                SELECT id FROM runs WHERE pipeline = ? ORDER BY started DESC LIMIT ?
+            )
+        """, (STATUS_CODES["success"], pipeline, runs))
+        durations: Dict[str, List[float]] = {}
+        for name, duration in rows:
+            durations.setdefault(name, []).append(duration)
+        hints = {}
+        for name, values in durations.items():
+            values.sort()
+            hints[name] = DurationHint(percentile(values, 50), percentile(values, 95), len(values))
+        return hints
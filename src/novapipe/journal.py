@@ -0,0 +1,116 @@
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("novapipe")
+
+# Sentinel telling the writer thread to stop
+_CLOSE = object()
+
+
+class EventJournal:
+    """
+    Append-only NDJSON log of a run, one JSON object per line:
+      - run_start / run_end: the pipeline, and its status and duration at the end
+      - task_start: a task begins its first attempt
+      - attempt: an attempt finished (outcome "success", "timeout" or "error")
+      - task_finish: the task's final record, as in --summary-json
+      - task_skip: the task was skipped
+
+    Every event has "ts" (Unix time) and "event"; task events also have "task".
+    emit() only queues the event. A background thread writes the events and
+    flushes after each batch, so the file can be tailed during the run, and it
+    holds everything up to a crash.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_loop, name="novapipe-journal", daemon=True)
+        self._writer.start()
+
+    def emit(self, event: str, task: Optional[str] = None, **fields: Any) -> None:
+        record: Dict[str, Any] = {"ts": time.time(), "event": event}
+        if task is not None:
+            record["task"] = task
+        record.update(fields)
+        self._queue.put(record)
+
+    def _write_loop(self) -> None:
+        while True:
+            record = self._queue.get()
+            # Write whatever else is already queued, then flush once
+            while record is not _CLOSE:
+                self._write(record)
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._file.flush()
+            if record is _CLOSE:
+                return
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        try:
+            line = json.dumps(record, default=str)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Dropping unserialisable journal event {record.get('event')!r}: {e!r}")
+            return
+        self._file.write(line + "\n")
+
+    def close(self) -> None:
+        """
+        Write the remaining events and close the file.
+        """
+        if self._file.closed:
+            return
+        self._queue.put(_CLOSE)
+        self._writer.join()
+        self._file.close()
+
+
+def iter_events(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Events of a journal, one line at a time, skipping a line that is still
+    being written.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def replay(events: Iterable[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    (summary records, whether the last run has ended): the records (as in
+    --summary-json) rebuilt from journal events, in the order tasks started.
+    Tasks still running have status "running". If the journal holds several
+    runs, only the last one counts.
+    """
+    tasks: Dict[str, Dict[str, Any]] = {}
+    ended = False
+    for e in events:
+        name = e.get("task")
+        kind = e.get("event")
+        if kind == "run_start":
+            tasks = {}
+            ended = False
+        elif kind == "run_end":
+            ended = True
+        elif name is None:
+            continue
+        elif kind == "task_start":
+            tasks[name] = {"name": name, "status": "running", "attempts": 0,
+                           "duration_secs": None, "error": None}
+        elif kind == "attempt" and name in tasks:
+            tasks[name]["attempts"] = e.get("attempt", tasks[name]["attempts"])
+            tasks[name]["error"] = e.get("error")
+        elif kind in ("task_finish", "task_skip"):
+            tasks[name] = e.get("record") or {"name": name, "status": "skipped", "attempts": 0,
+                                              "duration_secs": 0.0, "error": None}
+    return list(tasks.values()), ended
@@ -0,0 +1,398 @@
+import logging
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+from prometheus_client import (
+    GC_COLLECTOR, PLATFORM_COLLECTOR, PROCESS_COLLECTOR, REGISTRY, Counter, Gauge, Histogram,
+    generate_latest,
+)
+from prometheus_client.exposition import choose_encoder
+from prometheus_client.metrics_core import Metric
+
+logger = logging.getLogger("novapipe")
+
+TASK_STATUS = Counter(
+    "novapipe_task_status_total",
+    "Count of task executions by status",
+    ["pipeline", "task", "status"],
+)
+
+# novapipe_task_duration_seconds is registered on first use (see task_duration()),
+# so its buckets can be chosen first
+_task_duration: Optional[Histogram] = None
+_duration_buckets: Tuple[float, ...] = tuple(Histogram.DEFAULT_BUCKETS)
+_task_duration_lock = threading.Lock()
+
+PIPELINE_STATUS = Counter(
+    "novapipe_pipeline_status_total",
+    "Count of pipeline runs by status",
+    ["pipeline", "status"],
+)
+
+PIPELINE_DURATION = Histogram(
+    "novapipe_pipeline_duration_seconds",
+    "Pipeline run duration in seconds",
+    ["pipeline"],
+)
+
+RATE_LIMIT_EFFECTIVE = Gauge(
+    "novapipe_rate_limit_effective_per_second",
+    "Current rate of each rate_limit_key (changes over time with rate_limit_adaptive)",
+    ["pipeline", "key"],
+)
+
+# Live run state, by pipeline
+TASKS_RUNNING = Gauge(
+    "novapipe_tasks_running",
+    "Task attempts currently executing",
+    ["pipeline"],
+)
+
+TASKS_QUEUED = Gauge(
+    "novapipe_tasks_queued",
+    "Tasks waiting for resource pools or a concurrency slot",
+    ["pipeline"],
+)
+
+TASKS_RATE_LIMITED = Gauge(
+    "novapipe_tasks_waiting_rate_limit",
+    "Tasks waiting for a rate-limit token",
+    ["pipeline"],
+)
+
+
+def set_duration_buckets(buckets: Optional[Sequence[float]]) -> None:
+    """
+    Use these upper bounds for novapipe_task_duration_seconds (None: no
+    preference, keeping the prometheus_client defaults). Bucket bounds are fixed
+    once the histogram is registered, on its first use in the process; later,
+    different bounds are ignored with a warning.
+    """
+    global _duration_buckets
+    if not buckets:
+        return
+    wanted = tuple(sorted(buckets))
+    if wanted[-1] != float("inf"):
+        wanted += (float("inf"),)
+    with _task_duration_lock:
+        if _task_duration is None:
+            logger.debug(f"Task duration buckets set to {wanted}")
+            _duration_buckets = wanted
+            return
+    if wanted != _duration_buckets:
+        logger.warning(
+            f"novapipe_task_duration_seconds is already in use with buckets "
+            f"{_duration_buckets}; ignoring {wanted}"
+        )
+
+
+def task_duration() -> Histogram:
+    """
+    The novapipe_task_duration_seconds histogram, registered on the first call.
+    """
+    global _task_duration
+    with _task_duration_lock:
+        if _task_duration is None:
+            _task_duration = Histogram(
+                "novapipe_task_duration_seconds",
+                "Task execution duration",
+                ["pipeline", "task", "status"],
+                buckets=_duration_buckets,
+            )
+        return _task_duration
+
+
+def __getattr__(name: str) -> Any:
+    # TASK_DURATION is created on first access, with the buckets chosen by then
+    if name == "TASK_DURATION":
+        return task_duration()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class TaskInstruments:
+    """
+    Metric children for one (pipeline, task label) pair, bound on first use of
+    each status and reused afterwards, so recording an outcome skips the
+    labels() lookup (string keys, under the metric's lock).
+    Tasks sharing a label (metrics.task_label: function) share one instance.
+    """
+    __slots__ = ("pipeline", "task", "_bound")
+
+    def __init__(self, pipeline: str, task: str):
+        self.pipeline = pipeline
+        self.task = task
+        # status -> (counter child's inc, histogram child's observe)
+        self._bound: Dict[str, Tuple[Callable[[], None], Callable[[float], None]]] = {}
+
+    def _bind(self, status: str):
+        bound = self._bound[status] = (
+            TASK_STATUS.labels(self.pipeline, self.task, status).inc,
+            task_duration().labels(self.pipeline, self.task, status).observe,
+        )
+        return bound
+
+    def record(self, status: str, duration: float) -> None:
+        """
+        Count one outcome and observe its duration (seconds).
+        """
+        bound = self._bound.get(status) or self._bind(status)
+        bound[0]()
+        bound[1](duration)
+
+
+# ──────────────── Metrics recorded in process-pool workers ────────────────
+#
+# A worker process has its own copy of every metric, so whatever a task records
+# there never reaches the coordinator's registry. Each worker therefore diffs
+# its samples (as collect() reports them) against what it last reported and
+# ships the deltas back with the task's result. The coordinator sums them per
+# sample, and PUBLISHED adds the sums to its own samples of the same name and labels.
+
+LabelKey = Tuple[Tuple[str, str], ...]
+# (family name, sample name, labels) -> value
+MetricSnapshot = Dict[Tuple[str, str, LabelKey], float]
+
+_SAMPLED_TYPES = ("counter", "gauge", "histogram", "summary")
+# Sample labels that tell the samples of one child apart
+_SAMPLE_LABELS = ("le", "quantile")
+
+# Worker side: the state last reported to the coordinator
+_reported: Optional[MetricSnapshot] = None
+# Families of prometheus_client's default process/platform/GC collectors,
+# which describe each process and must not be summed
+_own_families: Optional[frozenset] = None
+
+# Coordinator side: the workers' changes, summed
+_worker_totals: MetricSnapshot = {}
+_worker_totals_lock = threading.Lock()
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted(labels.items()))
+
+
+def _child_key(labels: LabelKey) -> LabelKey:
+    return tuple(item for item in labels if item[0] not in _SAMPLE_LABELS)
+
+
+def snapshot_metrics() -> MetricSnapshot:
+    """
+    Current value of every counter, gauge, histogram and summary sample in the
+    default registry (except _created timestamps and per-process collectors).
+    """
+    global _own_families
+    if _own_families is None:
+        _own_families = frozenset(
+            family.name
+            for collector in (PROCESS_COLLECTOR, PLATFORM_COLLECTOR, GC_COLLECTOR)
+            for family in collector.collect()
+        )
+    snap: MetricSnapshot = {}
+    for family in REGISTRY.collect():
+        if family.type not in _SAMPLED_TYPES or family.name in _own_families:
+            continue
+        for sample in family.samples:
+            if not sample.name.endswith("_created"):
+                snap[(family.name, sample.name, _label_key(sample.labels))] = sample.value
+    return snap
+
+
+def init_worker_metrics() -> None:
+    """
+    Process-pool initializer: take the baseline the first deltas are computed from
+    (a worker doesn't necessarily start from zero, e.g. with the fork start method).
+    """
+    global _reported
+    _reported = snapshot_metrics()
+
+
+def take_worker_deltas() -> MetricSnapshot:
+    """
+    Worker side: changes since the last call (or since init_worker_metrics()).
+    """
+    global _reported
+    now = snapshot_metrics()
+    previous = _reported or {}
+    deltas = {}
+    for key, value in now.items():
+        d = value - previous.get(key, 0.0)
+        if d:
+            deltas[key] = d
+    _reported = now
+    return deltas
+
+
+def apply_metric_deltas(deltas: MetricSnapshot) -> None:
+    """
+    Coordinator side: add a worker's deltas to the totals PUBLISHED reports.
+    """
+    with _worker_totals_lock:
+        for key, d in deltas.items():
+            _worker_totals[key] = _worker_totals.get(key, 0.0) + d
+
+
+class PublishedRegistry:
+    """
+    The default registry as published (HTTP endpoint and textfile): each sample
+    plus what process-pool workers added to the same family, sample and labels.
+    Children that only changed in workers are appended to their family.
+    Metrics the coordinator doesn't define, and histogram buckets it doesn't
+    have, are left out.
+    """
+    def __init__(self, registry=REGISTRY):
+        self._registry = registry
+
+    def collect(self) -> Iterator[Metric]:
+        with _worker_totals_lock:
+            totals = dict(_worker_totals)
+        by_family: Dict[str, Dict[Tuple[str, LabelKey], float]] = {}
+        for (family_name, sample_name, labels), value in totals.items():
+            by_family.setdefault(family_name, {})[(sample_name, labels)] = value
+
+        for family in self._registry.collect():
+            extra = by_family.get(family.name)
+            if not extra:
+                yield family
+                continue
+            merged = Metric(family.name, family.documentation, family.type, family.unit)
+            children = set()
+            for sample in family.samples:
+                labels = _label_key(sample.labels)
+                children.add(_child_key(labels))
+                added = extra.pop((sample.name, labels), 0.0)
+                merged.samples.append(sample._replace(value=sample.value + added))
+            for (sample_name, labels), value in extra.items():
+                if _child_key(labels) in children:
+                    logger.debug(f"Dropping worker sample {sample_name}{dict(labels)}: not defined here")
+                    continue
+                merged.add_sample(sample_name, dict(labels), value)
+            yield merged
+
+    def get_sample_value(self, name: str, labels: Optional[Dict[str, str]] = None) -> Optional[float]:
+        labels = labels or {}
+        for family in self.collect():
+            for sample in family.samples:
+                if sample.name == name and sample.labels == labels:
+                    return sample.value
+        return None
+
+
+PUBLISHED = PublishedRegistry()
+
+
+class MetricsExporter:
+    """
+    Publishes the default Prometheus registry while a run is in progress:
+      - over HTTP (port), from a background thread that never blocks the run;
+        clients asking for OpenMetrics get it, others the classic text format
+      - as a textfile for node_exporter's textfile collector (textfile), rewritten
+        atomically every `interval` seconds and once more by finish()
+
+    After the run, finish() writes the final textfile and, if serving HTTP,
+    waits up to `linger` seconds for one scrape of the final values.
+    """
+    def __init__(self, port: Optional[int] = None, path: str = "/metrics",
+                 addr: str = "0.0.0.0", textfile: Optional[str] = None,
+                 interval: float = 5.0, linger: float = 0.0):
+        self.port = port
+        self.path = path
+        self.addr = addr
+        self.textfile = textfile
+        self.interval = interval
+        self.linger = linger
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._finished = threading.Event()
+        self._final_scrape = threading.Event()
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.port is not None:
+            self._httpd = ThreadingHTTPServer((self.addr, self.port), self._handler_class())
+            self._httpd.daemon_threads = True
+            self.port = self._httpd.server_address[1]
+            threading.Thread(
+                target=self._httpd.serve_forever, name="novapipe-metrics", daemon=True
+            ).start()
+        if self.textfile:
+            self.write_textfile()
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="novapipe-metrics-textfile", daemon=True
+            )
+            self._flusher.start()
+
+    def _handler_class(self):
+        exporter = self
+
+        class _MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != exporter.path:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                finished = exporter._finished.is_set()
+                encoder, content_type = choose_encoder(self.headers.get("Accept"))
+                body = encoder(PUBLISHED)
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                if finished:
+                    exporter._final_scrape.set()
+
+            def log_message(self, format, *args):
+                logger.debug("metrics: " + format % args)
+
+        return _MetricsHandler
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.write_textfile()
+            except OSError as e:
+                logger.warning(f"Could not write metrics textfile {self.textfile}: {e!r}")
+
+    def write_textfile(self) -> None:
+        """
+        Atomically replace the textfile (node_exporter never reads a partial file).
+        A no-op when no textfile is configured.
+        """
+        path = self.textfile
+        if not path:
+            return
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".novapipe-", suffix=".prom.tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(generate_latest(PUBLISHED))
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def finish(self) -> bool:
+        """
+        Publish the final values. Returns False if a final scrape was expected
+        but didn't happen within `linger` seconds.
+        """
+        self._finished.set()
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        if self.textfile:
+            self.write_textfile()
+        if self._httpd is None or not self.linger:
+            return True
+        return self._final_scrape.wait(self.linger)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
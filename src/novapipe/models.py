@@ -1,5 +1,64 @@
+import re
+
 from pydantic import BaseModel, Field, field_validator
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Literal, Optional, Union
+
+
+class AdaptiveRateLimit(BaseModel):
+    """
+    AIMD tuning for a rate-limited key: the rate starts at `rate_limit`, grows by
+    about `increase` calls/s per second of successful calls, and is multiplied by
+    `decrease` on overload (RateLimited, an exception listed in `errors`, a
+    timeout, or a call slower than `latency_target`).
+    """
+    min_rate: float = Field(default=0.1, gt=0.0)
+    max_rate: Optional[float] = Field(default=None, gt=0.0)
+    increase: float = Field(default=1.0, gt=0.0)
+    decrease: float = Field(default=0.5, gt=0.0, lt=1.0)
+    errors: List[str] = Field(
+        default_factory=list,
+        description="Exception class names (or module.QualName) that signal overload.",
+    )
+    latency_target: Optional[float] = Field(default=None, gt=0.0)
+
+
+class RetryBackoff(BaseModel):
+    """
+    Exponential backoff between retries: the n-th retry waits
+    retry_delay * multiplier ** (n - 1), capped at max_delay, and with
+    jitter="full" a random fraction of that.
+    """
+    multiplier: float = Field(default=2.0, ge=1.0)
+    max_delay: Optional[float] = Field(default=None, ge=0.0)
+    jitter: Literal["none", "full"] = "full"
+
+
+class CircuitBreakerConfig(BaseModel):
+    """
+    Fail fast after `failure_threshold` consecutive failures of any task sharing
+    `key` (default: the task function); try again after `reset_after` seconds.
+    """
+    key: Optional[str] = None
+    failure_threshold: int = Field(default=5, ge=1)
+    reset_after: float = Field(default=30.0, ge=0.0)
+
+
+class MetricsConfig(BaseModel):
+    """
+    Prometheus options for a pipeline:
+      - task_label: "name" labels task metrics by task name, "function" by task
+        function, which keeps cardinality bounded when many tasks share a function
+      - duration_buckets: upper bounds (seconds) for novapipe_task_duration_seconds
+    """
+    task_label: Literal["name", "function"] = "name"
+    duration_buckets: Optional[List[float]] = None
+
+    @field_validator("duration_buckets")
+    def check_buckets(cls, v):
+        if v is not None:
+            if not v or any(b <= 0 for b in v) or len(set(v)) != len(v):
+                raise ValueError("duration_buckets must be distinct positive numbers")
+        return v
 
 
 class TaskModel(BaseModel):
@@ -14,6 +73,32 @@ class TaskModel(BaseModel):
     # Seconds ot wait between retries (default: 0 = no delay)
     retry_delay: float = Field(default=0.0, ge=0.0)
 
+    # Grow retry_delay exponentially between retries (`true` for defaults)
+    retry_backoff: Optional[RetryBackoff] = Field(default=None)
+
+    # Only retry exceptions with these class names (empty = any exception)
+    retry_on: List[str] = Field(default_factory=list)
+
+    # Never retry exceptions with these class names
+    give_up_on: List[str] = Field(default_factory=list)
+
+    # Fail fast while a dependency keeps failing
+    circuit_breaker: Optional[CircuitBreakerConfig] = Field(default=None)
+
+    # Launch a duplicate attempt if this one is still running after N seconds,
+    # or after the NNth percentile ("pNN") of sibling durations (idempotent tasks only)
+    hedge_after: Optional[Union[float, str]] = Field(default=None)
+
+    @field_validator("hedge_after")
+    def check_hedge_after(cls, v):
+        if isinstance(v, str):
+            m = re.fullmatch(r"p(\d+(?:\.\d+)?)", v)
+            if not m or not 0 < float(m.group(1)) < 100:
+                raise ValueError(f"hedge_after must be seconds or a percentile like 'p95', got {v!r}")
+        elif v is not None and v < 0:
+            raise ValueError("hedge_after must be >= 0")
+        return v
+
     # Max seconds to wait for this task to complete (0 or None = no timeout)
     timeout: Optional[float] = Field(default=None, ge=0.0)
 
@@ -50,6 +135,12 @@ class TaskModel(BaseModel):
     # Max simultaneous tasks with the same resource_tag
     max_concurrency: Optional[int] = Field(default=None, ge=1)
 
+    # Amounts held from the pipeline's resource pools while this task runs
+    resources: Dict[str, float] = Field(
+        default_factory=dict,
+        description="Requested amount per pipeline resource pool, e.g. {cpu: 4, memory_gb: 8}",
+    )
+
     # Optional branch name this task belongs to
     branch: Optional[str] = Field(
         default=None,
@@ -58,13 +149,29 @@ class TaskModel(BaseModel):
 
     # ---- Rate-limiting ----
     rate_limit: Optional[float] = Field(
-        default=None, ge=0.0,
+        default=None, gt=0.0,
         description="Maximum number of calls per second."
     )
+    rate_limit_burst: Optional[int] = Field(
+        default=None, ge=1,
+        description="Calls allowed back-to-back before `rate_limit` pacing applies (default 1)."
+    )
     rate_limit_key: Optional[str] = Field(
         default=None,
         description="Grouping key for shared rate limiting (defaults to task name)."
     )
+    rate_limit_adaptive: Optional[AdaptiveRateLimit] = Field(
+        default=None,
+        description="Adjust the rate from error and latency feedback (`true` for defaults)."
+    )
+
+    @field_validator("rate_limit_adaptive", "retry_backoff", "circuit_breaker", mode="before")
+    def settings_shorthand(cls, v):
+        if v is True:
+            return {}
+        if v is False:
+            return None
+        return v
 
     class Config:
         # Accept the alias key in input
@@ -78,8 +185,25 @@ class Pipeline(BaseModel):
         default_factory=dict,
         description="Mapping branch-name → Jinja2 expression controlling that branch"
     )
+    # named resource pools and their capacities
+    resources: Dict[str, float] = Field(
+        default_factory=dict,
+        description="Resource pool name → capacity, e.g. {cpu: 16, memory_gb: 64}",
+    )
+    # Max retries across all tasks of a run (None = unlimited)
+    retry_budget: Optional[int] = Field(default=None, ge=0)
+    # Prometheus labelling and histogram buckets
+    metrics: MetricsConfig = Field(default_factory=MetricsConfig)
+
     tasks: List[TaskModel]
 
+    @field_validator('resources')
+    def check_capacities(cls, v):
+        for name, capacity in v.items():
+            if capacity < 0:
+                raise ValueError(f"Resource pool '{name}' has negative capacity {capacity}")
+        return v
+
     @field_validator('tasks', mode='before')
     def check_tasks_not_empty(cls, v):
         if not v:
@@ -0,0 +1,33 @@
+import os
+from pathlib import Path
+
+
+def cache_dir() -> Path:
+    """
+    Root of NovaPipe's on-disk caches: $NOVAPIPE_CACHE_DIR, else
+    $XDG_CACHE_HOME/novapipe, else ~/.cache/novapipe.
+    """
+    root = os.environ.get("NOVAPIPE_CACHE_DIR")
+    if root:
+        return Path(root)
+    xdg = os.environ.get("XDG_CACHE_HOME")
+    return Path(xdg or Path.home() / ".cache") / "novapipe"
+
+
+def caching_disabled() -> bool:
+    """
+    True if NOVAPIPE_NO_CACHE is set: caches are neither read nor written.
+    """
+    return bool(os.environ.get("NOVAPIPE_NO_CACHE"))
+
+
+def data_dir() -> Path:
+    """
+    Root of NovaPipe's persistent data (e.g. run history): $NOVAPIPE_DATA_DIR,
+    else $XDG_DATA_HOME/novapipe, else ~/.local/share/novapipe.
+    """
+    root = os.environ.get("NOVAPIPE_DATA_DIR")
+    if root:
+        return Path(root)
+    xdg = os.environ.get("XDG_DATA_HOME")
+    return Path(xdg or Path.home() / ".local" / "share") / "novapipe"
@@ -0,0 +1,172 @@
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional
+
+import yaml
+
+from .graph import TaskGraph
+from .models import Pipeline
+from .paths import cache_dir, caching_disabled
+from .templating import TemplateCache, make_environment, iter_template_strings
+
+logger = logging.getLogger("novapipe")
+
+# libyaml's C loader is several times faster than the pure-Python one
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Bump when the pickled layout of CompiledPlan changes
+PLAN_FORMAT = 1
+
+
+_model_source_digest: Optional[str] = None
+
+
+def novapipe_version() -> str:
+    try:
+        import importlib_metadata as metadata
+    except ImportError:  # pragma: no cover
+        import importlib.metadata as metadata  # type: ignore[no-redef]
+    try:
+        return metadata.version("novapipe")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def model_source_digest() -> str:
+    """
+    Hash of the source of the modules defining what a plan pickles (the models,
+    TaskGraph, CompiledPlan, compiled templates). Any change to them, such as a
+    new TaskModel field, invalidates cached plans even when the version number
+    stays the same. Falls back to the models' JSON schema if the source can't be read.
+    """
+    global _model_source_digest
+    if _model_source_digest is None:
+        from . import graph, models, templating
+
+        digest = hashlib.sha256()
+        try:
+            for module in (models, graph, templating, sys.modules[__name__]):
+                digest.update(Path(module.__file__ or "").read_bytes())
+        except OSError:
+            digest.update(repr(Pipeline.model_json_schema()).encode())
+        _model_source_digest = digest.hexdigest()
+    return _model_source_digest
+
+
+def load_yaml(content: bytes):
+    """
+    Parse pipeline YAML, using the libyaml C loader when it's available.
+    """
+    return yaml.load(content, Loader=YamlLoader)
+
+
+class CompiledPlan:
+    """
+    Everything derived from a pipeline file that doesn't depend on the run:
+      - pipeline: the validated Pipeline model
+      - graph: its TaskGraph
+      - template_code: marshalled Jinja2 code for every template string it uses
+    Pass it to PipelineRunner in place of the raw YAML dict.
+    """
+    def __init__(self, pipeline: Pipeline, graph: TaskGraph, template_code: Dict[str, bytes]):
+        self.pipeline = pipeline
+        self.graph = graph
+        self.template_code = template_code
+
+    @classmethod
+    def from_data(cls, data: dict) -> "CompiledPlan":
+        pipeline = Pipeline.model_validate(data)
+        tasks = pipeline.tasks
+        graph = TaskGraph([t.name for t in tasks], [t.depends_on for t in tasks])
+
+        sources = list(iter_template_strings(pipeline.branches))
+        for t in tasks:
+            sources.extend(iter_template_strings(t.params))
+            sources.extend(iter_template_strings(t.env))
+            if t.run_if:
+                sources.append(t.run_if)
+            if t.run_unless:
+                sources.append(t.run_unless)
+        template_code = TemplateCache(make_environment()).export_code(sources)
+        return cls(pipeline, graph, template_code)
+
+
+def plan_cache_path(content: bytes) -> Path:
+    """
+    Cache location for a pipeline file's plan, keyed by its content and everything
+    the pickled/marshalled form depends on (NovaPipe, Python, pydantic and Jinja2
+    versions, and the model code; see model_source_digest()). The marshalled
+    template code only runs on the Jinja2 runtime that compiled it.
+    """
+    import jinja2
+    import pydantic
+
+    key = hashlib.sha256()
+    key.update(content)
+    key.update(
+        f"\0{PLAN_FORMAT}\0{novapipe_version()}\0{sys.version}\0{pydantic.VERSION}"
+        f"\0{jinja2.__version__}\0{model_source_digest()}".encode()
+    )
+    return cache_dir() / "plans" / f"{key.hexdigest()}.plan"
+
+
+def write_plan(plan: CompiledPlan, path: Path) -> None:
+    """
+    Atomically write a pickled plan (readers never see a partial file).
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(plan, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def compile_plan(pipeline_file: str) -> Path:
+    """
+    Compile a pipeline file and store its plan in the cache. Returns the cache path.
+    """
+    content = Path(pipeline_file).read_bytes()
+    path = plan_cache_path(content)
+    write_plan(CompiledPlan.from_data(load_yaml(content)), path)
+    return path
+
+
+def load_plan(pipeline_file: str, use_cache: bool = True) -> CompiledPlan:
+    """
+    Return the compiled plan for a pipeline file, from the cache when its content
+    (and NovaPipe version) match, else by compiling it and caching the result.
+    Setting NOVAPIPE_NO_CACHE=1 has the same effect as use_cache=False.
+    """
+    content = Path(pipeline_file).read_bytes()
+    if not use_cache or caching_disabled():
+        return CompiledPlan.from_data(load_yaml(content))
+
+    path = plan_cache_path(content)
+    plan: Optional[CompiledPlan] = None
+    try:
+        with open(path, "rb") as f:
+            plan = pickle.load(f)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable plan cache {path}: {e!r}")
+
+    if isinstance(plan, CompiledPlan):
+        logger.debug(f"Loaded compiled plan for {pipeline_file} from {path}")
+        return plan
+
+    plan = CompiledPlan.from_data(load_yaml(content))
+    try:
+        write_plan(plan, path)
+    except OSError as e:
+        logger.warning(f"Could not write plan cache {path}: {e!r}")
+    return plan
@@ -0,0 +1,126 @@
+import cProfile
+import fnmatch
+import io
+import logging
+import pstats
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("novapipe")
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+# cProfile can't profile two threads at once (from Python 3.12 a second
+# Profile().enable() raises ValueError), so profiled thread executions take turns
+_cprofile_lock = threading.Lock()
+
+
+def _file_stem(name: str) -> str:
+    return re.sub(r"[^\w.-]", "_", name)
+
+
+def profiled_call(backend: str, path: str, fn, *args):
+    """
+    fn(*args) under a profiler, writing its profile to path:
+      - "cprofile": deterministic, a .pstats file
+      - "pyinstrument": sampling, a text call tree
+    Profilers only see the calling thread, so this runs where the task body does
+    (a worker thread or process), never on the event loop. cProfile'd calls in
+    one process run one at a time.
+    """
+    if backend == "pyinstrument":
+        from pyinstrument import Profiler  # type: ignore[import-not-found]
+
+        profiler = Profiler(async_mode="disabled")
+        profiler.start()
+        try:
+            return fn(*args)
+        finally:
+            profiler.stop()
+            with open(path, "w") as f:
+                f.write(profiler.output_text(unicode=True, color=False))
+
+    with _cprofile_lock:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return fn(*args)
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+
+
+class TaskProfiler:
+    """
+    Profiles every execution of tasks whose name or function matches `pattern`
+    (a glob) and collects the files in `directory`:
+      - <task>.pstats per execution (<task>.2.pstats for a retry or hedge, ...)
+      - after the run, write_report(): per task function, a combined
+        <function>.combined.pstats and the top-N hotspots of all its tasks
+        in hotspots.txt (cProfile only)
+    """
+    def __init__(self, pattern: str = "*", directory: str = "novapipe-profiles",
+                 backend: str = "cprofile", top: int = 20):
+        if backend not in PROFILERS:
+            logger.error(f"Unknown profiler {backend!r}")
+            raise ValueError(f"Unknown profiler {backend!r}; expected one of {PROFILERS}")
+        if backend == "pyinstrument":
+            try:
+                import pyinstrument  # noqa: F401
+            except ImportError:
+                logger.error("The pyinstrument profiler is not installed")
+                raise RuntimeError(
+                    "The pyinstrument profiler is not installed (pip install pyinstrument)"
+                )
+        self.pattern = pattern
+        self.directory = Path(directory)
+        self.backend = backend
+        self.top = top
+        # (task name, task function, profile path) per profiled execution
+        self.records: List[Tuple[str, str, Path]] = []
+        self._runs: Dict[str, int] = {}
+
+    def matches(self, name: str, function: str) -> bool:
+        return fnmatch.fnmatchcase(name, self.pattern) or fnmatch.fnmatchcase(function, self.pattern)
+
+    def next_path(self, name: str, function: str) -> Path:
+        """
+        Reserve the file for the next execution of task `name`.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        n = self._runs[name] = self._runs.get(name, 0) + 1
+        stem = _file_stem(name)
+        suffix = ".pstats" if self.backend == "cprofile" else ".txt"
+        path = self.directory / (f"{stem}{suffix}" if n == 1 else f"{stem}.{n}{suffix}")
+        self.records.append((name, function, path))
+        return path
+
+    def write_report(self) -> Optional[Path]:
+        """
+        Aggregate the profiles of each task function; returns the hotspots file
+        (None if there was nothing to aggregate).
+        """
+        if self.backend != "cprofile":
+            return None
+        by_function: Dict[str, List[Path]] = {}
+        for _, function, path in self.records:
+            # an execution that never started (e.g. cancelled hedge) has no file
+            if path.exists():
+                by_function.setdefault(function, []).append(path)
+        if not by_function:
+            return None
+
+        out = io.StringIO()
+        for function, paths in sorted(by_function.items()):
+            stats = pstats.Stats(*map(str, paths), stream=out)
+            stats.dump_stats(str(self.directory / f"{_file_stem(function)}.combined.pstats"))
+            # total_tt is missing from typeshed's Stats
+            total = stats.total_tt  # type: ignore[attr-defined]
+            out.write(f"=== {function}: {len(paths)} execution(s), "
+                      f"{total:.3f}s total, top {self.top} by own time ===\n")
+            stats.strip_dirs().sort_stats("tottime").print_stats(self.top)
+        report = self.directory / "hotspots.txt"
+        report.write_text(out.getvalue())
+        return report
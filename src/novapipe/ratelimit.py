@@ -0,0 +1,339 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple
+
+try:
+    import fcntl
+    _HAS_FCNTL = True
+except ImportError:
+    _HAS_FCNTL = False
+
+from .paths import cache_dir
+
+logger = logging.getLogger("novapipe")
+
+
+def gcra(tat: float, now: float, interval: float, burst: int) -> Tuple[float, float]:
+    """
+    One GCRA step: given the stored theoretical arrival time, return
+    (new_tat, allowed_at), where allowed_at is when the claimed slot may be used.
+    A full bucket lets a request through up to (burst - 1) intervals early.
+    """
+    tat = max(tat, now)
+    return tat + interval, tat - (burst - 1) * interval
+
+
+def _wake(fut: asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+
+# ──────────────── Shared backends ────────────────
+
+class LimiterBackend:
+    """
+    Stores token-bucket state outside a single PipelineRunner, so every runner
+    using the same backend and key shares one quota. Subclasses implement
+    reserve(), which claims a slot and returns how many seconds to wait for it.
+    """
+    def reserve(self, key: str, rate: float, per: float, burst: int) -> float:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryBackend(LimiterBackend):
+    """
+    State in a dict: shared by all runners in this process that use the instance.
+    """
+    def __init__(self):
+        self._tats: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, key: str, rate: float, per: float, burst: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tats[key], allowed_at = gcra(
+                self._tats.get(key, -math.inf), now, per / rate, burst
+            )
+        return max(0.0, allowed_at - now)
+
+
+class FileBackend(LimiterBackend):
+    """
+    State in one small file per key, updated under an exclusive flock(): shared
+    by every process on the host that points at the same directory
+    (default: <cache dir>/ratelimit). Uses the wall clock, which all processes share.
+    """
+    def __init__(self, directory: Optional[str] = None):
+        if not _HAS_FCNTL:
+            logger.error("The file rate-limit backend needs fcntl (POSIX only)")
+            raise RuntimeError("The file rate-limit backend needs fcntl (POSIX only)")
+        self.directory = Path(directory) if directory else cache_dir() / "ratelimit"
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{hashlib.sha256(key.encode()).hexdigest()[:32]}.tat"
+
+    def reserve(self, key: str, rate: float, per: float, burst: int) -> float:
+        fd = os.open(self._path(key), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.pread(fd, 8, 0)
+            tat = struct.unpack("d", raw)[0] if len(raw) == 8 else -math.inf
+            now = time.time()
+            new_tat, allowed_at = gcra(tat, now, per / rate, burst)
+            os.pwrite(fd, struct.pack("d", new_tat), 0)
+        finally:
+            # closing the descriptor releases the lock
+            os.close(fd)
+        return max(0.0, allowed_at - now)
+
+
+class RemoteBackend(LimiterBackend):
+    """
+    Client for a RateLimitServer: one JSON line per request over a persistent
+    TCP connection. The server's clock decides, so hosts needn't be in sync.
+    """
+    def __init__(self, host: str, port: int, timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._reader: Optional[BinaryIO] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> Tuple[socket.socket, BinaryIO]:
+        if self._sock is None or self._reader is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._sock, self._reader = sock, sock.makefile("rb")
+        return self._sock, self._reader
+
+    def reserve(self, key: str, rate: float, per: float, burst: int) -> float:
+        request = json.dumps({"key": key, "rate": rate, "per": per, "burst": burst}).encode() + b"\n"
+        with self._lock:
+            # One reconnect attempt, in case the server restarted since the last call
+            for attempt in (1, 2):
+                try:
+                    sock, reader = self._connection()
+                    sock.sendall(request)
+                    line = reader.readline()
+                    if not line:
+                        raise ConnectionError("rate-limit server closed the connection")
+                    break
+                except OSError:
+                    self.close()
+                    if attempt == 2:
+                        raise
+        reply = json.loads(line)
+        if "error" in reply:
+            logger.error(f"Rate-limit server error: {reply['error']}")
+            raise RuntimeError(f"Rate-limit server error: {reply['error']}")
+        return reply["delay"]
+
+    def close(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+class _ReserveHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                req = json.loads(line)
+                if req["rate"] <= 0 or req["per"] <= 0 or req["burst"] < 1:
+                    raise ValueError("rate, per and burst must be positive")
+                delay = self.server.backend.reserve(
+                    str(req["key"]), float(req["rate"]), float(req["per"]), int(req["burst"])
+                )
+                reply = {"delay": delay}
+            except (ValueError, KeyError, TypeError) as e:
+                reply = {"error": str(e)}
+            self.wfile.write(json.dumps(reply).encode() + b"\n")
+
+
+class RateLimitServer(socketserver.ThreadingTCPServer):
+    """
+    Serves rate-limit reservations to RemoteBackend clients on other hosts
+    (`novapipe ratelimit-server`). State lives in a MemoryBackend.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 7070):
+        super().__init__((host, port), _ReserveHandler)
+        self.backend = MemoryBackend()
+
+
+# Backend behind the "memory" spec, so all runners in the process share it
+_process_backend = MemoryBackend()
+
+
+def make_backend(spec: Optional[str]) -> Optional[LimiterBackend]:
+    """
+    Build a backend from a --rate-limit-backend value:
+      - "local" (or None): each runner keeps its own limiters (returns None)
+      - "memory": shared by all runners in this process
+      - "file" or "file:DIR": shared by all processes on this host
+      - "tcp://HOST:PORT": shared through a `novapipe ratelimit-server`
+    """
+    if not spec or spec == "local":
+        return None
+    if spec == "memory":
+        return _process_backend
+    if spec == "file" or spec.startswith("file:"):
+        return FileBackend(spec[5:] or None)
+    if spec.startswith("tcp://"):
+        host, sep, port = spec[6:].rpartition(":")
+        if sep and host and port.isdigit():
+            return RemoteBackend(host, int(port))
+    logger.error(f"Invalid rate-limit backend {spec!r}")
+    raise ValueError(
+        f"Invalid rate-limit backend {spec!r}; expected local, memory, file[:DIR] or tcp://HOST:PORT"
+    )
+
+
+class RateLimiter:
+    """
+    Token bucket: `rate` tokens per `per` seconds, holding at most `burst` tokens.
+
+    Implemented as GCRA (the "virtual scheduling" form of a token bucket), so the
+    whole state is one timestamp, `tat` (theoretical arrival time), whatever the
+    rate. Each acquire() reserves the next free slot synchronously, before it
+    awaits anything, so concurrent waiters never share a slot. Waiters are
+    released strictly in arrival order: each sleeps until its own slot on the
+    event loop's clock, and slots only ever increase.
+
+    With a `backend`, the state lives there instead (under `key`), shared with
+    other runners, processes or hosts; slots are then reserved from a worker
+    thread, and arrival order is only kept within each process.
+    """
+    def __init__(self, rate: float, per: float = 1.0, burst: int = 1,
+                 key: Optional[str] = None, backend: Optional[LimiterBackend] = None):
+        if rate <= 0 or per <= 0:
+            raise ValueError(f"Rate limit must be positive, got {rate}/{per}s")
+        if burst < 1:
+            raise ValueError(f"Rate limit burst must be at least 1, got {burst}")
+        self.rate = rate
+        self.per = per
+        self.burst = burst
+        self.key = key
+        self.backend = backend
+        self._tat = -math.inf
+        self._waiting = 0
+        # With a backend, pause() can't move the shared state; admit nothing before this
+        self._not_before = -math.inf
+
+    @property
+    def interval(self) -> float:
+        """Seconds between tokens."""
+        return self.per / self.rate
+
+    def reserve(self, now: Optional[float] = None) -> float:
+        """
+        Claim the next local slot and return the (monotonic) time from which it
+        may be used; a time <= now means a token is available immediately.
+        """
+        if now is None:
+            now = time.monotonic()
+        self._tat, allowed_at = gcra(self._tat, now, self.interval, self.burst)
+        return allowed_at
+
+    def pause(self, seconds: float) -> None:
+        """
+        Admit no new calls for `seconds` (e.g. a Retry-After hint); pacing resumes
+        afterwards. Calls already waiting for a slot keep it.
+        """
+        until = time.monotonic() + seconds
+        if self.backend is None:
+            self._tat = max(self._tat, until + (self.burst - 1) * self.interval)
+        else:
+            self._not_before = max(self._not_before, until)
+
+    async def acquire(self) -> None:
+        """
+        Wait for a token. A cancelled waiter's slot is not handed back.
+        """
+        loop = asyncio.get_running_loop()
+        if self.backend is None:
+            now = loop.time()
+            allowed_at = self.reserve(now)
+        else:
+            delay = await loop.run_in_executor(
+                None, self.backend.reserve, self.key or "", self.rate, self.per, self.burst
+            )
+            now = loop.time()
+            allowed_at = max(now + delay, self._not_before)
+        # Even with a token ready, queue behind earlier waiters whose timers
+        # haven't fired yet, to keep the order strict
+        if allowed_at <= now and not self._waiting:
+            return
+
+        self._waiting += 1
+        fut = loop.create_future()
+        handle = loop.call_at(allowed_at, _wake, fut)
+        try:
+            await fut
+        finally:
+            self._waiting -= 1
+            handle.cancel()
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """
+    RateLimiter whose rate follows AIMD feedback about the calls it admits:
+      - on_success(): additive increase, about `increase` calls per `per`
+        seconds for every `per` seconds of successful calls (+increase/rate per call)
+      - on_overload(): multiplicative decrease by `decrease`
+    The rate stays within [min_rate, max_rate]. Overload reported by calls that
+    started before the last decrease is ignored, so one throttling episode
+    seen by many concurrent calls only backs off once.
+    """
+    def __init__(self, rate: float, per: float = 1.0, burst: int = 1,
+                 key: Optional[str] = None, backend: Optional[LimiterBackend] = None,
+                 min_rate: float = 0.1, max_rate: Optional[float] = None,
+                 increase: float = 1.0, decrease: float = 0.5,
+                 latency_target: Optional[float] = None):
+        super().__init__(rate, per=per, burst=burst, key=key, backend=backend)
+        self.min_rate = min_rate
+        self.max_rate = max_rate if max_rate is not None else math.inf
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self._last_decrease = -math.inf
+
+    def on_success(self, latency: float, started_at: float) -> None:
+        """
+        Report a call (started at monotonic `started_at`) that succeeded in `latency` seconds.
+        """
+        if self.latency_target is not None and latency > self.latency_target:
+            self.on_overload(started_at)
+            return
+        self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_overload(self, started_at: float, retry_after: Optional[float] = None) -> None:
+        """
+        Report that a call was throttled or too slow; `retry_after` pauses admission.
+        """
+        if retry_after:
+            self.pause(retry_after)
+        if started_at < self._last_decrease:
+            return
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self._last_decrease = time.monotonic()
@@ -0,0 +1,393 @@
+import bisect
+import heapq
+import json
+import math
+import re
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+GROUP_BY = ("task", "status", "resource_tag")
+SORT_KEYS = ("name", "status", "duration", "attempts", "count")
+PERCENTILES = (50, 95, 99)
+
+_CHUNK = 1 << 16
+_WS = re.compile(r"\s*")
+_decoder = json.JSONDecoder()
+# Journal events start with their timestamp (see EventJournal.emit)
+_JOURNAL_HEAD = re.compile(r'\s*\{\s*"(ts|event)"')
+
+
+class _JsonStream:
+    """
+    Pulls JSON values one at a time from a file, keeping only the value being
+    parsed (plus one chunk) in memory.
+    """
+    def __init__(self, f):
+        self._f = f
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        chunk = self._f.read(_CHUNK)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        The next non-whitespace character ("" at the end of the file).
+        """
+        while True:
+            skipped = _WS.match(self._buf, self._pos)
+            if skipped:  # always: \s* matches the empty string
+                self._pos = skipped.end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def take(self, expected: str) -> str:
+        c = self.peek()
+        if c not in expected:
+            raise ValueError(f"Malformed summary: expected one of {expected!r}, got {c!r}")
+        self._pos += 1
+        return c
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+                # a number ending the buffer may continue in the next chunk
+                if end == len(self._buf) and not self._eof:
+                    raise ValueError("value may be incomplete")
+                self._pos = end
+                return value
+            except ValueError:
+                if self._eof or not self._fill():
+                    raise
+
+
+def iter_summary_tasks(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Task records of a --summary-json file, parsed one at a time.
+    """
+    with open(path, encoding="utf-8") as f:
+        stream = _JsonStream(f)
+        stream.take("{")
+        if stream.peek() == "}":
+            return
+        while True:
+            key = stream.value()
+            stream.take(":")
+            if key == "tasks":
+                stream.take("[")
+                if stream.peek() == "]":
+                    stream.take("]")
+                else:
+                    while True:
+                        yield stream.value()
+                        if stream.take(",]") == "]":
+                            break
+            else:
+                stream.value()
+            if stream.take(",}") == "}":
+                return
+
+
+def is_journal(path: str) -> bool:
+    """
+    True for an event journal (--journal), False for a summary (--summary-json).
+    """
+    with open(path, encoding="utf-8") as f:
+        return bool(_JOURNAL_HEAD.match(f.read(256)))
+
+
+def percentile(sorted_values, pct: float) -> float:
+    """
+    Nearest-rank percentile of an ascending, non-empty sequence.
+    """
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def group_key(record: Dict[str, Any], by: str) -> str:
+    if by == "task":
+        return record.get("task") or record.get("name") or ""
+    return record.get(by) or "-"
+
+
+class TaskGroup:
+    """
+    Aggregate of the task records sharing one --group-by value: counts by
+    outcome, and every duration and attempt count (compact arrays) for the
+    percentiles.
+    """
+    __slots__ = ("key", "count", "success", "failed", "skipped", "durations", "attempts")
+
+    def __init__(self, key: str):
+        self.key = key
+        self.count = 0
+        self.success = 0
+        self.failed = 0
+        self.skipped = 0
+        self.durations = array("d")
+        self.attempts = array("q")
+
+    def add(self, record: Dict[str, Any]) -> None:
+        self.count += 1
+        status = record.get("status")
+        if status == "success":
+            self.success += 1
+        elif status in ("failed_ignored", "failed_abort"):
+            self.failed += 1
+        elif status == "skipped":
+            self.skipped += 1
+        if status != "skipped":
+            if record.get("duration_secs") is not None:
+                self.durations.append(record["duration_secs"])
+            self.attempts.append(record.get("attempts") or 0)
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """
+        p50/p95/p99/max of durations ("duration_p50", ...) and attempts
+        ("attempts_p50", ...); None when the group has no executed tasks.
+        """
+        out: Dict[str, Optional[float]] = {}
+        for name, values in (("duration", sorted(self.durations)), ("attempts", sorted(self.attempts))):
+            for pct in PERCENTILES:
+                out[f"{name}_p{pct}"] = percentile(values, pct) if values else None
+            out[f"{name}_max"] = values[-1] if values else None
+        return out
+
+
+def aggregate(records: Iterable[Dict[str, Any]], by: str) -> List[TaskGroup]:
+    groups: Dict[str, TaskGroup] = {}
+    for record in records:
+        key = group_key(record, by)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = TaskGroup(key)
+        group.add(record)
+    return list(groups.values())
+
+
+def _task_sort_key(sort: str):
+    if sort == "duration":
+        return lambda r: r.get("duration_secs") or 0.0
+    if sort == "attempts":
+        # most attempts first; the slowest of those first
+        return lambda r: (r.get("attempts") or 0, r.get("duration_secs") or 0.0)
+    return lambda r: str(r.get(sort) or "")
+
+
+def select_tasks(records: Iterable[Dict[str, Any]], sort: Optional[str] = None,
+                 top: Optional[int] = None) -> Iterable[Dict[str, Any]]:
+    """
+    Task records ordered by `sort` (slowest / most attempts first; name and
+    status ascending), keeping only the first `top`. With `top`, at most
+    that many records are held in memory.
+    """
+    if sort is None:
+        if top is None:
+            return records
+        sort = "duration"
+    key = _task_sort_key(sort)
+    descending = sort in ("duration", "attempts")
+    if top is not None:
+        pick = heapq.nlargest if descending else heapq.nsmallest
+        return pick(top, records, key=key)
+    return sorted(records, key=key, reverse=descending)
+
+
+def select_groups(groups: List[TaskGroup], sort: Optional[str] = None,
+                  top: Optional[int] = None) -> List[TaskGroup]:
+    """
+    Groups ordered by `sort`: name (the group value), count, status (most
+    failures first), duration or attempts (highest p95 first).
+    """
+    sort = sort or "name"
+    if sort == "name":
+        ordered = sorted(groups, key=lambda g: g.key)
+    elif sort == "count":
+        ordered = sorted(groups, key=lambda g: -g.count)
+    elif sort == "status":
+        ordered = sorted(groups, key=lambda g: -g.failed)
+    else:
+        ordered = sorted(groups, key=lambda g: -(g.stats()[f"{sort}_p95"] or 0))
+    return ordered[:top] if top is not None else ordered
+
+
+# A task's layer starts a moment after the finish that released it
+_RELEASE_SLACK = 0.005
+
+
+class PathStep:
+    """
+    One task on the critical path:
+      - offset: seconds from the start of the run to its first attempt
+      - barrier_wait: seconds between its last dependency finishing and its
+        layer starting (the rest of the previous layer was still running)
+      - queue_wait: seconds between its layer starting and its first attempt
+        (rate limits, resource pools, the concurrency limit)
+      - blocked_by: the task whose finish let it start, or None for the first
+      - via: "dependency" if blocked_by is one of its dependencies, else
+        "layer barrier"
+    """
+    __slots__ = ("name", "offset", "barrier_wait", "queue_wait", "duration", "blocked_by", "via")
+
+    def __init__(self, name: str, offset: float, barrier_wait: float, queue_wait: float,
+                 duration: float, blocked_by: Optional[str], via: Optional[str]):
+        self.name = name
+        self.offset = offset
+        self.barrier_wait = barrier_wait
+        self.queue_wait = queue_wait
+        self.duration = duration
+        self.blocked_by = blocked_by
+        self.via = via
+
+
+class Timeline:
+    """
+    A run's execution timeline, rebuilt from the task records' ready_at,
+    started_at and finished_at and their depends_on:
+      - makespan: first layer start to last finish
+      - work: seconds spent running tasks, summed over tasks
+      - ideal_makespan: the longest chain of measured durations through
+        depends_on, i.e. the run time with no layer barrier and no waits
+      - achieved / theoretical parallelism: work over makespan / ideal_makespan
+      - barrier_wait / queue_wait: totals over all tasks (see PathStep)
+      - critical_path: the chain of tasks, each started by the previous one
+        finishing, that ends with the last task to finish
+
+    Records without timings (summaries of older versions, tasks cut off by a
+    failed run) are left out.
+    """
+    def __init__(self, records: Iterable[Dict[str, Any]]):
+        self.tasks: Dict[str, Dict[str, Any]] = {
+            r["name"]: r for r in records
+            if r.get("name") and None not in (r.get("ready_at"), r.get("started_at"), r.get("finished_at"))
+        }
+        if not self.tasks:
+            raise ValueError("no task timings (the summary may predate NovaPipe's timeline fields)")
+        self.deps: Dict[str, List[str]] = {
+            name: [d for d in r.get("depends_on") or () if d in self.tasks]
+            for name, r in self.tasks.items()
+        }
+        self.start = min(r["ready_at"] for r in self.tasks.values())
+        self.end = max(r["finished_at"] for r in self.tasks.values())
+        self.makespan = self.end - self.start
+        self.work = sum(self.duration(name) for name in self.tasks)
+        self.order = self._topological_order()
+        self.layers = self._layers()
+        self.ideal_makespan = self._longest_chain()
+        self.barrier_wait = sum(self.barrier_wait_of(name) for name in self.tasks)
+        self.queue_wait = sum(self.queue_wait_of(name) for name in self.tasks)
+        self.critical_path = self._critical_path()
+
+    @property
+    def achieved_parallelism(self) -> float:
+        return self.work / self.makespan if self.makespan > 0 else 1.0
+
+    @property
+    def theoretical_parallelism(self) -> float:
+        return self.work / self.ideal_makespan if self.ideal_makespan > 0 else 1.0
+
+    def duration(self, name: str) -> float:
+        r = self.tasks[name]
+        return max(0.0, r["finished_at"] - r["started_at"])
+
+    def barrier_wait_of(self, name: str) -> float:
+        released = max((self.tasks[d]["finished_at"] for d in self.deps[name]), default=self.start)
+        return max(0.0, self.tasks[name]["ready_at"] - released)
+
+    def queue_wait_of(self, name: str) -> float:
+        r = self.tasks[name]
+        return max(0.0, r["started_at"] - r["ready_at"])
+
+    def _topological_order(self) -> List[str]:
+        remaining = {name: len(deps) for name, deps in self.deps.items()}
+        dependents: Dict[str, List[str]] = {name: [] for name in self.tasks}
+        for name, deps in self.deps.items():
+            for d in deps:
+                dependents[d].append(name)
+        order = [name for name, n in remaining.items() if n == 0]
+        for name in order:
+            for child in dependents[name]:
+                remaining[child] -= 1
+                if remaining[child] == 0:
+                    order.append(child)
+        return order
+
+    def _layers(self) -> Dict[str, int]:
+        # the layer the runner put each task in: one past its deepest dependency
+        layers: Dict[str, int] = {}
+        for name in self.order:
+            layers[name] = max((layers[d] + 1 for d in self.deps[name]), default=0)
+        return layers
+
+    def _longest_chain(self) -> float:
+        finish: Dict[str, float] = {}
+        for name in self.order:
+            finish[name] = max((finish[d] for d in self.deps[name]), default=0.0) + self.duration(name)
+        return max(finish.values(), default=0.0)
+
+    def _critical_path(self) -> List[PathStep]:
+        by_finish = sorted(self.tasks, key=lambda n: self.tasks[n]["finished_at"])
+        finishes = [self.tasks[n]["finished_at"] for n in by_finish]
+        steps: List[PathStep] = []
+        name: Optional[str] = by_finish[-1]
+        while name is not None:
+            r = self.tasks[name]
+            # The latest finish before this task's layer started released it
+            # (a dependency finishing at about the same time takes precedence).
+            # Blockers finish strictly earlier, so the walk ends.
+            j = bisect.bisect_right(finishes, r["ready_at"] + _RELEASE_SLACK) - 1
+            while j >= 0 and finishes[j] >= r["finished_at"]:
+                j -= 1
+            blocker = by_finish[j] if j >= 0 else None
+            if blocker is not None:
+                for d in self.deps[name]:
+                    if finishes[j] - _RELEASE_SLACK <= self.tasks[d]["finished_at"] < r["finished_at"]:
+                        blocker = d
+                        break
+            via = None if blocker is None else (
+                "dependency" if blocker in self.deps[name] else "layer barrier")
+            steps.append(PathStep(name, r["started_at"] - self.start, self.barrier_wait_of(name),
+                                  self.queue_wait_of(name), self.duration(name), blocker, via))
+            name = blocker
+        steps.reverse()
+        return steps
+
+    def speedups(self, top: int = 5) -> List[Dict[str, Any]]:
+        """
+        Tasks whose speed-up would shorten the run most. The runner waits for
+        each layer's slowest task, so only that task can shorten its layer:
+        by the gap to the layer's next slowest task at most. Per candidate:
+        its layer and duration, and the seconds saved if it ran twice as fast
+        or took no time at all.
+        """
+        slowest: Dict[int, List[float]] = {}
+        leaders: Dict[int, str] = {}
+        for name in self.tasks:
+            layer, d = self.layers[name], self.duration(name)
+            top2 = slowest.setdefault(layer, [0.0, 0.0])
+            if d > top2[0]:
+                top2[0], top2[1] = d, top2[0]
+                leaders[layer] = name
+            elif d > top2[1]:
+                top2[1] = d
+        out: List[Dict[str, Any]] = []
+        for layer, name in leaders.items():
+            first, second = slowest[layer]
+            saved_half = first - max(second, first / 2)
+            if saved_half <= 0:
+                continue
+            out.append({"name": name, "layer": layer, "duration": first,
+                        "saved_if_2x": saved_half, "saved_if_instant": first - second})
+        out.sort(key=lambda c: (-c["saved_if_2x"], -c["saved_if_instant"]))
+        return out[:top]
@@ -0,0 +1,143 @@
+import asyncio
+import itertools
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+logger = logging.getLogger("novapipe")
+
+# A waiter passed over this many times while others were admitted blocks
+# everything behind it until it fits, so large requests can't starve
+MAX_SKIPS = 32
+
+# Slack for float rounding when amounts like 0.1 are taken and released
+_EPSILON = 1e-9
+
+
+class _Waiter:
+    __slots__ = ("requests", "future", "seq", "size", "skips")
+
+    def __init__(self, requests: Dict[str, float], future: asyncio.Future, seq: int, size: float):
+        self.requests = requests
+        self.future = future
+        self.seq = seq
+        self.size = size
+        self.skips = 0
+
+
+class ResourcePools:
+    """
+    Weighted resource pools, e.g. {"cpu": 16, "memory_gb": 64, "db_connections": 10}.
+    A task holding {"cpu": 4, "memory_gb": 8} occupies those amounts until it ends.
+
+    Admission control: a request is admitted only when every amount it asks for
+    is available. Waiting requests are admitted together, once per event-loop
+    tick, first-fit decreasing by their dominant share (the largest fraction
+    of any one pool they need): big requests are placed first and smaller ones
+    fill the gaps, which keeps the pools busy without overcommitting.
+    A request skipped MAX_SKIPS times reserves the head of the queue.
+    """
+    def __init__(self, capacities: Dict[str, float]):
+        self.capacities: Dict[str, float] = dict(capacities)
+        self.available: Dict[str, float] = dict(capacities)
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._admit_scheduled = False
+
+    def check(self, requests: Dict[str, float], owner: str = "task") -> None:
+        """
+        Raise ValueError if requests name an unknown pool or can never fit.
+        """
+        for name, amount in requests.items():
+            if name not in self.capacities:
+                logger.error(f"{owner} requests undefined resource pool '{name}'")
+                raise ValueError(f"{owner} requests undefined resource pool '{name}'")
+            if amount > self.capacities[name]:
+                msg = (f"{owner} requests {amount} '{name}' but the pool only has "
+                       f"{self.capacities[name]}")
+                logger.error(msg)
+                raise ValueError(msg)
+
+    def _fits(self, requests: Dict[str, float]) -> bool:
+        available = self.available
+        return all(amount <= available[name] + _EPSILON for name, amount in requests.items())
+
+    def _take(self, requests: Dict[str, float]) -> None:
+        for name, amount in requests.items():
+            self.available[name] -= amount
+
+    def release(self, requests: Dict[str, float]) -> None:
+        for name, amount in requests.items():
+            self.available[name] += amount
+        if self._waiters:
+            self._schedule_admit()
+
+    def _schedule_admit(self) -> None:
+        if not self._admit_scheduled:
+            self._admit_scheduled = True
+            asyncio.get_running_loop().call_soon(self._admit)
+
+    def _admit(self) -> None:
+        self._admit_scheduled = False
+        waiters = [w for w in self._waiters if not w.future.done()]
+        starving = [w for w in waiters if w.skips >= MAX_SKIPS]
+        if starving:
+            head = min(starving, key=lambda w: w.seq)
+            if not self._fits(head.requests):
+                self._waiters = waiters
+                return
+            self._take(head.requests)
+            head.future.set_result(None)
+            waiters.remove(head)
+
+        # First-fit decreasing (ties: arrival order)
+        waiters.sort(key=lambda w: (-w.size, w.seq))
+        remaining: List[_Waiter] = []
+        admitted = False
+        for w in waiters:
+            if self._fits(w.requests):
+                self._take(w.requests)
+                w.future.set_result(None)
+                admitted = True
+            else:
+                remaining.append(w)
+        if admitted:
+            for w in remaining:
+                w.skips += 1
+        remaining.sort(key=lambda w: w.seq)
+        self._waiters = remaining
+
+    def _dominant_share(self, requests: Dict[str, float]) -> float:
+        return max(
+            (amount / self.capacities[name] for name, amount in requests.items()
+             if self.capacities[name]),
+            default=0.0,
+        )
+
+    async def acquire(self, requests: Dict[str, float]) -> None:
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(requests, loop.create_future(), next(self._seq),
+                         self._dominant_share(requests))
+        self._waiters.append(waiter)
+        self._schedule_admit()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # admitted just as we were cancelled: hand the amounts back
+                self.release(requests)
+            raise
+
+    @asynccontextmanager
+    async def hold(self, requests: Optional[Dict[str, float]]) -> AsyncIterator[None]:
+        """
+        Async context manager: wait until requests fit, hold them for the block.
+        """
+        if not requests:
+            yield
+            return
+        await self.acquire(requests)
+        try:
+            yield
+        finally:
+            self.release(requests)
@@ -0,0 +1,115 @@
+import logging
+import random
+import time
+from typing import Iterable, Optional
+
+logger = logging.getLogger("novapipe")
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised instead of running a task whose circuit breaker is open.
+    """
+    def __init__(self, key: str, retry_in: float):
+        self.key = key
+        self.retry_in = retry_in
+        super().__init__(
+            f"Circuit breaker '{key}' is open after repeated failures; "
+            f"next trial call in {retry_in:.1f}s"
+        )
+
+
+def exception_named(exc: BaseException, names: Iterable[str]) -> bool:
+    """
+    True if exc is an instance of a class named in names (by __name__ or module.qualname).
+    """
+    names = set(names)
+    for cls in type(exc).__mro__:
+        if cls.__name__ in names or f"{cls.__module__}.{cls.__qualname__}" in names:
+            return True
+    return False
+
+
+def backoff_delay(retry: int, base: float, multiplier: float = 2.0,
+                  max_delay: Optional[float] = None, jitter: str = "full",
+                  rng: Optional[random.Random] = None) -> float:
+    """
+    Delay before the `retry`-th retry (1-based): base * multiplier ** (retry - 1),
+    capped at max_delay. With jitter="full" the delay is drawn uniformly from
+    [0, that], so tasks failing together don't retry in lock-step. `rng`
+    defaults to the module-level generator.
+    """
+    delay = base * multiplier ** (retry - 1)
+    if max_delay is not None:
+        delay = min(delay, max_delay)
+    if jitter == "full":
+        delay = (rng or random).uniform(0.0, delay)
+    return delay
+
+
+class RetryBudget:
+    """
+    Caps the total number of retries in a pipeline run. None means unlimited.
+    """
+    def __init__(self, limit: Optional[int]):
+        self.limit = limit
+        self.used = 0
+
+    def take(self) -> bool:
+        """
+        Spend one retry; False if the budget is exhausted.
+        """
+        if self.limit is not None and self.used >= self.limit:
+            return False
+        self.used += 1
+        return True
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker for one key (usually one upstream dependency):
+      - closed: calls run; `failure_threshold` consecutive failures open it
+      - open: calls fail fast with CircuitOpenError for `reset_after` seconds
+      - half-open: one trial call runs; success closes the breaker, failure reopens it
+    """
+    def __init__(self, key: str, failure_threshold: int = 5, reset_after: float = 30.0):
+        self.key = key
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+
+    def before_call(self) -> None:
+        """
+        Raise CircuitOpenError if the call must not run.
+        """
+        if self.state == "open":
+            retry_in = self._opened_at + self.reset_after - time.monotonic()
+            if retry_in > 0:
+                raise CircuitOpenError(self.key, retry_in)
+            self.state = "half_open"
+            logger.info(f"Circuit breaker '{self.key}' half-open: allowing a trial call")
+        if self.state == "half_open":
+            if self._trial_running:
+                raise CircuitOpenError(self.key, self.reset_after)
+            self._trial_running = True
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            logger.info(f"Circuit breaker '{self.key}' closed")
+        self.state = "closed"
+        self.failures = 0
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_running = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(
+                    f"Circuit breaker '{self.key}' opened after {self.failures} consecutive failures"
+                )
+            self.state = "open"
+            self._opened_at = time.monotonic()
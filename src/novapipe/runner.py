@@ -1,15 +1,41 @@
 import asyncio
-import os
-from asyncio import Semaphore
+import bisect
+import contextvars
+import functools
+import math
+import multiprocessing
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import AsyncExitStack, nullcontext
 import logging
 import jinja2
 import time
-from collections import defaultdict, deque
-from typing import Dict, Set, List, Any, Optional, Union, Deque
-from prometheus_client import Counter, Histogram, Gauge
+import tracemalloc
+from typing import Dict, Set, List, Any, Optional, Union, Tuple
+from pydantic import ValidationError
 
-from .tasks import task_registry, load_plugins
+from .tasks import task_registry, load_plugins, get_task_spec, RateLimited, TRIVIAL_DURATION
 from .models import Pipeline, TaskModel
+from .environ import current_env, process_env, task_env, task_environ, takes_env
+from .graph import TaskGraph, CycleError
+from .history import DurationHint
+from .journal import EventJournal
+from . import metrics
+from .metrics import (  # noqa: F401 (re-exported)
+    PIPELINE_DURATION, PIPELINE_STATUS, RATE_LIMIT_EFFECTIVE, TASK_STATUS, TASKS_QUEUED,
+    TASKS_RATE_LIMITED, TASKS_RUNNING, TaskInstruments,
+)
+from .plan import CompiledPlan
+from .ratelimit import RateLimiter, AdaptiveRateLimiter, LimiterBackend
+from .resources import ResourcePools
+from .retry import (
+    CircuitBreaker, CircuitOpenError, RetryBudget, backoff_delay, exception_named,
+)
+from .profiling import TaskProfiler, profiled_call
+from .tracing import Tracer
+from . import usage
+from .usage import ResourceUsage
+from .templating import TemplateCache, make_environment, is_static, contains_template
 
 try:
     import resource
@@ -19,36 +45,41 @@ except ImportError:
 
 logger = logging.getLogger("novapipe")
 
-# ---- Prometheus metrics ----
-TASK_STATUS = Counter(
-    "novapipe_task_status_total",
-    "Count of task executions by status",
-    ["pipeline", "task", "status"],
-)
 
-TASK_DURATION = Histogram(
-    "novapipe_task_duration_seconds",
-    "Task execution duration",
-    ["pipeline", "task", "status"],
-)
+def __getattr__(name: str) -> Any:
+    # Re-exported from metrics, which creates it on first use
+    if name == "TASK_DURATION":
+        return metrics.task_duration()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-PIPELINE_STATUS = Counter(
-    "novapipe_pipeline_status_total",
-    "Count of pipeline runs by status",
-    ["pipeline", "status"],
-)
 
-PIPELINE_DURATION = Histogram(
-    "novapipe_pipeline_duration_seconds",
-    "Pipeline run duration in seconds",
-    ["pipeline"],
-)
+# Sync tasks whose first few thread-pool runs all finish within TRIVIAL_DURATION
+# are moved inline (onto the event loop) for the rest of the run.
+_TRIVIAL_SAMPLES = 5
+
+# hedge_after: "pNN" needs this many finished siblings before it hedges
+_HEDGE_MIN_SAMPLES = 5
+
+# History-based timeouts need this many past successes, and are never shorter than this
+_HISTORY_MIN_SAMPLES = 5
+_HISTORY_MIN_TIMEOUT = 1.0
+
+
+def _process_pool_context() -> multiprocessing.context.BaseContext:
+    """
+    Start method for the process pool. The pool starts mid-run, while thread-pool
+    workers and the journal/metrics threads are alive; a forked child could inherit
+    a lock one of them holds and deadlock. Use forkserver where available, else spawn.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
 
 
-def limit_and_call(fn, params, cpu_time=None, memory=None):
+def limit_and_call(fn, params, cpu_time=None, memory=None, env=None):
     """
     Apply RLIMIT_CPU and RLIMIT_AS (if given), then call fn(params).
     If fn(params) returns a coroutine, run it via asyncio.run().
+    `env` (process-pool workers only) is set in the real environment for the call.
     Return the final result.
     """
     if _HAS_RESOURCE:
@@ -67,79 +98,148 @@ def limit_and_call(fn, params, cpu_time=None, memory=None):
                 "skipping cpu_time=%r, memory=%r", cpu_time, memory
             )
 
-    result = fn(params)
-    if asyncio.iscoroutine(result):
-        # run any coroutine to completion
-        return asyncio.run(result)
-    return result
+    with process_env(env):
+        result = fn(params)
+        if asyncio.iscoroutine(result):
+            # run any coroutine to completion
+            return asyncio.run(result)
+        return result
 
 
-class RateLimiter:
+def _measured_call(trace_malloc, in_worker, fn, *args):
     """
-    Simple sliding-window rate limiter: up to `rate` calls per `per` seconds.
+    fn(*args) in the thread that runs the task body. Returns (result, start,
+    end, usage): the monotonic_ns() times it started and ended, and the
+    ResourceUsage of the call. If fn raises, the usage travels on the exception
+    as `_novapipe_usage` (exception attributes survive pickling, too).
     """
-    def __init__(self, rate: float, per: float = 1.0):
-        self.rate = rate
-        self.per = per
-        self.calls: Deque[float] = deque()
-
-    async def acquire(self):
-        now = asyncio.get_running_loop().time()
-        # Remove timestamps older than window
-        while self.calls and self.calls[0] <= now - self.per:
-            self.calls.popleft()
-
-        if len(self.calls) < self.rate:
-            # under limit: record and proceed
-            self.calls.append(now)
-            return
-        # at capacity: compute next allowed time
-        earliest = self.calls[0]
-        wait = earliest + self.per - now
-        await asyncio.sleep(wait)
-        # after waiting, slide window and record
-        now2 = asyncio.get_running_loop().time()
-        self.calls.popleft()
-        self.calls.append(now2)
+    token = usage.start(trace_malloc, in_worker)
+    started = time.monotonic_ns()
+    try:
+        result = fn(*args)
+    except BaseException as e:
+        e._novapipe_usage = usage.stop(token)
+        raise
+    ended = time.monotonic_ns()
+    return result, started, ended, usage.stop(token)
+
+
+def _worker_call(fn, params, cpu_time=None, memory=None, env=None, profile=None,
+                 trace_malloc=False):
+    """
+    limit_and_call() in a process-pool worker (under profiled_call() if
+    `profile` is a (backend, path) pair). Returns (result, metric deltas,
+    start, end, usage): the deltas carry metrics the task recorded in the worker
+    to the coordinator (a failed call's go out with the worker's next result).
+    """
+    call = (limit_and_call, fn, params, cpu_time, memory, env)
+    if profile:
+        call = (profiled_call, *profile) + call
+    result, started, ended, used = _measured_call(trace_malloc, True, *call)
+    return result, metrics.take_worker_deltas(), started, ended, used
+
+
+async def _call_inline(fn, params):
+    """
+    Call fn(params) directly on the event loop thread, awaiting it if it's async.
+    """
+    result = fn(params)
+    if asyncio.iscoroutine(result):
+        return await result
+    return result
 
 
 class TaskMetrics:
     """
     Stores summary info for one task:
+      - task / resource_tag: its task function and resource_tag (for report --group-by)
+      - depends_on: its declared dependencies
+      - ready_at / started_at / finished_at: Unix times when its layer reached it,
+        when its first attempt started (after rate-limit and resource waits) and
+        when it finished (for report --critical-path)
       - attempts: total attempts made (1 + retries)
       - status: "success", "failed_ignored", or "failed_abort"
       - duration_secs: wall‐clock time from first attempt start to final outcome
       - error: error message (if any; null on success)
+      - hedges: duplicate attempts launched by hedge_after
+      - hedge_wins: how many of those finished before the original attempt
+      - usage: ResourceUsage of its thread/process attempts (see novapipe.usage);
+        None for tasks that ran inline on the event loop
     """
-    def __init__(self, name: str):
+    def __init__(self, name: str, task: Optional[str] = None, resource_tag: Optional[str] = None,
+                 depends_on: Optional[List[str]] = None):
         self.name: str = name
+        self.task = task
+        self.resource_tag = resource_tag
+        self.depends_on: List[str] = list(depends_on or [])
+        self.ready_at: Optional[float] = None
         self.attempts: int = 0
         self.status: Optional[str] = None
         self.start_time: Optional[float] = None
         self.duration_secs: Optional[float] = None
         self.error: Optional[str] = None
+        self.hedges: int = 0
+        self.hedge_wins: int = 0
+        self.usage: Optional[ResourceUsage] = None
 
     def to_dict(self) -> Dict[str, Any]:
         return {
             "name": self.name,
+            "task": self.task,
+            "resource_tag": self.resource_tag,
+            "depends_on": self.depends_on,
             "attempts": self.attempts,
             "status": self.status,
             "duration_secs": self.duration_secs,
             "error": self.error,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            **(self.usage or ResourceUsage()).to_dict(),
+            "ready_at": self.ready_at,
+            "started_at": self.start_time,
+            "finished_at": (self.start_time + self.duration_secs
+                            if self.start_time is not None and self.duration_secs is not None else None),
         }
 
 
 class PipelineRunSummary:
     """
     Collects a dict of TaskSummary, keyed by task name.
+    With a journal, each task's start, final record and skip are also
+    appended to it as they happen.
     """
-    def __init__(self):
+    def __init__(self, journal: Optional[EventJournal] = None,
+                 models: Optional[Dict[str, TaskModel]] = None):
         self.tasks: Dict[str, TaskMetrics] = {}
+        self.journal = journal
+        self._models = models or {}
+        self._ready: Dict[str, float] = {}
+
+    def _new(self, name: str) -> TaskMetrics:
+        model = self._models.get(name)
+        if model is None:
+            ts = TaskMetrics(name)
+        else:
+            ts = TaskMetrics(name, model.task, model.resource_tag, model.depends_on)
+        ts.ready_at = self._ready.pop(name, None)
+        return ts
+
+    def record_ready(self, name: str):
+        """
+        The task's dependencies are done (its layer started).
+        """
+        self._ready[name] = time.time()
 
     def record_start(self, name: str):
-        ts = TaskMetrics(name)
+        ts = self._new(name)
         self.tasks[name] = ts
         ts.start_time = time.time()  # for intermediate tracking
+        if self.journal:
+            self.journal.emit("task_start", name)
+
+    def _finish(self, ts: TaskMetrics) -> None:
+        if self.journal:
+            self.journal.emit("task_finish", ts.name, record=ts.to_dict())
 
     def record_success(self, name: str, attempts: int):
         ts = self.tasks[name]
@@ -147,6 +247,7 @@ class PipelineRunSummary:
         ts.status = "success"
         ts.duration_secs = time.time() - ts.start_time
         ts.error = None
+        self._finish(ts)
 
     def record_failed_ignored(self, name: str, attempts: int, error: Exception):
         ts = self.tasks[name]
@@ -154,6 +255,7 @@ class PipelineRunSummary:
         ts.status = "failed_ignored"
         ts.duration_secs = time.time() - ts.start_time
         ts.error = repr(error)
+        self._finish(ts)
 
     def record_failed_abort(self, name: str, attempts: int, error: Exception):
         ts = self.tasks[name]
@@ -161,15 +263,26 @@ class PipelineRunSummary:
         ts.status = "failed_abort"
         ts.duration_secs = time.time() - ts.start_time
         ts.error = repr(error)
+        self._finish(ts)
+
+    def record_usage(self, name: str, used: Optional[ResourceUsage]):
+        if used is None:
+            return
+        ts = self.tasks[name]
+        if ts.usage is None:
+            ts.usage = ResourceUsage()
+        ts.usage.add(used)
 
     def record_skipped(self, name: str):
-        ts = TaskMetrics(name)
+        ts = self._new(name)
         ts.attempts = 0
         ts.status = "skipped"
         ts.duration_secs = 0.0
         ts.error = None
         ts.start_time = time.time()
         self.tasks[name] = ts
+        if self.journal:
+            self.journal.emit("task_skip", name, record=ts.to_dict())
 
     def to_list(self) -> List[Dict[str, Any]]:
         return [ts.to_dict() for ts in self.tasks.values()]
@@ -179,103 +292,498 @@ class PipelineRunner:
     """
     Executes a validated Pipeline of Steps, supporting async tasks.
     """
-    def __init__(self, raw_data: dict, pipeline_name: str) -> None:
-        # 1. Parse & validate YAML into Pydantic models
-        self.pipeline = Pipeline.model_validate(raw_data)
-        # 2. Build in-memory DAG structures
-        self._build_graph()
+    def __init__(self, raw_data: Union[dict, CompiledPlan], pipeline_name: str = "pipeline",
+                 rate_limit_backend: Optional[LimiterBackend] = None,
+                 tracer: Optional[Tracer] = None,
+                 profiler: Optional[TaskProfiler] = None,
+                 trace_malloc: bool = False,
+                 journal: Optional[EventJournal] = None,
+                 history: Optional[Dict[str, DurationHint]] = None,
+                 history_timeout_factor: Optional[float] = None) -> None:
+        template_code: Dict[str, bytes] = {}
+        if isinstance(raw_data, CompiledPlan):
+            # 1+2. Reuse an already validated pipeline and its graph
+            self.pipeline = raw_data.pipeline
+            self._build_graph(raw_data.graph)
+            template_code = raw_data.template_code
+        else:
+            # 1. Parse & validate YAML into Pydantic models
+            self.pipeline = Pipeline.model_validate(raw_data)
+            # 2. Build in-memory DAG structures
+            self._build_graph()
 
-        # Build rate limiters per key
+        # Build rate limiters per key (state kept in rate_limit_backend, if given,
+        # so the quota is shared with other runners using it)
         self._rate_limiters: Dict[str, RateLimiter] = {}
+        # Overload exception names per adaptive key (RateLimited always counts)
+        self._overload_errors: Dict[str, Set[str]] = {}
+        settings: Dict[str, Dict[str, Any]] = {}
         for t in self.tasks_by_name.values():
             if t.rate_limit is not None:
                 key = t.rate_limit_key or t.name
-                if key in self._rate_limiters:
-                    # pick the lowest rate if multiple tasks share the same key
-                    existing = self._rate_limiters[key].rate
-                    self._rate_limiters[key].rate = min(existing, t.rate_limit)
+                burst = t.rate_limit_burst or 1
+                if key in settings:
+                    # pick the lowest rate (and burst) if multiple tasks share the same key
+                    cfg = settings[key]
+                    cfg["rate"] = min(cfg["rate"], t.rate_limit)
+                    cfg["burst"] = min(cfg["burst"], burst)
+                    cfg["adaptive"] = cfg["adaptive"] or t.rate_limit_adaptive
                 else:
-                    self._rate_limiters[key] = RateLimiter(rate=t.rate_limit, per=1.0)
+                    settings[key] = {"rate": t.rate_limit, "burst": burst,
+                                     "adaptive": t.rate_limit_adaptive}
+                if t.rate_limit_adaptive is not None:
+                    self._overload_errors.setdefault(key, set()).update(t.rate_limit_adaptive.errors)
+        for key, cfg in settings.items():
+            adaptive = cfg["adaptive"]
+            if adaptive is None:
+                self._rate_limiters[key] = RateLimiter(
+                    rate=cfg["rate"], per=1.0, burst=cfg["burst"], key=key, backend=rate_limit_backend
+                )
+            else:
+                # the first adaptive settings declared for the key apply
+                self._rate_limiters[key] = AdaptiveRateLimiter(
+                    rate=cfg["rate"], per=1.0, burst=cfg["burst"], key=key, backend=rate_limit_backend,
+                    min_rate=adaptive.min_rate, max_rate=adaptive.max_rate,
+                    increase=adaptive.increase, decrease=adaptive.decrease,
+                    latency_target=adaptive.latency_target,
+                )
 
         self.pipeline_name = pipeline_name
+        # Phase spans for --trace (None: tracing off)
+        self._tracer = tracer
+        # Profiles tasks matching its glob (--profile; None: off)
+        self._profiler = profiler
+        # Measure each task's peak Python allocations (tracemalloc slows them down)
+        if trace_malloc and not usage.alloc_peak_supported():
+            logger.warning("Peak allocations need Python 3.9+ (tracemalloc.reset_peak); "
+                           "alloc_peak_bytes will not be recorded")
+            trace_malloc = False
+        self._trace_malloc = trace_malloc
+        # Durations of past runs (see HistoryStore.duration_hints): scheduling
+        # priority, and default timeouts if history_timeout_factor is set
+        self._history = history or {}
+        if history_timeout_factor:
+            self._apply_history_timeouts(history_timeout_factor)
+        for key, limiter in self._rate_limiters.items():
+            RATE_LIMIT_EFFECTIVE.labels(pipeline=pipeline_name, key=key).set(limiter.rate)
+
+        # Live run-state gauges
+        self._gauge_running = TASKS_RUNNING.labels(pipeline_name)
+        self._gauge_queued = TASKS_QUEUED.labels(pipeline_name)
+        self._gauge_rate_limited = TASKS_RATE_LIMITED.labels(pipeline_name)
+
+        # Task metric children, shared by tasks with the same label value
+        metrics_cfg = self.pipeline.metrics
+        metrics.set_duration_buckets(metrics_cfg.duration_buckets)
+        by_label: Dict[str, TaskInstruments] = {}
+        self._instruments: Dict[str, TaskInstruments] = {}
+        for t in self.tasks_by_name.values():
+            label = t.task if metrics_cfg.task_label == "function" else t.name
+            if label not in by_label:
+                by_label[label] = TaskInstruments(pipeline_name, label)
+            self._instruments[t.name] = by_label[label]
 
         # Prepare summary
-        self._summary = PipelineRunSummary()
+        self._journal = journal
+        self._summary = PipelineRunSummary(journal, self.tasks_by_name)
 
         # Shared context: task_name → return_value
         self.context: Dict[str, Any] = {}
 
-        # Jinja2 environment for templating
-        self._jinja_env = jinja2.Environment(
-            undefined=jinja2.StrictUndefined,
-            autoescape=False
-        )
-        # make python build-ins available in templates
-        self._jinja_env.globals.update({
-            'int': int,
-            'float': float,
-            'str': str,
-            'bool': bool,
-            'len': len,
-        })
-
-        # Build semaphore for any tasks that declared max_concurrency
-        self._resource_semaphores: Dict[Optional[str], Semaphore] = {}
-        for t in self.tasks_by_name.values():
-            tag = t.resource_tag
-            if tag and t.max_concurrency:
-                # only one semaphore per tag
-                if tag in self._resource_semaphores:
-                    # pick the smallest limit if multiple tasks share the tag
-                    existing = self._resource_semaphores[tag]._value
-                    limit = min(existing, t.max_concurrency)
-                    self._resource_semaphores[tag] = Semaphore(limit)
-                else:
-                    self._resource_semaphores[tag] = Semaphore(t.max_concurrency)
+        # Jinja2 environment for templating; each template is compiled once
+        self._jinja_env = make_environment()
+        self._templates = TemplateCache(self._jinja_env)
+        if template_code:
+            self._templates.preload(template_code)
 
-    def _build_graph(self):
+        # Retry budget for the whole run, and circuit breakers per key
+        self._retry_budget = RetryBudget(self.pipeline.retry_budget)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        for t in self.tasks_by_name.values():
+            cb = t.circuit_breaker
+            if cb is not None:
+                key = cb.key or t.task
+                # the first settings declared for a key apply
+                if key not in self._breakers:
+                    self._breakers[key] = CircuitBreaker(key, cb.failure_threshold, cb.reset_after)
+
+        # Weighted resource pools (pipeline `resources`, plus one per resource_tag
+        # with max_concurrency) and what each task holds from them while it runs
+        self._build_resources()
+
+        # Executor placement, decided from @task hints at the start of run()
+        self._placement: Dict[str, str] = {}
+        self._task_locks: Dict[str, asyncio.Lock] = {}
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+
+        # Sorted successful-attempt durations per task function, for hedge_after: pNN
+        self._sibling_durations: Dict[str, List[float]] = {}
+
+        # Thread-pool timings per task function, used to detect trivial tasks
+        self._promotable: Set[str] = set()
+        self._observed: Dict[str, int] = {}
+        self._not_trivial: Set[str] = set()
+        self._promoted: Set[str] = set()
+
+    def _build_graph(self, graph: Optional[TaskGraph] = None):
         """
-        Build:
+        Build (or, if a precompiled graph is given, adopt):
             - self.tasks_by_name: Dict[name, TaskModel]
-            - self.adj: adjacency list keyed by name
-            - self.indegree: count of incoming edges keyed by name
+            - self.graph: compact TaskGraph (integer ids, CSR adjacency)
         Also validate:
             - unique 'name' values
             - no missing dependencies
             - that each TaskModel.task exists in task_registry
+            - template-free params against the task's schema (if any)
         """
-        self.tasks_by_name: Dict[str, TaskModel] = {
-            t.name: t for t in self.pipeline.tasks
-        }
+        tasks = self.pipeline.tasks
+        self.tasks_by_name: Dict[str, TaskModel] = {t.name: t for t in tasks}
 
         # Verify that all names are unique
-        if len(self.tasks_by_name) != len(self.pipeline.tasks):
+        if len(self.tasks_by_name) != len(tasks):
             logger.error("Duplicate task 'name' detected in pipeline.")
             raise ValueError("Duplicate task 'name' detected in pipeline.")
 
         # Verify that each referenced 'task' maps to a registered function
         missing_tasks: Set[str] = {
-            t.task for t in self.pipeline.tasks if t.task not in task_registry
+            t.task for t in tasks if t.task not in task_registry
         }
         if missing_tasks:
             logger.error(f"Unknown task(s) in registry: {missing_tasks}")
             raise ValueError(f"Unknown task(s) in registry: {missing_tasks}")
 
-        # Build adjacency & indegree maps
-        self.adj: Dict[str, List[str]] = defaultdict(list)
-        self.indegree: Dict[str, int] = {name: 0 for name in self.tasks_by_name}
+        # Intern names to ids and build the adjacency arrays
+        if graph is not None:
+            self.graph = graph
+        else:
+            try:
+                self.graph = TaskGraph([t.name for t in tasks], [t.depends_on for t in tasks])
+            except ValueError as e:
+                logger.error(str(e))
+                raise
+
+        # Params without templates can be checked now, before anything runs
+        for t in tasks:
+            spec = get_task_spec(task_registry[t.task])
+            if t.hedge_after is not None and not spec.thread_safe:
+                # a hedge overlaps the attempt it duplicates
+                logger.error(f"Task '{t.name}': hedge_after needs a thread-safe task function")
+                raise ValueError(
+                    f"Task '{t.name}': hedge_after can't be used with {t.task!r}, "
+                    f"which is marked thread_safe=False"
+                )
+            if spec.schema is None or contains_template(t.params):
+                continue
+            try:
+                spec.validate(t.params)
+            except ValidationError as e:
+                logger.error(f"Invalid params for task '{t.name}': {e}")
+                raise ValueError(f"Invalid params for task '{t.name}': {e}")
 
+    def _build_resources(self) -> None:
+        """
+        Set up self._resources (ResourcePools) and self._task_requests:
+          - pools: pipeline `resources`, plus a pool per resource_tag with
+            max_concurrency (capacity: the smallest max_concurrency declared for
+            the tag), unless the pipeline already defines a pool of that name
+          - requests: the task's `resources`; 1 unit of its resource_tag pool;
+            and defaults from @task hints when the pool exists and the task
+            didn't ask for it: cpu: 1 for kind="cpu" tasks, and memory_gb from
+            memory_estimate (capped at the pool size)
+        """
+        capacities: Dict[str, float] = dict(self.pipeline.resources)
+        tag_limits: Dict[str, int] = {}
         for t in self.tasks_by_name.values():
-            for dep_name in t.depends_on:
-                if dep_name not in self.tasks_by_name:
-                    logger.error(
-                        f"Task '{t.name}' depends on unknown task name '{dep_name}'"
-                    )
-                    raise ValueError(
-                        f"Task '{t.name}' depends on unknown task name '{dep_name}'"
-                    )
-                self.adj[dep_name].append(t.name)
-                self.indegree[t.name] += 1
+            if t.resource_tag and t.max_concurrency:
+                tag_limits[t.resource_tag] = min(
+                    tag_limits.get(t.resource_tag, t.max_concurrency), t.max_concurrency
+                )
+        for tag, limit in tag_limits.items():
+            capacities.setdefault(tag, limit)
+        self._resources = ResourcePools(capacities)
+
+        self._task_requests: Dict[str, Dict[str, float]] = {}
+        for t in self.tasks_by_name.values():
+            requests = dict(t.resources)
+            if t.resource_tag in capacities:
+                requests.setdefault(t.resource_tag, 1)
+            spec = get_task_spec(task_registry[t.task])
+            if spec.kind == "cpu" and "cpu" in capacities:
+                requests.setdefault("cpu", 1)
+            if spec.memory_estimate and "memory_gb" in capacities:
+                requests.setdefault(
+                    "memory_gb", min(spec.memory_estimate / 2**30, capacities["memory_gb"])
+                )
+            self._resources.check(requests, f"Task '{t.name}'")
+            if requests:
+                self._task_requests[t.name] = requests
+
+    def reduce_graph(self) -> List[Tuple[str, str]]:
+        """
+        Replace self.graph with its transitive reduction and return the redundant
+        (dependency, dependent) edges that were dropped. Layers are unchanged, but
+        scheduling, print_dag() and to_dot() work on fewer edges. Each
+        TaskModel.depends_on is left as declared, so skip_downstream_on_failure
+        still sees every dependency.
+        """
+        self.graph, redundant = self.graph.transitive_reduction()
+        if redundant:
+            logger.debug(f"Dropped {len(redundant)} redundant dependency edge(s)")
+        return redundant
+
+    def _plan_placement(self) -> None:
+        """
+        Decide where each task executes, based on the @task hints of its function:
+            - self._placement: task name -> "inline" | "thread" | "process"
+            - self._task_locks: task function -> Lock, for tasks not marked thread_safe
+            - self._env_fallback: tasks whose env is applied to os.environ (see below)
+        Functions that can't be pickled fall back to the thread pool, as do
+        inline tasks with resource limits (or a timeout, for sync functions),
+        since neither can be enforced on the event loop thread.
+        """
+        self._placement = {}
+        self._task_locks = {}
+        self._promotable = set()
+        self._observed = {}
+        self._not_trivial = set()
+        self._promoted = set()
+        self._profiled: Set[str] = set()
+        self._env_arg: Set[str] = set()
+        self._env_fallback: Set[str] = set()
+        self._environ_lock = asyncio.Lock()
+        picklable: Dict[str, bool] = {}
+        for name, t in self.tasks_by_name.items():
+            func = task_registry[t.task]
+            spec = get_task_spec(func)
+            placement = spec.placement
+
+            # A task's env reaches it as an `env` argument if its function takes
+            # one, and through task_environ() in any case
+            if takes_env(func):
+                self._env_arg.add(name)
+
+            if placement == "process":
+                if t.task not in picklable:
+                    try:
+                        pickle.dumps(func)
+                        picklable[t.task] = True
+                    except Exception:
+                        picklable[t.task] = False
+                if not picklable[t.task]:
+                    if spec.placement == "process":
+                        logger.warning(
+                            f"Task '{name}' prefers the process pool, but {t.task!r} can't be "
+                            f"pickled; running it in a thread instead."
+                        )
+                    placement = "thread"
+
+            # Otherwise only a process worker's real environment shows it in
+            # os.environ (and to child processes). Elsewhere it is applied to the
+            # coordinator's os.environ, one such task at a time.
+            if t.env and name not in self._env_arg and placement != "process":
+                self._env_fallback.add(name)
+                logger.info(
+                    f"Task '{name}' sets env and runs in this process: its variables are "
+                    f"applied to os.environ while it runs, one such task at a time. Give "
+                    f"{t.task!r} an `env` argument (or executor=\"process\") to run it "
+                    f"concurrently."
+                )
+
+            if placement == "inline" and not self._inline_allowed(t, func):
+                placement = "thread"
+
+            # Profilers see one thread: keep profiled tasks off the event loop
+            if self._profiler and self._profiler.matches(name, t.task):
+                self._profiled.add(name)
+                if placement == "inline":
+                    placement = "thread"
+
+            # Sync thread-pool tasks may be measured as trivial and moved inline
+            if (
+                placement == "thread"
+                and name not in self._profiled
+                and not asyncio.iscoroutinefunction(func)
+                and self._inline_allowed(t, func)
+            ):
+                self._promotable.add(name)
+
+            if placement == "thread" and not spec.thread_safe:
+                self._task_locks.setdefault(t.task, asyncio.Lock())
+
+            if spec.memory_estimate and t.memory and t.memory < spec.memory_estimate:
+                logger.warning(
+                    f"Task '{name}' caps memory at {t.memory} bytes, below the "
+                    f"{spec.memory_estimate} bytes {t.task!r} is expected to need."
+                )
+
+            self._placement[name] = placement
+
+    @staticmethod
+    def _inline_allowed(task_model: TaskModel, func) -> bool:
+        """
+        True if the task can run on the event loop thread without losing
+        resource limits or timeout enforcement.
+        """
+        if task_model.cpu_time is not None or task_model.memory is not None:
+            return False
+        if task_model.timeout and not asyncio.iscoroutinefunction(func):
+            return False
+        if task_model.hedge_after is not None and not asyncio.iscoroutinefunction(func):
+            # a blocking inline call couldn't be raced against a hedge
+            return False
+        return True
+
+    def _observe(self, task_model: TaskModel, duration: float) -> None:
+        """
+        Record how long the body of a thread-pool run of a task function took
+        (without the executor hop or usage sampling). Once _TRIVIAL_SAMPLES runs
+        have all finished within TRIVIAL_DURATION, eligible tasks using that
+        function run inline from then on; a single slower run rules it out.
+        """
+        fname = task_model.task
+        if fname in self._promoted or fname in self._not_trivial:
+            return
+        if duration > TRIVIAL_DURATION:
+            self._not_trivial.add(fname)
+            return
+        self._observed[fname] = self._observed.get(fname, 0) + 1
+        if self._observed[fname] >= _TRIVIAL_SAMPLES:
+            logger.debug(f"Task function {fname!r} measured as trivial; running it inline")
+            self._promoted.add(fname)
+
+    def _dispatch(self, name: str, task_model: TaskModel, func, params: Dict[str, Any]):
+        """
+        Start one attempt of a task on its executor and return an awaitable:
+            - "inline": called directly on the event loop thread (no executor hop)
+            - "thread": default thread pool, via limit_and_call
+            - "process": process pool, via limit_and_call
+        """
+        placement = self._placement.get(name, "thread")
+        if name in self._promotable and task_model.task in self._promoted:
+            placement = "inline"
+        if name in self._env_arg:
+            func = functools.partial(func, env=task_environ())
+        if placement == "inline":
+            return _call_inline(func, params)
+
+        profile = None
+        profiler = self._profiler
+        if profiler is not None and name in self._profiled:
+            profile = (profiler.backend, str(profiler.next_path(name, task_model.task)))
+        if placement == "process":
+            # A worker runs one task at a time, so it can set its real environment
+            return self._call_in_process(name, task_model, func, params, current_env(), profile)
+        return self._call_in_thread(name, task_model, func, params, profile)
+
+    async def _call_in_process(self, name: str, task_model: TaskModel, func,
+                               params: Dict[str, Any], env: Dict[str, Any],
+                               profile: Optional[Tuple[str, str]] = None) -> Any:
+        """
+        Run one attempt in the process pool; fold the worker's metric deltas
+        into ours, record its resource usage and trace its executor-queue and
+        body phases.
+        """
+        submitted = time.monotonic_ns()
+        try:
+            result, deltas, started, ended, used = await asyncio.get_running_loop().run_in_executor(
+                self._get_process_pool(),
+                _worker_call,
+                func,
+                params,
+                task_model.cpu_time,
+                task_model.memory,
+                env,
+                profile,
+                self._trace_malloc,
+            )
+        except BaseException as e:
+            self._summary.record_usage(name, getattr(e, "_novapipe_usage", None))
+            raise
+        self._summary.record_usage(name, used)
+        if deltas:
+            metrics.apply_metric_deltas(deltas)
+        if self._tracer:
+            self._trace_executor(name, "process", submitted, started, ended)
+        return result
+
+    async def _call_in_thread(self, name: str, task_model: TaskModel, func,
+                              params: Dict[str, Any],
+                              profile: Optional[Tuple[str, str]] = None) -> Any:
+        """
+        Run one attempt in the thread pool (profiled, if `profile` is given);
+        record its resource usage, time its body for inline promotion and trace
+        its executor-queue and body phases.
+        """
+        call: Tuple[Any, ...] = (limit_and_call, func, params, task_model.cpu_time, task_model.memory)
+        if profile:
+            call = (profiled_call, *profile) + call
+        submitted = time.monotonic_ns()
+        try:
+            # Threads don't inherit context variables; run in a copy of ours so
+            # the task's env overlay is visible there
+            result, started, ended, used = await asyncio.get_running_loop().run_in_executor(
+                None, contextvars.copy_context().run, _measured_call,
+                self._trace_malloc, False, *call
+            )
+        except BaseException as e:
+            self._summary.record_usage(name, getattr(e, "_novapipe_usage", None))
+            raise
+        self._summary.record_usage(name, used)
+        if name in self._promotable:
+            self._observe(task_model, (ended - started) / 1e9)
+        if self._tracer:
+            self._trace_executor(name, "thread", submitted, started, ended)
+        return result
+
+    def _trace_executor(self, name: str, executor: str, submitted: int, started: int,
+                        ended: int) -> None:
+        tracer = self._tracer
+        if tracer is None:
+            return
+        tracer.add("executor_queue", name, submitted, started, executor=executor)
+        tracer.add("body", name, started, ended, executor=executor)
+
+    def _span(self, phase: str, name: Optional[str], **attrs):
+        """
+        A tracer span for one phase of a task, or a no-op if tracing is off.
+        """
+        if self._tracer is None:
+            return nullcontext()
+        return self._tracer.span(phase, name, **attrs)
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        """
+        Lazily start the process pool used by CPU-bound tasks.
+        """
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(
+                mp_context=_process_pool_context(), initializer=metrics.init_worker_metrics,
+            )
+        return self._process_pool
+
+    def _expected_duration(self, name: str) -> float:
+        """
+        The task's median duration in past runs, else the expected_duration
+        hint of its function (0.0 if unknown).
+        """
+        hint = self._history.get(name)
+        if hint is not None:
+            return hint.median
+        spec = get_task_spec(task_registry[self.tasks_by_name[name].task])
+        return spec.expected_duration or 0.0
+
+    def _apply_history_timeouts(self, factor: float) -> None:
+        """
+        Give tasks without a timeout one of `factor` times their p95 duration
+        in past runs (at least _HISTORY_MIN_TIMEOUT seconds), if they have
+        _HISTORY_MIN_SAMPLES successful runs on record.
+        """
+        for name, t in self.tasks_by_name.items():
+            hint = self._history.get(name)
+            if t.timeout or hint is None or hint.samples < _HISTORY_MIN_SAMPLES:
+                continue
+            t.timeout = max(_HISTORY_MIN_TIMEOUT, round(factor * hint.p95, 3))
+            logger.debug(f"Task '{name}' gets a timeout of {t.timeout}s from its history ({hint!r})")
 
     def _compute_layers(self) -> List[List[str]]:
         """
@@ -284,28 +792,13 @@ class PipelineRunner:
         This returns a list of lists, where each sublist is a batch of task-names
         that can run concurrently.
         """
-        indegree_copy = dict(self.indegree)  # don't modify the original
-        adj_copy = {u: list(v) for u, v in self.adj.items()}
-
-        layers: List[List[str]] = []
-        remaining = set(self.tasks_by_name.keys())
-
-        while remaining:
-            # Find all tasks with indegree == 0
-            zero_deps = [n for n in remaining if indegree_copy[n] == 0]
-            if not zero_deps:
-                # cycle detected
-                logger.error("Cycle detected in task dependencies")
-                raise RuntimeError("Cycle detected in task dependencies")
-
-            layers.append(zero_deps)
-            # Remove these from the graph
-            for u in zero_deps:
-                remaining.remove(u)
-                for v in adj_copy.get(u, []):
-                    indegree_copy[v] -= 1
-
-        return layers
+        names = self.graph.names
+        try:
+            layers = self.graph.layers()
+        except CycleError as e:
+            logger.error(str(e))
+            raise
+        return [[names[i] for i in layer] for layer in layers]
 
     def _render_env(self, raw_env: Dict[str, Any]) -> Dict[str, str]:
         """
@@ -314,7 +807,9 @@ class PipelineRunner:
         """
         def render_val(v: Any) -> str:
             if isinstance(v, str):
-                tmpl = self._jinja_env.from_string(v)
+                if is_static(v):
+                    return v
+                tmpl = self._templates.get(v)
                 try:
                     return tmpl.render(**self.context)
                 except jinja2.UndefinedError as e:
@@ -333,7 +828,9 @@ class PipelineRunner:
         def render_value(value: Any) -> Any:
             if isinstance(value, str):
                 # Treat the entire string as a Jinja2 template
-                template = self._jinja_env.from_string(value)
+                if is_static(value):
+                    return value
+                template = self._templates.get(value)
                 try:
                     return template.render(**self.context)
                 except jinja2.UndefinedError as e:
@@ -366,6 +863,7 @@ class PipelineRunner:
         """
         task_model = self.tasks_by_name[name]
         func = task_registry[task_model.task]
+        self._summary.record_ready(name)
 
         # ---- 0) SKIP-DOWNSTREAM-ON-FAILURE ----
         # If any dependency declared skip_downstream_on_failure=True and failed,
@@ -389,7 +887,7 @@ class PipelineRunner:
         if branch_name:
             expr = self.pipeline.branches.get(branch_name, "")
             try:
-                tmpl = self._jinja_env.from_string(expr)
+                tmpl = self._templates.get(expr)
                 rendered = tmpl.render(**self.context).strip().lower()
             except jinja2.UndefinedError as e:
                 raise RuntimeError(f"Error evaluating branch '{branch_name}': {e}")
@@ -401,17 +899,18 @@ class PipelineRunner:
                 return
 
         # --- RATE-LIMITING ----
-        if task_model.rate_limit is not None:
-            key = task_model.rate_limit_key or task_model.name
-            limiter = self._rate_limiters.get(key)
-            if limiter:
-                logger.debug(f"RateLimiter acquire for key={key} at rate={limiter.rate}/s")
-                await limiter.acquire()
+        limiter = self._rate_limiter_for(task_model)
+        if limiter:
+            logger.debug(f"RateLimiter acquire for key={limiter.key} at rate={limiter.rate}/s")
+            await self._acquire_token(limiter, name)
+
+        # Traced as one "render" phase: conditions, params, validation and env
+        render_start = time.monotonic_ns()
 
         # ---- 1) CONDITIONAL EXECUTION ----
         # A) run_unless: if provided and truthy -> skip
         if task_model.run_unless:
-            tmpl_un = self._jinja_env.from_string(task_model.run_unless)
+            tmpl_un = self._templates.get(task_model.run_unless)
             val_un = tmpl_un.render(**self.context).strip().lower()
             if val_un in ("true", "1", "yes"):
                 logger.info(f"Task '{name}' skipped because run_unless evaluated to '{val_un}'.")
@@ -422,7 +921,7 @@ class PipelineRunner:
         # B) run_if: if provided and falsy -> skip
         if task_model.run_if:
             try:
-                tmpl_if = self._jinja_env.from_string(task_model.run_if)
+                tmpl_if = self._templates.get(task_model.run_if)
                 rendered = tmpl_if.render(**self.context)
             except jinja2.UndefinedError as e:
                 raise RuntimeError(f"Template error in run_if for '{name}': {e}")
@@ -435,8 +934,7 @@ class PipelineRunner:
                 self._summary.record_skipped(name)
                 self.context[name] = None
 
-                TASK_STATUS.labels(task=name, status="skipped").inc()
-                TASK_DURATION.labels(task=name, status="skipped").observe(0.0)
+                self._instruments[name].record("skipped", 0.0)
                 return
 
             # else: run_if is truthy -> proceed to actual execution
@@ -448,81 +946,70 @@ class PipelineRunner:
         except Exception as e:
             raise RuntimeError(f"Error rendering params for task '{name}': {e}")
 
+        # ---- 2b) PARAM VALIDATION ----
+        try:
+            params = get_task_spec(func).validate(params)
+        except ValidationError as e:
+            raise RuntimeError(f"Invalid params for task '{name}': {e}")
+
         max_attempts = 1 + (task_model.retries or 0)
-        delay = float(task_model.retry_delay or 0.0)
         timeout = task_model.timeout  # None or float
         ignore_failure = bool(task_model.ignore_failure)
+        breaker = self._breaker_for(task_model)
+        instruments = self._instruments[name]
+
+        # ---- ENVIRONMENT RENDERING ----
+        raw_env = task_model.env or {}
+        env_vars: Dict[str, str] = {}
+        if raw_env:
+            try:
+                env_vars = self._render_env(raw_env)
+            except Exception as e:
+                raise RuntimeError(f"Error rendering env for task '{name}': {e}")
+        if self._tracer:
+            self._tracer.add("render", name, render_start, time.monotonic_ns())
 
         # Prepare execution as an inner coroutine (to allow semaphore)
         async def execute():
-            # ---- ENVIRONMENT INJECTION ----
-            raw_env = task_model.env or {}
-            if raw_env:
-                try:
-                    env_vars = self._render_env(raw_env)
-                except Exception as e:
-                    raise RuntimeError(f"Error rendering env for task '{name}': {e}")
-
-                # Save current values
-                _old = {k: os.environ.get(k) for k in env_vars}
-                # Inject new ones
-                os.environ.update(env_vars)
-            else:
-                env_vars = {}
-                _old = {}
-
             self._summary.record_start(name)
 
             attempt = 0
 
             while True:
                 attempt += 1
-                # Always run in executor so resource limits apply
-                loop = asyncio.get_running_loop()
-                coro = loop.run_in_executor(
-                    None,
-                    limit_and_call,
-                    func,
-                    params,
-                    task_model.cpu_time,
-                    task_model.memory,
-                )
-                # if asyncio.iscoroutinefunction(func):
-                #     # async functions can't have resource limits easily; run in a thread
-                #     def _sync_wrapper(p):
-                #         return limit_and_call(func, p)
-                #     coro = func(params)     # async tasks: relay on timeout only
-                # else:
-                #     # Offload sync function to a threadpool so it doesn't block the loop
-                #     loop = asyncio.get_running_loop()
-                #     # wrap sync function so it sets resource limits before calling
-                #     coro = loop.run_in_executor(
-                #         None,
-                #         limit_and_call,
-                #         func,
-                #         params
-                #     )
-
+                # Retries are rate-limited too (and honour Retry-After pauses)
+                if attempt > 1 and limiter:
+                    await self._acquire_token(limiter, name)
                 try:
                     # capture whatever the task returned
                     start = time.time()
-                    if timeout and timeout > 0:
-                        result = await asyncio.wait_for(coro, timeout=timeout)
+                    started_mono = time.monotonic()
+                    # Fail fast while the task's circuit breaker is open
+                    if breaker:
+                        breaker.before_call()
+                    # Run inline, in a thread or in a process, depending on placement
+                    # (raced against a duplicate attempt if hedge_after is set)
+                    if task_model.hedge_after is not None:
+                        coro = self._call_hedged(name, task_model, func, params, limiter)
                     else:
-                        result = await coro
+                        coro = self._dispatch(name, task_model, func, params)
+                    with self._gauge_running.track_inprogress(), \
+                            self._span("attempt", name, attempt=attempt):
+                        if timeout and timeout > 0:
+                            result = await asyncio.wait_for(coro, timeout=timeout)
+                        else:
+                            result = await coro
                     dur = time.time() - start
+                    if limiter:
+                        self._rate_feedback(limiter, started_mono, latency=dur)
+                    if breaker:
+                        breaker.record_success()
+                    if task_model.hedge_after is not None:
+                        bisect.insort(self._sibling_durations.setdefault(task_model.task, []), dur)
 
                     # record metrics
-                    TASK_STATUS.labels(
-                        pipeline=self.pipeline_name,
-                        task=name,
-                        status="success"
-                    ).inc()
-                    TASK_DURATION.labels(
-                        pipeline=self.pipeline_name,
-                        task=name,
-                        status="success"
-                    ).observe(dur)
+                    instruments.record("success", dur)
+                    self._emit_attempt(name, attempt, "success", dur)
 
                     # Record success and store result in context
                     logger.info(f"Task '{name}' succeeded on attempt {attempt}/{max_attempts}")
@@ -540,136 +1027,260 @@ class PipelineRunner:
                     return
                 except asyncio.TimeoutError as te:
                     # Timeout on this attempt
-                    if attempt >= max_attempts:
+                    if limiter:
+                        self._rate_feedback(limiter, started_mono, exc=te)
+                    if breaker:
+                        breaker.record_failure()
+                    retrying = self._may_retry(task_model, attempt, max_attempts, te)
+                    self._emit_attempt(name, attempt, "timeout", time.time() - start, te, retrying)
+                    if not retrying:
                         msg = f"Task '{name}' timed out after {timeout}s (attempt {attempt}/{max_attempts})"
                         if ignore_failure:
                             logger.error(msg + " — but ignore_failure=True, continuing.")
                             self._summary.record_failed_ignored(name, attempt, te)
                             # record metrics
-                            TASK_STATUS.labels(
-                                pipeline=self.pipeline_name,
-                                task=name,
-                                status="failed_ignored"
-                            ).inc()
-                            TASK_DURATION.labels(
-                                pipeline=self.pipeline_name,
-                                task=name,
-                                status="failed_ignored"
-                            ).observe(time.time() - self._summary.tasks[name].start_time)
+                            instruments.record("failed_ignored", time.time() - self._summary.tasks[name].start_time)
                             return
                         else:
                             logger.error(msg)
                             self._summary.record_failed_abort(name, attempt, te)
-                            TASK_STATUS.labels(
-                                pipeline=self.pipeline_name,
-                                task=name,
-                                status="failed_abort"
-                            ).inc()
-                            TASK_DURATION.labels(
-                                pipeline=self.pipeline_name,
-                                task=name,
-                                status="failed_abort"
-                            ).observe(time.time() - self._summary.tasks[name].start_time)
+                            instruments.record("failed_abort", time.time() - self._summary.tasks[name].start_time)
                             raise RuntimeError(msg)
                     else:
                         # Log a warning and sleep before next attempt
+                        delay = self._retry_delay(task_model, attempt)
                         logger.warning(
                             f"⏱️ Task '{name}' timed out after {timeout}s "
                             f"(attempt {attempt}/{max_attempts}). Retrying in {delay:.1f}s..."
                         )
                         if delay > 0:
-                            await asyncio.sleep(delay)
+                            with self._span("retry_wait", name):
+                                await asyncio.sleep(delay)
 
                 except Exception as exc:
                     # Real exception from the task body
-                    if attempt >= max_attempts:
+                    # (CircuitOpenError: the task didn't run, so there's nothing to report)
+                    if not isinstance(exc, CircuitOpenError):
+                        if limiter:
+                            self._rate_feedback(limiter, started_mono, exc=exc)
+                        if breaker:
+                            breaker.record_failure()
+                    retrying = self._may_retry(task_model, attempt, max_attempts, exc)
+                    self._emit_attempt(name, attempt, "error", time.time() - start, exc, retrying)
+                    if not retrying:
                         msg = f"Task '{name}' (func={task_model.task}) failed permanently with: {exc!r}"
                         if task_model.ignore_failure:
                             logger.error(msg + " — but ignore_failure=True, continuing.")
                             self._summary.record_failed_ignored(name, attempt, exc)
-                            TASK_STATUS.labels(
-                                pipeline=self.pipeline_name,
-                                task=name,
-                                status="failed_ignored"
-                            ).inc()
-                            TASK_DURATION.labels(
-                                pipeline=self.pipeline_name,
-                                task=name,
-                                status="failed_ignored"
-                            ).observe(time.time() - self._summary.tasks[name].start_time)
+                            instruments.record("failed_ignored", time.time() - self._summary.tasks[name].start_time)
                             # Even though failure is ignored, we set context[name] = None
                             self.context[name] = None
                             return
                         else:
                             logger.error(msg)
                             self._summary.record_failed_abort(name, attempt, exc)
-                            TASK_STATUS.labels(
-                                pipeline=self.pipeline_name,
-                                task=name,
-                                status="failed_abort"
-                            ).inc()
-                            TASK_DURATION.labels(
-                                pipeline=self.pipeline_name,
-                                task=name,
-                                status="failed_abort"
-                            ).observe(time.time() - self._summary.tasks[name].start_time)
+                            instruments.record("failed_abort", time.time() - self._summary.tasks[name].start_time)
                             raise
                     else:
+                        delay = self._retry_delay(task_model, attempt)
                         logger.warning(
                             f"⚠️ Task '{name}' (func={task_model.task}) failed with {exc!r} "
                             f"(attempt {attempt}/{max_attempts}). Retrying in {delay:.1f}s..."
                         )
                         if delay > 0:
-                            await asyncio.sleep(delay)
-
-                finally:
-                    # Restore environment
-                    if env_vars:
-                        for k, old_val in _old.items():
-                            if old_val is None:
-                                os.environ.pop(k, None)
-                            else:
-                                os.environ[k] = old_val
-
-        # Acquire semaphore if resource_tag is set
-        sem = None
-        tag = task_model.resource_tag
-        if tag and tag in self._resource_semaphores:
-            sem = self._resource_semaphores[tag]
-
-        if sem:
-            async with sem:
-                await execute()
-        else:
+                            with self._span("retry_wait", name):
+                                await asyncio.sleep(delay)
+
+        # Serialise calls of task functions that aren't thread-safe
+        lock = self._task_locks.get(task_model.task)
+
+        async with AsyncExitStack() as stack:
+            with self._gauge_queued.track_inprogress(), self._span("queue", name):
+                # Wait until the task's resource requests fit in the pools
+                await stack.enter_async_context(self._resources.hold(self._task_requests.get(name)))
+                if lock:
+                    await stack.enter_async_context(lock)
+            # The task's env, for task_environ() in it (and in the threads and
+            # processes it's dispatched to), without other tasks seeing it
+            if env_vars:
+                stack.enter_context(task_env(env_vars))
+                if name in self._env_fallback:
+                    # Its function reads os.environ: set the variables there, one
+                    # such task at a time
+                    with self._gauge_queued.track_inprogress(), self._span("queue", name):
+                        await stack.enter_async_context(self._environ_lock)
+                    stack.enter_context(process_env(env_vars))
             await execute()
 
+    def _emit_attempt(self, name: str, attempt: int, outcome: str, duration: float,
+                      error: Optional[BaseException] = None, retrying: bool = False) -> None:
+        if self._journal:
+            self._journal.emit(
+                "attempt", name, attempt=attempt, outcome=outcome, duration_secs=duration,
+                error=repr(error) if error is not None else None, retrying=retrying,
+            )
+
+    async def _acquire_token(self, limiter: RateLimiter, name: str) -> None:
+        """
+        limiter.acquire(), counted in novapipe_tasks_waiting_rate_limit.
+        """
+        with self._gauge_rate_limited.track_inprogress(), self._span("rate_limit", name):
+            await limiter.acquire()
+
+    def _hedge_delay(self, task_model: TaskModel) -> Optional[float]:
+        """
+        Seconds after which to launch a hedge: hedge_after itself, or for "pNN"
+        that percentile of the successful durations of other tasks using the
+        same function (None until _HEDGE_MIN_SAMPLES of them have finished).
+        """
+        hedge_after = task_model.hedge_after
+        if not isinstance(hedge_after, str):
+            return hedge_after
+        samples = self._sibling_durations.get(task_model.task, ())
+        if len(samples) < _HEDGE_MIN_SAMPLES:
+            return None
+        # nearest-rank percentile
+        pct = float(hedge_after[1:])
+        rank = max(1, math.ceil(pct / 100 * len(samples)))
+        return samples[rank - 1]
+
+    async def _call_hedged(self, name: str, task_model: TaskModel, func,
+                           params: Dict[str, Any], limiter: Optional[RateLimiter]) -> Any:
+        """
+        Run one attempt; if it hasn't finished after _hedge_delay(), start an
+        identical second attempt and return whichever succeeds first. The other
+        is cancelled; thread or process calls can't be interrupted, so they run
+        to completion and their result is dropped. Tasks must be idempotent.
+        Fails only if both attempts fail (with the original attempt's error).
+        """
+        primary = asyncio.ensure_future(self._dispatch(name, task_model, func, params))
+        delay = self._hedge_delay(task_model)
+        if delay is None:
+            return await primary
+
+        running = {primary}
+        hedge: Optional[asyncio.Future] = None
+        try:
+            done, _ = await asyncio.wait(running, timeout=delay)
+            if not done:
+                if limiter:
+                    await self._acquire_token(limiter, name)
+                logger.info(f"Task '{name}' still running after {delay:.3f}s; launching a hedge")
+                self._summary.tasks[name].hedges += 1
+                hedge = asyncio.ensure_future(self._dispatch(name, task_model, func, params))
+                running.add(hedge)
+
+            while running:
+                done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                # prefer the original attempt if both finished in the same tick
+                for fut in sorted(done, key=lambda f: f is not primary):
+                    if fut.exception() is None:
+                        if fut is hedge:
+                            self._summary.tasks[name].hedge_wins += 1
+                            logger.info(f"Task '{name}': hedge finished first")
+                        return fut.result()
+            return primary.result()  # both failed: raises the original error
+        finally:
+            for fut in (primary, hedge):
+                if fut is not None and not fut.done():
+                    fut.cancel()
+
+    def _breaker_for(self, task_model: TaskModel) -> Optional[CircuitBreaker]:
+        if task_model.circuit_breaker is None:
+            return None
+        return self._breakers[task_model.circuit_breaker.key or task_model.task]
+
+    def _may_retry(self, task_model: TaskModel, attempt: int, max_attempts: int,
+                   exc: BaseException) -> bool:
+        """
+        Whether a failed attempt gets another try: attempts remain, the exception
+        passes retry_on/give_up_on, the circuit isn't open, and the pipeline's
+        retry budget has a retry left (which this then spends).
+        """
+        if attempt >= max_attempts or isinstance(exc, CircuitOpenError):
+            return False
+        if task_model.give_up_on and exception_named(exc, task_model.give_up_on):
+            logger.info(f"Task '{task_model.name}': not retrying {type(exc).__name__} (give_up_on)")
+            return False
+        if task_model.retry_on and not exception_named(exc, task_model.retry_on):
+            logger.info(f"Task '{task_model.name}': not retrying {type(exc).__name__} (not in retry_on)")
+            return False
+        if not self._retry_budget.take():
+            logger.warning(
+                f"Task '{task_model.name}': pipeline retry budget "
+                f"({self._retry_budget.limit}) exhausted, not retrying"
+            )
+            return False
+        return True
+
+    def _retry_delay(self, task_model: TaskModel, attempt: int) -> float:
+        """
+        Seconds to wait after failed attempt number `attempt`: retry_delay, grown
+        exponentially (with jitter) if retry_backoff is set.
+        """
+        base = float(task_model.retry_delay or 0.0)
+        backoff = task_model.retry_backoff
+        if backoff is None:
+            return base
+        return backoff_delay(attempt, base, backoff.multiplier, backoff.max_delay, backoff.jitter)
+
+    def _rate_limiter_for(self, task_model: TaskModel) -> Optional[RateLimiter]:
+        if task_model.rate_limit is None:
+            return None
+        return self._rate_limiters.get(task_model.rate_limit_key or task_model.name)
+
+    def _rate_feedback(self, limiter: RateLimiter, started_at: float,
+                       latency: Optional[float] = None, exc: Optional[BaseException] = None) -> None:
+        """
+        Report one attempt's outcome to its rate limiter:
+          - RateLimited(retry_after=...) pauses the limiter
+          - adaptive limiters speed up on success and back off on overload:
+            RateLimited, timeouts, and exceptions named in rate_limit_adaptive.errors
+        """
+        retry_after = exc.retry_after if isinstance(exc, RateLimited) else None
+        if isinstance(limiter, AdaptiveRateLimiter):
+            if exc is None:
+                if latency is not None:
+                    limiter.on_success(latency, started_at)
+            elif isinstance(exc, (RateLimited, asyncio.TimeoutError)) or exception_named(
+                exc, self._overload_errors.get(limiter.key or "", ())
+            ):
+                limiter.on_overload(started_at, retry_after)
+            RATE_LIMIT_EFFECTIVE.labels(pipeline=self.pipeline_name, key=limiter.key).set(limiter.rate)
+        elif retry_after:
+            limiter.pause(retry_after)
+
     async def _run_layer(self, names: List[str]) -> None:
         """
         Given a batch of task-names, run them concurrently using asyncio.gather.
+        Tasks with the longest expected_duration hint are started first.
         """
-        coros = [self._run_single_task(n) for n in names]
+        names = sorted(names, key=self._expected_duration, reverse=True)
+        if self._tracer:
+            coros = [self._run_traced_task(n) for n in names]
+        else:
+            coros = [self._run_single_task(n) for n in names]
         await asyncio.gather(*coros)
 
-    def _topo_sort(self) -> List[str]:
+    async def _run_traced_task(self, name: str) -> None:
+        with self._span("task", name, function=self.tasks_by_name[name].task):
+            await self._run_single_task(name)
+
+    async def _run_layers(self, layers: List[List[str]]) -> None:
         """
-        Kahn's algorithm on self.indegree & self.adj to produce
-        a topologically sorted list of 'name' keys. Detects cycles.
+        Run each layer in sequence (tasks within a layer in parallel) on one event loop.
         """
-        queue = deque([n for n, deg in self.indegree.items() if deg == 0])
-        order: List[str] = []
-
-        while queue:
-            u = queue.popleft()
-            order.append(u)
-            for v in self.adj[u]:
-                self.indegree[v] -= 1
-                if self.indegree[v] == 0:
-                    queue.append(v)
-
-        if len(order) != len(self.tasks_by_name):
-            raise RuntimeError("Cycle detected in task dependencies")
+        for i, layer in enumerate(layers):
+            logger.info(f"Executing layer: {layer}")
+            with self._span("layer", None, index=i, tasks=len(layer)):
+                await self._run_layer(layer)
 
-        return order
+    def _topo_sort(self) -> List[str]:
+        """
+        Topologically sorted list of task names (layer by layer). Detects cycles.
+        """
+        names = self.graph.names
+        return [names[i] for i in self.graph.topo_order()]
 
     def run(self) -> PipelineRunSummary:
         """
@@ -685,22 +1296,51 @@ class PipelineRunner:
             logger.error(f"Missing registered functions: {missing}")
             raise RuntimeError(f"Missing registered functions: {missing}")
 
+        self._plan_placement()
+
         logger.info("Starting pipeline execution...")
         layers = self._compute_layers()
+        # Trace allocations for this run only (workers start their own tracing)
+        stop_tracemalloc = self._trace_malloc and not tracemalloc.is_tracing()
+        if stop_tracemalloc:
+            tracemalloc.start()
+        if self._journal:
+            self._journal.emit("run_start", pipeline=self.pipeline_name, tasks=len(self.tasks_by_name))
+        started = time.time()
+        status = "failed"
         # Run each layer in sequence, but tasks within each layer in parallel
-        for layer in layers:
-            logger.info(f"Executing layer: {layer}")
-            asyncio.run(self._run_layer(layer))
+        try:
+            with self._span("pipeline", None, pipeline=self.pipeline_name):
+                asyncio.run(self._run_layers(layers))
+            status = "success"
+        finally:
+            if self._journal:
+                self._journal.emit("run_end", pipeline=self.pipeline_name, status=status,
+                                   duration_secs=time.time() - started)
+            if stop_tracemalloc:
+                tracemalloc.stop()
+            if self._process_pool is not None:
+                self._process_pool.shutdown()
+                self._process_pool = None
 
         # Return the summary for further handling (e.g., JSON export)
         return self._summary
 
+    @property
+    def summary(self) -> PipelineRunSummary:
+        """
+        The summary so far: after a failed run(), it holds the tasks that
+        finished (or were running, with status None) before the failure.
+        """
+        return self._summary
+
     def print_dag(self) -> None:
         """
         ASCII view of each task name and its dependencies.
         """
-        for name, t in self.tasks_by_name.items():
-            deps = ", ".join(t.depends_on) if t.depends_on else "—"
+        names = self.graph.names
+        for i, name in enumerate(names):
+            deps = ", ".join(names[p] for p in self.graph.predecessors(i)) or "—"
             logger.info(f"{name:20} depends on → {deps}")
 
     def to_dot(self) -> str:
@@ -724,9 +1364,10 @@ class PipelineRunner:
         lines.append("")  # blank line before edges
 
         # Declare edges
-        for name, t in self.tasks_by_name.items():
-            for dep_name in t.depends_on:
-                lines.append(f'    "{dep_name}" -> "{name}";')
+        names = self.graph.names
+        for i, name in enumerate(names):
+            for p in self.graph.predecessors(i):
+                lines.append(f'    "{names[p]}" -> "{name}";')
 
         lines.append("}")
         return "\n".join(lines)
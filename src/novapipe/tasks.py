@@ -1,21 +1,70 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
 import os
 import sys
-import importlib
 import tempfile
 from importlib_metadata import distributions, EntryPoint
-import boto3
-from typing import Callable, Dict, Any
+from typing import TYPE_CHECKING, Callable, Dict, Any, List, Optional, Tuple, Type, get_type_hints
 import random
 
+from .paths import cache_dir, caching_disabled
+
+if TYPE_CHECKING:
+    from pydantic import BaseModel
+
+
+class TaskRegistry(dict):
+    """
+    Task name -> function. load_plugins() only records which entry point provides
+    each plugin task; the plugin module is imported the first time the task is
+    looked up (registry[name], get, or `in` followed by either).
+    """
+    def __init__(self):
+        super().__init__()
+        # task name -> (dist_name, dist_version, entry point) not imported yet
+        self.pending: Dict[str, Tuple[str, str, EntryPoint]] = {}
+
+    def __missing__(self, name: str) -> Callable:
+        if name not in self.pending:
+            raise KeyError(name)
+        dist_name, dist_version, ep = self.pending.pop(name)
+        func = ep.load()
+        self[name] = func
+        return func
+
+    def __contains__(self, name) -> bool:
+        return dict.__contains__(self, name) or name in self.pending
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def clear(self) -> None:
+        super().clear()
+        self.pending.clear()
+
+    def load_all(self) -> None:
+        """
+        Import every pending plugin task (e.g. to list them with their docstrings).
+        """
+        for name in list(self.pending):
+            self[name]
+
+
 # Global registry of tasks
-task_registry: Dict[str, Callable[[dict], None]] = {}
+task_registry: TaskRegistry = TaskRegistry()
 
 # global pins: dist_name -> version
 _plugin_pins: Dict[str, str] = {}
 
+# task name -> (dist_name, dist_version, entry point value) registered by load_plugins()
+_plugin_sources: Dict[str, Tuple[str, str, str]] = {}
+
 
 def set_plugin_pins(pins: Dict[str, str]) -> None:
     """
@@ -26,32 +75,298 @@ def set_plugin_pins(pins: Dict[str, str]) -> None:
     _plugin_pins = pins
 
 
-def task(func: Callable[[dict], None]) -> Callable[[dict], None]:
+class RateLimited(Exception):
+    """
+    Raise from a task when the service it calls is throttling it (e.g. an HTTP
+    429/503). If `retry_after` is given (seconds, as in a Retry-After header),
+    the task's rate limiter admits no further calls until it has passed; with
+    `rate_limit_adaptive`, the limiter also lowers its rate.
+    """
+    def __init__(self, message: str = "rate limited", retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    def __reduce__(self):
+        # keep retry_after when raised in a process-pool worker
+        return (type(self), (str(self), self.retry_after))
+
+
+# Accepted values for the @task placement hints
+TASK_KINDS = ("io", "cpu")
+EXECUTORS = ("inline", "thread", "process")
+
+# Tasks expected to finish faster than this (seconds) are considered trivial
+TRIVIAL_DURATION = 0.0002
+
+
+class TaskSpec:
+    """
+    Metadata attached to a task function by the @task decorator:
+      - schema: pydantic model used to validate rendered params (or None); the
+        declaration is compiled on first access, so importing a module full of
+        tasks doesn't import pydantic
+      - kind: "io" (default) or "cpu"; CPU-bound tasks are placed in a process pool
+      - expected_duration: typical runtime in seconds; longer tasks start first
+      - memory_estimate: typical peak memory in bytes
+      - thread_safe: if False, calls of this task never overlap in the thread pool
+      - executor: preferred executor ("inline", "thread" or "process"), overriding `kind`
+      - trivial: if True, the task is cheap enough to run inline on the event loop
+    """
+    def __init__(
+        self,
+        schema: Any = None,
+        kind: str = "io",
+        expected_duration: Optional[float] = None,
+        memory_estimate: Optional[int] = None,
+        thread_safe: bool = True,
+        executor: Optional[str] = None,
+        trivial: bool = False,
+        name: str = "Task",
+    ):
+        self._schema_decl = schema
+        self._schema: Optional[Type[BaseModel]] = None
+        self.name = name
+        self.kind = kind
+        self.expected_duration = expected_duration
+        self.memory_estimate = memory_estimate
+        self.thread_safe = thread_safe
+        self.executor = executor
+        self.trivial = trivial
+
+    @property
+    def schema(self) -> Optional[Type[BaseModel]]:
+        if self._schema is None and self._schema_decl is not None:
+            self._schema = compile_schema(self._schema_decl, self.name)
+        return self._schema
+
+    @property
+    def placement(self) -> str:
+        """
+        Executor this task should run on: the explicit preference if given,
+        else "inline" for trivial tasks, "process" for CPU-bound tasks and
+        "thread" for everything else.
+        """
+        if self.executor:
+            return self.executor
+        if self.trivial or (
+            self.expected_duration is not None and self.expected_duration <= TRIVIAL_DURATION
+        ):
+            return "inline"
+        return "process" if self.kind == "cpu" else "thread"
+
+    def validate(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Validate (and coerce) params against the schema, returning a plain dict.
+        Params the schema doesn't declare are passed through unchanged, even if
+        the model would ignore them. Without a schema, params are returned untouched.
+        """
+        schema = self.schema
+        if schema is None:
+            return params
+        validated = schema.model_validate(params).model_dump()
+        declared = set(schema.model_fields)
+        declared.update(f.alias for f in schema.model_fields.values() if f.alias)
+        for key, value in params.items():
+            if key not in declared:
+                validated.setdefault(key, value)
+        return validated
+
+
+# Spec used for functions registered without @task (e.g. bare plugin callables)
+_DEFAULT_SPEC = TaskSpec()
+
+
+def compile_schema(schema: Any, name: str = "Task") -> Type[BaseModel]:
+    """
+    Build a pydantic model from a task schema declaration. Accepts:
+      - a pydantic BaseModel subclass (used as-is)
+      - a plain class with annotations, e.g.
+            class Params:
+                path: str
+                content: str = ""
+      - a dict of field -> type, or field -> (type, default)
+    Models built from annotations or dicts keep unknown keys (extra="allow"),
+    so tasks still receive every param that was passed.
+    """
+    from pydantic import BaseModel, ConfigDict, create_model
+
+    if isinstance(schema, type) and issubclass(schema, BaseModel):
+        return schema
+
+    fields: Dict[str, Any] = {}
+    if isinstance(schema, dict):
+        for fname, decl in schema.items():
+            fields[fname] = decl if isinstance(decl, tuple) else (decl, ...)
+    elif isinstance(schema, type):
+        for fname, ann in get_type_hints(schema).items():
+            fields[fname] = (ann, getattr(schema, fname, ...))
+    else:
+        raise TypeError(f"Unsupported schema for task '{name}': {schema!r}")
+
+    return create_model(
+        f"{name}_params",
+        __config__=ConfigDict(extra="allow"),
+        **fields,
+    )
+
+
+def get_task_spec(func: Callable) -> TaskSpec:
+    """
+    Return the TaskSpec attached by @task, or an empty spec for plain callables.
+    """
+    return getattr(func, "_novapipe_spec", _DEFAULT_SPEC)
+
+
+def task(
+    func: Optional[Callable] = None,
+    *,
+    name: Optional[str] = None,
+    schema: Any = None,
+    kind: str = "io",
+    expected_duration: Optional[float] = None,
+    memory_estimate: Optional[int] = None,
+    thread_safe: bool = True,
+    executor: Optional[str] = None,
+    trivial: bool = False,
+) -> Callable:
     """
     Decorator to register a function (sync or async) as a NovaPipe task.
     Usage:
-    @task()
-    def my_task(param1, param2):
+    @task
+    def my_task(params):
         ...
+
+    @task(schema={"path": str, "retries": (int, 3)}, kind="cpu")
+    def my_task(params):
+        ...
+
+    The schema is compiled once, the first time it's needed; the runner validates the
+    rendered params against it before dispatching the task. The remaining
+    keyword arguments are placement hints (see TaskSpec) used by the scheduler.
+    """
+    if kind not in TASK_KINDS:
+        raise ValueError(f"Invalid task kind {kind!r}; expected one of {TASK_KINDS}")
+    if executor is not None and executor not in EXECUTORS:
+        raise ValueError(f"Invalid executor {executor!r}; expected one of {EXECUTORS}")
+    if schema is not None and not isinstance(schema, (dict, type)):
+        raise TypeError(f"Unsupported schema for task '{name}': {schema!r}")
+
+    def register(fn: Callable) -> Callable:
+        task_name = name or fn.__name__
+        setattr(fn, "_novapipe_spec", TaskSpec(
+            schema=schema,
+            name=task_name,
+            kind=kind,
+            expected_duration=expected_duration,
+            memory_estimate=memory_estimate,
+            thread_safe=thread_safe,
+            executor=executor,
+            trivial=trivial,
+        ))
+        task_registry[task_name] = fn
+        return fn
+
+    if func is not None:
+        return register(func)
+    return register
+
+
+# Bump when the layout of the plugin index file changes
+PLUGIN_INDEX_FORMAT = 1
+
+# index file path -> entries, so repeated load_plugins() calls don't re-read it
+_plugin_index_memo: Dict[str, List[Tuple[str, str, str, str]]] = {}
+
+
+def _site_fingerprint() -> str:
+    """
+    Hash of the import path and each entry's mtime. Installing or removing a
+    distribution adds or deletes its .dist-info directory, which changes the
+    mtime of the directory holding it.
+    """
+    key = hashlib.sha256(f"{PLUGIN_INDEX_FORMAT}\0{sys.version}".encode())
+    for entry in sys.path:
+        try:
+            mtime = os.stat(entry or ".").st_mtime_ns
+        except OSError:
+            continue
+        key.update(f"\0{entry}\0{mtime}".encode())
+    return key.hexdigest()
+
+
+def _scan_plugin_entry_points() -> List[Tuple[str, str, str, str]]:
+    entries = []
+    for dist in distributions():
+        dist_name = dist.metadata.get("Name", dist.name)
+        dist_version = dist.version
+        for ep in dist.entry_points:
+            if ep.group == "novapipe.plugins":
+                entries.append((ep.name, dist_name, dist_version, ep.value))
+    return entries
+
+
+def plugin_index() -> List[Tuple[str, str, str, str]]:
+    """
+    Every 'novapipe.plugins' entry point as (task_name, dist_name, dist_version, value).
+
+    Scanning all installed distributions is slow, so the result is stored under
+    the cache directory, keyed by the state of sys.path, and only rebuilt when a
+    package is installed or removed. NOVAPIPE_NO_CACHE=1 always rescans.
     """
-    task_registry[func.__name__] = func
-    return func
+    if caching_disabled():
+        return _scan_plugin_entry_points()
+
+    path = cache_dir() / "plugins" / f"{_site_fingerprint()}.json"
+    memo_key = str(path)
+    if memo_key in _plugin_index_memo:
+        return _plugin_index_memo[memo_key]
+
+    entries: Optional[List[Tuple[str, str, str, str]]] = None
+    try:
+        with open(path, encoding="utf-8") as f:
+            entries = [tuple(e) for e in json.load(f)["entries"]]
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logging.getLogger("novapipe").warning(f"Ignoring unreadable plugin index {path}: {e!r}")
+
+    if entries is None:
+        entries = _scan_plugin_entry_points()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"entries": entries}, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            logging.getLogger("novapipe").warning(f"Could not write plugin index {path}: {e!r}")
+
+    _plugin_index_memo[memo_key] = entries
+    return entries
+
+
+def plugin_origin(task_name: str) -> Optional[Tuple[str, str, str]]:
+    """
+    (dist_name, dist_version, entry point value) of the plugin that registered
+    task_name, or None for built-in and locally defined tasks.
+    """
+    return _plugin_sources.get(task_name)
 
 
 def load_plugins() -> None:
     """
-    Discover and load external plugins via entry point group 'novapipe.plugins'.
+    Discover external plugins via entry point group 'novapipe.plugins'.
     Plugins should define entry_points in their own pyproject.
+
+    Discovery uses the cached plugin_index(); plugin modules themselves are only
+    imported when one of their tasks is looked up in task_registry.
     """
 
     # Gather all (dist_name, dist_version, entry_point) tuples
     ep_map: Dict[str, list[tuple[str, str, EntryPoint]]] = {}
-    for dist in distributions():
-        dist_name = dist.metadata.get("Name", dist.name)
-        dist_version = dist.version
-        for ep in dist.entry_points:
-            if ep.group == "novapipe.plugins":
-                ep_map.setdefault(ep.name, []).append((dist_name, dist_version, ep))
+    for task_name, dist_name, dist_version, value in plugin_index():
+        ep = EntryPoint(name=task_name, value=value, group="novapipe.plugins")
+        ep_map.setdefault(task_name, []).append((dist_name, dist_version, ep))
 
     # Resolve and register
     errors: list[str] = []
@@ -76,15 +391,20 @@ def load_plugins() -> None:
                 )
                 continue
 
-        # load and register
-        func = ep.load()
+        # register (imported on first lookup)
+        source = (dist_name, dist_version, ep.value)
+        if _plugin_sources.get(task_name) == source and task_name in task_registry:
+            # already registered by an earlier call
+            continue
         if task_name in task_registry:
             # overriding a built-in or earlier plugin; warn or allow if pinned
             logging.getLogger("novapipe").warning(
                 f"Task '{task_name}' from plugin {dist_name}=={dist_version} "
                 f"is overriding existing registration"
             )
-        task_registry[task_name] = func
+            dict.pop(task_registry, task_name, None)
+        task_registry.pending[task_name] = (dist_name, dist_version, ep)
+        _plugin_sources[task_name] = source
 
     if errors:
         raise RuntimeError("Plugin load errors:\n  " + "\n  ".join(errors))
@@ -92,7 +412,7 @@ def load_plugins() -> None:
 
 # ──────────────── Built-in Tasks ────────────────
 
-@task
+@task(trivial=True)
 def print_message(params: Dict) -> None:
     """
     A simple built-in task that prints the "message" field from params.
@@ -108,7 +428,7 @@ def print_message(params: Dict) -> None:
     print(msg)
 
 
-@task
+@task(schema={"seconds": (float, 1), "message": (str, "")})
 async def async_wait_and_print(params: Dict) -> None:
     """
     An example async task that waits N seconds, then prints a message.
@@ -141,7 +461,7 @@ def maybe_fail(params: Dict) -> None:
     print(f"✅ maybe_fail succeeded (attempt_id={attempt_id})")
 
 
-@task
+@task(schema={"base": (Optional[str], None)})
 def create_temp_dir(params: Dict) -> str:
     """
     Create a unique temporary directory under `base`. Return its path.
@@ -153,7 +473,7 @@ def create_temp_dir(params: Dict) -> str:
     return tmpdir
 
 
-@task
+@task(schema={"path": str, "content": (str, "")})
 def write_text_file(params: Dict) -> str:
     """
     Create a text file at `path` with content `content`. Return the file path.
@@ -169,7 +489,7 @@ def write_text_file(params: Dict) -> str:
     return path
 
 
-@task
+@task(schema={"path": str})
 def count_file_lines(params: Dict) -> int:
     """
     Count the number of lines in the file at `path`. Return the integer count.
@@ -181,7 +501,7 @@ def count_file_lines(params: Dict) -> int:
         return sum(1 for _ in f)
 
 
-@task
+@task(trivial=True)
 def return_value(params: Dict) -> Any:
     """
     Return whatever is in params['value'].
@@ -189,7 +509,7 @@ def return_value(params: Dict) -> Any:
     return params.get("value")
 
 
-@task
+@task(trivial=True)
 def wrap_text(params: Dict) -> str:
     """
     Return 'WRAPPED: <input!r>' where input = params['input'].
@@ -198,7 +518,7 @@ def wrap_text(params: Dict) -> str:
     return f"WRAPPED: {inp!r}"
 
 
-@task
+@task(trivial=True)
 def echo(params: Dict) -> Any:
     """
     Print and return params['message'].
@@ -208,7 +528,7 @@ def echo(params: Dict) -> Any:
     return msg
 
 
-@task
+@task(trivial=True)
 def analyze_data(params):
     # returns a dict of multiple useful stats
     return {
@@ -218,11 +538,13 @@ def analyze_data(params):
     }
 
 
-@task
+@task(schema={"bucket": str, "key": str, "path": str})
 def upload_file_s3(params: Dict[str, str]) -> str:
     """
     Uploads a local file at `path` to S3 bucket/key, returns the S3 URI.
     """
+    import boto3  # heavy; only needed by this task
+
     s3 = boto3.client("s3")
     bucket = params["bucket"]
     key = params["key"]
@@ -231,14 +553,14 @@ def upload_file_s3(params: Dict[str, str]) -> str:
     return f"s3://{bucket}/{key}"
 
 
-@task
+@task(trivial=True)
 def extract_data(params: Dict[str, Any]) -> Any:
     """
     Stub extract_data: returns the `source` param so we can see it ran.
     """
     return params.get("source")
 
-@task
+@task(trivial=True)
 def transform_data(params: Dict[str, Any]) -> Any:
     """
     Stub transform_data: tags the data as transformed.
@@ -246,7 +568,7 @@ def transform_data(params: Dict[str, Any]) -> Any:
     src = params.get("source") or params.get("extracted")
     return f"transformed({src})"
 
-@task
+@task(trivial=True)
 def load_data(params: Dict[str, Any]) -> str:
     """
     Stub load_data: prints and returns a load message.
@@ -256,7 +578,7 @@ def load_data(params: Dict[str, Any]) -> str:
     return msg
 
 
-@task
+@task(trivial=True)
 def call_api(params: Dict[str, Any]) -> Any:
     """
     Stub call_api: pretend to fetch from `url` by returning a marker string.
@@ -265,7 +587,7 @@ def call_api(params: Dict[str, Any]) -> Any:
     return f"fetched:{url}"
 
 
-@task
+@task(trivial=True)
 def aggregate_results(params: Dict[str, Any]) -> Any:
     """
     Stub aggregate_results: just return whatever was passed in.
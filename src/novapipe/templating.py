@@ -0,0 +1,108 @@
+import marshal
+from typing import Any, Dict, Iterable, Iterator
+
+import jinja2
+
+
+def make_environment() -> jinja2.Environment:
+    """
+    The Jinja2 environment NovaPipe renders params, env, run_if/run_unless and
+    branch expressions with: strict undefined, no autoescaping, and a few
+    Python built-ins available in templates.
+    """
+    env = jinja2.Environment(
+        undefined=jinja2.StrictUndefined,
+        autoescape=False
+    )
+    env.globals.update({
+        'int': int,
+        'float': float,
+        'str': str,
+        'bool': bool,
+        'len': len,
+    })
+    return env
+
+
+def is_static(source: str) -> bool:
+    """
+    True if rendering source would return it unchanged, so Jinja2 can be skipped.
+    (Jinja2 drops a single trailing newline, hence the second check.)
+    """
+    return "{" not in source and not source.endswith("\n")
+
+
+def contains_template(value: Any) -> bool:
+    """
+    True if value (or anything nested in it) holds a Jinja2 expression or statement.
+    """
+    if isinstance(value, str):
+        return "{{" in value or "{%" in value
+    if isinstance(value, dict):
+        return any(contains_template(v) for v in value.values())
+    if isinstance(value, list):
+        return any(contains_template(v) for v in value)
+    return False
+
+
+def iter_template_strings(value: Any) -> Iterator[str]:
+    """
+    Yield every non-static string nested in value.
+    """
+    if isinstance(value, str):
+        if not is_static(value):
+            yield value
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from iter_template_strings(v)
+    elif isinstance(value, list):
+        for v in value:
+            yield from iter_template_strings(v)
+
+
+class TemplateCache:
+    """
+    Compiles each distinct template source once per environment. Compiled code
+    can be exported as marshalled bytes (as Jinja2's own bytecode cache does) and
+    preloaded later, skipping the Jinja2 compiler entirely.
+    """
+    def __init__(self, env: jinja2.Environment):
+        self.env = env
+        self._templates: Dict[str, jinja2.Template] = {}
+        self._code: Dict[str, bytes] = {}
+
+    def get(self, source: str) -> jinja2.Template:
+        tmpl = self._templates.get(source)
+        if tmpl is None:
+            code = self._code.pop(source, None)
+            if code is not None:
+                tmpl = self.env.template_class.from_code(
+                    self.env, marshal.loads(code), self.env.make_globals(None), None
+                )
+            else:
+                tmpl = self.env.from_string(source)
+            self._templates[source] = tmpl
+        return tmpl
+
+    def preload(self, code: Dict[str, bytes]) -> None:
+        """
+        Register precompiled code (from export_code); templates are built lazily.
+        """
+        for source, blob in code.items():
+            if source not in self._templates:
+                self._code[source] = blob
+
+    def export_code(self, sources: Iterable[str]) -> Dict[str, bytes]:
+        """
+        Compile sources to Python code objects and marshal them.
+        Templates with syntax errors are skipped; they fail when rendered.
+        """
+        out: Dict[str, bytes] = {}
+        for source in sources:
+            if source in out:
+                continue
+            try:
+                out[source] = marshal.dumps(self.env.compile(source))
+            except jinja2.TemplateSyntaxError:
+                continue
+        return out
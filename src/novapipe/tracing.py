@@ -0,0 +1,148 @@
+import itertools
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("novapipe")
+
+TRACE_FORMATS = ("chrome", "otlp")
+
+# Id of the innermost open span in this context (asyncio task or thread)
+_current_span: ContextVar[Optional[int]] = ContextVar("novapipe_current_span", default=None)
+
+
+class Span:
+    """
+    One timed phase: times are time.monotonic_ns() values, which are comparable
+    across the threads and worker processes of a run.
+    """
+    __slots__ = ("span_id", "parent_id", "name", "task", "start_ns", "end_ns", "attrs")
+
+    def __init__(self, span_id: int, parent_id: Optional[int], name: str, task: Optional[str],
+                 start_ns: int, end_ns: int, attrs: Dict[str, Any]):
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.task = task
+        self.start_ns = start_ns
+        self.end_ns = end_ns
+        self.attrs = attrs
+
+
+class Tracer:
+    """
+    Collects the spans of one pipeline run and exports them as:
+      - "chrome": Chrome trace-event JSON (chrome://tracing, Perfetto), one track per task
+      - "otlp": OpenTelemetry OTLP/JSON (ExportTraceServiceRequest), one trace per run
+    """
+    def __init__(self, pipeline: str = "pipeline"):
+        self.pipeline = pipeline
+        self.spans: List[Span] = []
+        self._ids = itertools.count(1)
+        # Converts monotonic times to Unix time for OTLP
+        self._wall_offset_ns = time.time_ns() - time.monotonic_ns()
+
+    @contextmanager
+    def span(self, name: str, task: Optional[str] = None, **attrs: Any) -> Iterator[None]:
+        """
+        Time the block as a child of the enclosing span (if any).
+        """
+        span_id = next(self._ids)
+        parent_id = _current_span.get()
+        token = _current_span.set(span_id)
+        start = time.monotonic_ns()
+        try:
+            yield
+        except BaseException as e:
+            attrs["error"] = repr(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.spans.append(Span(span_id, parent_id, name, task, start, time.monotonic_ns(), attrs))
+
+    def add(self, name: str, task: Optional[str], start_ns: int, end_ns: int, **attrs: Any) -> None:
+        """
+        Record a span measured elsewhere (e.g. in an executor), under the current span.
+        """
+        self.spans.append(
+            Span(next(self._ids), _current_span.get(), name, task, start_ns, end_ns, attrs)
+        )
+
+    def to_chrome(self) -> Dict[str, Any]:
+        tracks: Dict[Optional[str], int] = {None: 0}
+        events: List[Dict[str, Any]] = []
+        origin = min((s.start_ns for s in self.spans), default=0)
+        for s in sorted(self.spans, key=lambda s: (s.start_ns, -s.end_ns)):
+            tid = tracks.setdefault(s.task, len(tracks))
+            args = dict(s.attrs)
+            if s.task is not None:
+                args["task"] = s.task
+            events.append({
+                "name": s.name,
+                "cat": "novapipe",
+                "ph": "X",
+                "ts": (s.start_ns - origin) / 1000,
+                "dur": (s.end_ns - s.start_ns) / 1000,
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": args,
+            })
+        for task, tid in tracks.items():
+            events.append({
+                "name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+                "args": {"name": task if task is not None else self.pipeline},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_otlp(self) -> Dict[str, Any]:
+        trace_id = os.urandom(16).hex()
+        # Span ids are random per export, as OTLP requires them to be unique per trace
+        prefix = os.urandom(4).hex()
+
+        def span_id(n: int) -> str:
+            return f"{prefix}{n:08x}"
+
+        def attribute(key: str, value: Any) -> Dict[str, Any]:
+            if isinstance(value, bool):
+                return {"key": key, "value": {"boolValue": value}}
+            if isinstance(value, int):
+                return {"key": key, "value": {"intValue": str(value)}}
+            if isinstance(value, float):
+                return {"key": key, "value": {"doubleValue": value}}
+            return {"key": key, "value": {"stringValue": str(value)}}
+
+        spans = []
+        for s in self.spans:
+            attrs = [attribute(k, v) for k, v in s.attrs.items()]
+            if s.task is not None:
+                attrs.append(attribute("novapipe.task", s.task))
+            spans.append({
+                "traceId": trace_id,
+                "spanId": span_id(s.span_id),
+                "parentSpanId": span_id(s.parent_id) if s.parent_id else "",
+                "name": s.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(s.start_ns + self._wall_offset_ns),
+                "endTimeUnixNano": str(s.end_ns + self._wall_offset_ns),
+                "attributes": attrs,
+                "status": {"code": 2, "message": s.attrs["error"]} if "error" in s.attrs else {},
+            })
+        return {"resourceSpans": [{
+            "resource": {"attributes": [
+                attribute("service.name", "novapipe"),
+                attribute("novapipe.pipeline", self.pipeline),
+            ]},
+            "scopeSpans": [{"scope": {"name": "novapipe"}, "spans": spans}],
+        }]}
+
+    def write(self, path: str, fmt: str = "chrome") -> None:
+        if fmt not in TRACE_FORMATS:
+            logger.error(f"Unknown trace format {fmt!r}")
+            raise ValueError(f"Unknown trace format {fmt!r}; expected one of {TRACE_FORMATS}")
+        data = self.to_chrome() if fmt == "chrome" else self.to_otlp()
+        with open(path, "w") as f:
+            json.dump(data, f)
@@ -0,0 +1,136 @@
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import resource
+    _HAS_RESOURCE = True
+except ImportError:
+    _HAS_RESOURCE = False
+
+# Per-thread rusage (Linux); elsewhere thread CPU time comes from time.thread_time()
+_RUSAGE_THREAD = getattr(resource, "RUSAGE_THREAD", None) if _HAS_RESOURCE else None
+
+# ru_maxrss is in kilobytes on Linux, bytes on macOS
+_MAXRSS_BYTES = 1 if sys.platform == "darwin" else 1024
+
+_IO_PATH = "/proc/thread-self/io"
+
+
+class ResourceUsage:
+    """
+    Resources used by a task, summed over its attempts (None: not measured):
+      - cpu_user_secs / cpu_system_secs: CPU time of the thread or worker process
+        that ran it (without per-thread rusage, all CPU time counts as user)
+      - max_rss_delta_bytes: how far the process's peak RSS rose while it ran
+      - alloc_peak_bytes: peak Python allocations above the starting point
+        (only with tracemalloc enabled)
+      - read_bytes / write_bytes: bytes through read/write system calls, files
+        and sockets alike (Linux only)
+    """
+    __slots__ = ("cpu_user_secs", "cpu_system_secs", "max_rss_delta_bytes",
+                 "alloc_peak_bytes", "read_bytes", "write_bytes")
+
+    def __init__(self, cpu_user_secs: Optional[float] = None, cpu_system_secs: Optional[float] = None,
+                 max_rss_delta_bytes: Optional[int] = None, alloc_peak_bytes: Optional[int] = None,
+                 read_bytes: Optional[int] = None, write_bytes: Optional[int] = None):
+        self.cpu_user_secs = cpu_user_secs
+        self.cpu_system_secs = cpu_system_secs
+        self.max_rss_delta_bytes = max_rss_delta_bytes
+        self.alloc_peak_bytes = alloc_peak_bytes
+        self.read_bytes = read_bytes
+        self.write_bytes = write_bytes
+
+    def __reduce__(self):
+        return ResourceUsage, tuple(getattr(self, f) for f in self.__slots__)
+
+    def add(self, other: "ResourceUsage") -> None:
+        """
+        Fold in another attempt: totals for CPU and I/O, maxima for memory.
+        """
+        for field in ("cpu_user_secs", "cpu_system_secs", "read_bytes", "write_bytes"):
+            mine, theirs = getattr(self, field), getattr(other, field)
+            if theirs is not None:
+                setattr(self, field, theirs if mine is None else mine + theirs)
+        for field in ("max_rss_delta_bytes", "alloc_peak_bytes"):
+            mine, theirs = getattr(self, field), getattr(other, field)
+            if theirs is not None:
+                setattr(self, field, theirs if mine is None else max(mine, theirs))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+def _io_counters() -> Optional[Tuple[int, int, int]]:
+    """
+    (rchar, wchar, size of this read): reading the file counts towards rchar
+    only after its contents were produced.
+    """
+    try:
+        with open(_IO_PATH, "rb") as f:
+            data = f.read()
+        fields = dict(line.split(b": ", 1) for line in data.splitlines())
+        return int(fields[b"rchar"]), int(fields[b"wchar"]), len(data)
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _cpu(in_worker: bool) -> Tuple[float, Optional[float]]:
+    if _RUSAGE_THREAD is not None:
+        ru = resource.getrusage(_RUSAGE_THREAD)
+        return ru.ru_utime, ru.ru_stime
+    if in_worker and _HAS_RESOURCE:
+        # a worker process runs one task at a time
+        ru = resource.getrusage(resource.RUSAGE_SELF)
+        return ru.ru_utime, ru.ru_stime
+    return time.thread_time(), None
+
+
+def _max_rss() -> Optional[int]:
+    if not _HAS_RESOURCE:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_BYTES
+
+
+def alloc_peak_supported() -> bool:
+    """
+    Whether peak allocations can be measured per task (tracemalloc.reset_peak,
+    Python 3.9+).
+    """
+    return hasattr(tracemalloc, "reset_peak")
+
+
+def start(trace_malloc: bool = False, in_worker: bool = False):
+    """
+    Take the starting readings for stop(), in the thread about to run the task.
+    Without alloc_peak_supported(), trace_malloc is ignored.
+    """
+    alloc_base = None
+    if trace_malloc and alloc_peak_supported():
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        alloc_base = tracemalloc.get_traced_memory()[0]
+    return _cpu(in_worker), _max_rss(), _io_counters(), alloc_base, in_worker
+
+
+def stop(token) -> ResourceUsage:
+    """
+    Usage since start(token), in the same thread.
+    """
+    (user0, sys0), rss0, io0, alloc_base, in_worker = token
+    user1, sys1 = _cpu(in_worker)
+    rss1 = _max_rss()
+    io1 = _io_counters()
+    usage = ResourceUsage(
+        cpu_user_secs=user1 - user0,
+        cpu_system_secs=None if sys0 is None else sys1 - sys0,
+        max_rss_delta_bytes=None if rss0 is None else rss1 - rss0,
+    )
+    if io0 is not None and io1 is not None:
+        usage.read_bytes = io1[0] - io0[0] - io0[2]
+        usage.write_bytes = io1[1] - io0[1]
+    if alloc_base is not None:
+        usage.alloc_peak_bytes = max(0, tracemalloc.get_traced_memory()[1] - alloc_base)
+    return usage
@@ -17,6 +17,16 @@ def aws_credentials_env():
     # cleanup if needed
 
 
+@pytest.fixture(autouse=True)
+def novapipe_cache_dir(tmp_path_factory, monkeypatch):
+    """
+    Keep compiled plans, run history and other NovaPipe files out of the user's home directory.
+    """
+    monkeypatch.setenv("NOVAPIPE_CACHE_DIR", str(tmp_path_factory.mktemp("novapipe-cache")))
+    monkeypatch.setenv("NOVAPIPE_DATA_DIR", str(tmp_path_factory.mktemp("novapipe-data")))
+    monkeypatch.delenv("NOVAPIPE_HISTORY_DB", raising=False)
+
+
 @pytest.fixture
 def s3_bucket():
     """
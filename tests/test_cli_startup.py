@@ -0,0 +1,66 @@
+"""
+Cold-start guard for the CLI: commands that don't execute pipelines must not
+import the heavy dependencies, and each must start within a time budget.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC = str(Path(__file__).resolve().parents[1] / "src")
+
+HEAVY = ["boto3", "botocore", "pydantic", "jinja2", "yaml", "prometheus_client", "rich",
+         "novapipe.runner", "novapipe.plan"]
+
+# Seconds for importing the CLI and running the command: about 60 ms today, so
+# this catches a regression of several times that while leaving room for slow CI
+# machines. The heavy-module check above does most of the work.
+BUDGET = float(os.environ.get("NOVAPIPE_STARTUP_BUDGET", "0.5"))
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+from novapipe.cli import cli
+try:
+    cli.main(args=sys.argv[1:], prog_name="novapipe", standalone_mode=False)
+except SystemExit:
+    pass
+elapsed = time.perf_counter() - t0
+heavy = [m for m in {heavy!r} if m in sys.modules]
+sys.stderr.write(json.dumps({{"heavy": heavy, "elapsed": elapsed}}) + "\\n")
+"""
+
+
+def _cold_start(*args):
+    env = dict(os.environ, PYTHONPATH=SRC + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    proc = subprocess.run(
+        [sys.executable, "-c", PROBE.format(heavy=HEAVY), *args],
+        capture_output=True, text=True, env=env, timeout=60,
+    )
+    return json.loads(proc.stderr.strip().splitlines()[-1])
+
+
+@pytest.fixture
+def summary_file(tmp_path):
+    p = tmp_path / "summary.json"
+    p.write_text(json.dumps({"tasks": [
+        {"name": "a", "status": "success", "attempts": 1, "duration_secs": 0.01, "error": None},
+    ]}))
+    return str(p)
+
+
+@pytest.mark.parametrize("args", [
+    ["--help"],
+    ["run", "--help"],
+    ["report", "SUMMARY"],
+    ["plugin", "list"],
+    ["tutorial", "print_message"],
+])
+def test_light_commands_skip_heavy_imports(args, summary_file):
+    args = [summary_file if a == "SUMMARY" else a for a in args]
+    result = _cold_start(*args)
+    assert result["heavy"] == []
+    assert result["elapsed"] < BUDGET
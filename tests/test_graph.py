@@ -0,0 +1,94 @@
+import yaml
+import pytest
+
+from novapipe.graph import TaskGraph, CycleError
+from novapipe.runner import PipelineRunner
+
+
+def test_csr_adjacency_and_layers():
+    g = TaskGraph(["a", "b", "c", "d"], [[], ["a"], ["a"], ["b", "c"]])
+    assert len(g) == 4 and g.edge_count == 4
+    assert list(g.successors(g.index["a"])) == [g.index["b"], g.index["c"]]
+    assert list(g.predecessors(g.index["d"])) == [g.index["b"], g.index["c"]]
+    assert list(g.indegree) == [0, 1, 1, 2]
+    assert [[g.names[i] for i in layer] for layer in g.layers()] == [["a"], ["b", "c"], ["d"]]
+
+
+def test_unknown_dependency_and_duplicates():
+    with pytest.raises(ValueError, match="depends on unknown task name 'zzz'"):
+        TaskGraph(["a"], [["zzz"]])
+    with pytest.raises(ValueError, match="Duplicate task 'name'"):
+        TaskGraph(["a", "a"], [[], []])
+
+
+def test_cycle_report_names_the_loop():
+    # x feeds a cycle b -> c -> d -> b; e hangs off the cycle
+    g = TaskGraph(
+        ["x", "b", "c", "d", "e"],
+        [[], ["x", "d"], ["b"], ["c"], ["d"]],
+    )
+    with pytest.raises(CycleError) as exc:
+        g.layers()
+    cycle = exc.value.cycle
+    assert cycle[0] == cycle[-1]
+    assert set(cycle) == {"b", "c", "d"}
+    # every hop is a real dependency edge
+    for dep, dependent in zip(cycle, cycle[1:]):
+        assert g.index[dep] in g.predecessors(g.index[dependent])
+
+
+def test_runner_reports_cycle():
+    pipeline = """
+    tasks:
+      - name: a
+        task: return_value
+        depends_on: [b]
+      - name: b
+        task: return_value
+        depends_on: [a]
+    """
+    runner = PipelineRunner(yaml.safe_load(pipeline), pipeline_name="cycle")
+    with pytest.raises(RuntimeError, match="Cycle detected in task dependencies: "):
+        runner.run()
+
+
+def test_transitive_reduction_drops_implied_and_duplicate_edges():
+    g = TaskGraph(
+        ["a", "b", "c", "d"],
+        [[], ["a"], ["a", "b", "b"], ["a", "c"]],
+    )
+    reduced, redundant = g.transitive_reduction()
+    assert sorted(redundant) == [("a", "c"), ("a", "d"), ("b", "c")]
+    assert reduced.edge_count == 3
+    assert [reduced.names[p] for p in reduced.predecessors(reduced.index["d"])] == ["c"]
+    assert reduced.layers() == g.layers()
+
+
+def test_dag_show_redundant(tmp_path):
+    from click.testing import CliRunner
+    from novapipe.cli import cli
+
+    pipeline = """
+    tasks:
+      - name: a
+        task: return_value
+      - name: b
+        task: return_value
+        depends_on: [a]
+      - name: c
+        task: return_value
+        depends_on: [a, b]
+    """
+    path = tmp_path / "pipeline.yaml"
+    path.write_text(pipeline)
+
+    result = CliRunner().invoke(cli, ["dag", str(path), "--show-redundant"])
+    assert result.exit_code == 0
+    assert "c: a" in result.output
+
+    result = CliRunner().invoke(cli, ["dag", str(path), "--dot"])
+    assert '"a" -> "c"' not in result.output
+    assert '"b" -> "c"' in result.output
+
+    result = CliRunner().invoke(cli, ["dag", str(path), "--dot", "--full"])
+    assert '"a" -> "c"' in result.output
@@ -0,0 +1,145 @@
+import yaml
+import pytest
+from click.testing import CliRunner
+
+from novapipe.cli import cli
+from novapipe.history import DurationHint, HistoryStore, parse_window, pipeline_key
+from novapipe.runner import PipelineRunner
+from novapipe.tasks import task
+
+DAY = 86400.0
+NOW = 100 * DAY
+
+
+@task
+def history_noop(params):
+    return None
+
+
+def _record(name, duration, status="success", attempts=1):
+    return {"name": name, "status": status, "attempts": attempts, "duration_secs": duration,
+            "error": None, "cpu_user_secs": 0.5, "cpu_system_secs": 0.25}
+
+
+@pytest.fixture
+def store(tmp_path):
+    with HistoryStore(str(tmp_path / "history.sqlite3")) as store:
+        # a month of daily runs: transform takes 1s, then 2s over the last week
+        for day in range(30):
+            started = NOW - (30 - day) * DAY + 60
+            slow = day >= 24
+            store.record_run("etl", started, 5.0, "success", [
+                _record("extract", 0.5),
+                _record("transform", 2.0 if slow else 1.0),
+                _record("load", 0.2, status="failed_ignored" if day % 3 == 0 else "success",
+                        attempts=2 if day % 3 == 0 else 1),
+                {"name": "cut_off", "status": None, "attempts": 1, "duration_secs": None},
+            ])
+        yield store
+
+
+def test_regressions_compare_recent_with_baseline(store):
+    (found,) = store.regressions("etl", window=7 * DAY, baseline=21 * DAY, now=NOW)
+    assert found["task"] == "transform"
+    assert (found["baseline_median"], found["recent_median"]) == (1.0, 2.0)
+    assert found["ratio"] == 2.0
+    assert store.regressions("etl", threshold=2.5, now=NOW) == []
+
+
+def test_failure_rates_and_trend(store):
+    rates = {r["task"]: r for r in store.failure_rates("etl")}
+    assert rates["load"]["runs"] == 30 and rates["load"]["failures"] == 10
+    assert rates["extract"]["rate"] == 0.0
+    assert "cut_off" not in rates
+
+    trend = store.trend("transform", "etl", since=NOW - 3 * DAY)
+    assert [p["p50"] for p in trend] == [2.0, 2.0, 2.0]
+    assert all(p["runs"] == 1 and p["failures"] == 0 for p in trend)
+
+
+def test_duration_hints_and_prune(store):
+    hints = store.duration_hints("etl", runs=5)
+    assert hints["transform"].median == 2.0 and hints["transform"].samples == 5
+    assert "load" in hints and "cut_off" not in hints
+
+    assert store.prune(NOW - 10 * DAY) == 20
+    assert len(store.runs("etl", limit=100)) == 10
+
+
+def test_runner_uses_history_for_priority_and_timeouts():
+    runner = PipelineRunner(yaml.safe_load("""
+    tasks:
+      - name: quick
+        task: history_noop
+      - name: slow
+        task: history_noop
+      - name: explicit
+        task: history_noop
+        timeout: 30
+      - name: unknown
+        task: history_noop
+    """), history={
+        "quick": DurationHint(0.01, 0.02, 10),
+        "slow": DurationHint(4.0, 6.0, 10),
+        "explicit": DurationHint(4.0, 6.0, 10),
+        "unknown": DurationHint(9.0, 9.0, 2),
+    }, history_timeout_factor=3)
+
+    timeouts = {name: t.timeout for name, t in runner.tasks_by_name.items()}
+    assert timeouts == {"quick": 1.0, "slow": 18.0, "explicit": 30, "unknown": None}
+    names = sorted(runner.tasks_by_name, key=runner._expected_duration, reverse=True)
+    assert names == ["unknown", "slow", "explicit", "quick"]
+
+
+def test_cli_records_runs_and_queries_them(tmp_path):
+    pipeline = tmp_path / "nightly.yaml"
+    pipeline.write_text(yaml.safe_dump({"tasks": [{"name": "only", "task": "history_noop"}]}))
+    db = tmp_path / "h.sqlite3"
+    cli_runner = CliRunner()
+    for _ in range(2):
+        result = cli_runner.invoke(cli, ["run", str(pipeline), "--no-cache", "--history-db", str(db)])
+        assert result.exit_code == 0, result.output
+    result = cli_runner.invoke(cli, ["run", str(pipeline), "--no-cache", "--no-history",
+                                     "--history-db", str(db)])
+    assert result.exit_code == 0
+
+    out = cli_runner.invoke(cli, ["history", "--db", str(db), "runs"]).output
+    assert out.count("nightly") == 2
+    out = cli_runner.invoke(cli, ["history", "--db", str(db), "--pipeline", str(pipeline),
+                                  "trend", "only"]).output
+    assert "p95(s)" in out
+    result = cli_runner.invoke(cli, ["history", "--db", str(tmp_path / "missing.db"), "runs"])
+    assert result.exit_code == 1
+
+
+def test_history_is_opt_in_and_keyed_by_file(tmp_path, monkeypatch):
+    db = tmp_path / "h.sqlite3"
+    monkeypatch.setenv("NOVAPIPE_HISTORY_DB", str(db))
+    cli_runner = CliRunner()
+    pipelines = []
+    for sub in ("team_a", "team_b"):
+        (tmp_path / sub).mkdir()
+        pipeline = tmp_path / sub / "pipeline.yaml"
+        pipeline.write_text(yaml.safe_dump({"tasks": [{"name": "only", "task": "history_noop"}]}))
+        pipelines.append(pipeline)
+
+    result = cli_runner.invoke(cli, ["run", str(pipelines[0]), "--no-cache"])
+    assert result.exit_code == 0
+    assert not db.exists()
+
+    for pipeline in pipelines:
+        result = cli_runner.invoke(cli, ["run", str(pipeline), "--no-cache", "--history"])
+        assert result.exit_code == 0, result.output
+    with HistoryStore(str(db)) as store:
+        assert sorted(r["pipeline"] for r in store.runs()) == sorted(
+            str(p.resolve()) for p in pipelines)
+        assert len(store.runs(pipeline_key(str(pipelines[0])))) == 1
+
+
+def test_parse_window():
+    assert parse_window("90") == 90
+    assert parse_window("30m") == 1800
+    assert parse_window("1.5h") == 5400
+    assert parse_window("2w") == 14 * DAY
+    with pytest.raises(ValueError):
+        parse_window("soon")
@@ -0,0 +1,101 @@
+import json
+
+import yaml
+from click.testing import CliRunner
+
+from novapipe.cli import cli
+from novapipe.journal import EventJournal, iter_events, replay
+from novapipe.runner import PipelineRunner
+from novapipe.tasks import task
+
+_calls = {"n": 0}
+
+
+@task
+def fails_once(params):
+    _calls["n"] += 1
+    if _calls["n"] == 1:
+        raise RuntimeError("first try")
+    return "ok"
+
+
+@task
+def journal_boom(params):
+    raise RuntimeError("boom")
+
+
+@task
+def journal_noop(params):
+    return None
+
+
+def test_events_follow_the_run(tmp_path):
+    _calls["n"] = 0
+    path = tmp_path / "run.ndjson"
+    journal = EventJournal(str(path))
+    runner = PipelineRunner(yaml.safe_load("""
+    tasks:
+      - name: flaky
+        task: fails_once
+        retries: 1
+      - name: gated
+        task: journal_noop
+        run_if: "false"
+    """), pipeline_name="jrn", journal=journal)
+    summary = runner.run()
+    journal.close()
+
+    events = list(iter_events(str(path)))
+    assert events[0]["event"] == "run_start" and events[0]["pipeline"] == "jrn"
+    assert events[-1]["event"] == "run_end" and events[-1]["status"] == "success"
+    flaky = [(e["event"], e.get("outcome")) for e in events if e.get("task") == "flaky"]
+    assert flaky == [("task_start", None), ("attempt", "error"),
+                     ("attempt", "success"), ("task_finish", None)]
+    retry = next(e for e in events if e.get("outcome") == "error")
+    assert retry["retrying"] is True and "first try" in retry["error"]
+    assert [e["event"] for e in events if e.get("task") == "gated"] == ["task_skip"]
+
+    records, ended = replay(events)
+    assert ended
+    rebuilt = {t["name"]: t for t in records}
+    assert rebuilt == {t["name"]: t for t in summary.to_list()}
+
+
+def test_failed_run_still_leaves_summary_and_journal(tmp_path):
+    (tmp_path / "p.yaml").write_text(yaml.safe_dump({"tasks": [
+        {"name": "first", "task": "journal_noop"},
+        {"name": "second", "task": "journal_boom", "depends_on": ["first"]},
+    ]}))
+    result = CliRunner().invoke(cli, [
+        "run", str(tmp_path / "p.yaml"), "--no-cache",
+        "--summary-json", str(tmp_path / "s.json"), "--journal", str(tmp_path / "j.ndjson"),
+    ])
+    assert result.exit_code == 1
+
+    tasks = {t["name"]: t for t in json.loads((tmp_path / "s.json").read_text())["tasks"]}
+    assert tasks["first"]["status"] == "success"
+    assert tasks["second"]["status"] == "failed_abort"
+
+    events = list(iter_events(str(tmp_path / "j.ndjson")))
+    assert events[-1]["event"] == "run_end" and events[-1]["status"] == "failed"
+
+
+def test_report_reads_an_unfinished_journal(tmp_path):
+    path = tmp_path / "live.ndjson"
+    lines = [
+        {"ts": 1.0, "event": "run_start", "pipeline": "p", "tasks": 2},
+        {"ts": 1.0, "event": "task_start", "task": "done"},
+        {"ts": 2.0, "event": "task_finish", "task": "done", "record": {
+            "name": "done", "status": "success", "attempts": 1, "duration_secs": 1.0, "error": None}},
+        {"ts": 2.0, "event": "task_start", "task": "busy"},
+        {"ts": 3.0, "event": "attempt", "task": "busy", "attempt": 1, "outcome": "error",
+         "error": "RuntimeError('x')", "retrying": True},
+    ]
+    # the last line is still being written
+    path.write_text("".join(json.dumps(e) + "\n" for e in lines) + '{"ts": 4.0, "ev')
+
+    result = CliRunner().invoke(cli, ["report", str(path)])
+    assert result.exit_code == 0
+    assert "1 task(s) running" in result.output
+    assert "busy" in result.output and "running" in result.output
+    assert "done" in result.output and "success" in result.output
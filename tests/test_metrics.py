@@ -0,0 +1,101 @@
+import os
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+import yaml
+from prometheus_client import REGISTRY
+
+from novapipe import metrics
+from novapipe.metrics import TaskInstruments
+from novapipe.runner import PipelineRunner
+from novapipe.tasks import task
+
+# Microseconds per recorded outcome (counter + histogram); generous for slow CI
+BUDGET_US = float(os.environ.get("NOVAPIPE_METRICS_BUDGET_US", "10"))
+
+
+@task
+def metered(params):
+    return None
+
+
+def _count(pipeline, task_label, status):
+    return REGISTRY.get_sample_value(
+        "novapipe_task_status_total",
+        {"pipeline": pipeline, "task": task_label, "status": status},
+    ) or 0.0
+
+
+def test_run_if_skip_is_labelled_with_the_pipeline():
+    runner = PipelineRunner(yaml.safe_load("""
+    tasks:
+      - name: skipped_task
+        task: metered
+        run_if: "{{ false }}"
+    """), pipeline_name="metrics_skip")
+    runner.run()
+    assert _count("metrics_skip", "skipped_task", "skipped") == 1
+
+
+def test_aggregate_by_function():
+    data = {
+        "metrics": {"task_label": "function"},
+        "tasks": [{"name": f"shard_{i}", "task": "metered"} for i in range(20)],
+    }
+    PipelineRunner(data, pipeline_name="metrics_fn").run()
+    assert _count("metrics_fn", "metered", "success") == 20
+    assert _count("metrics_fn", "shard_0", "success") == 0
+
+
+def test_duration_buckets():
+    # Bucket bounds are fixed once the histogram exists, so check in a fresh interpreter
+    script = textwrap.dedent("""
+        from prometheus_client import REGISTRY
+        from novapipe.runner import PipelineRunner
+        from novapipe.tasks import task
+
+        @task
+        def metered(params):
+            return None
+
+        data = {
+            "metrics": {"duration_buckets": [0.5, 0.1]},
+            "tasks": [{"name": "one", "task": "metered"}],
+        }
+        PipelineRunner(data, pipeline_name="metrics_buckets").run()
+        labels = {"pipeline": "metrics_buckets", "task": "one", "status": "success"}
+        print(REGISTRY.get_sample_value(
+            "novapipe_task_duration_seconds_bucket", dict(labels, le="0.1")))
+        print(REGISTRY.get_sample_value(
+            "novapipe_task_duration_seconds_bucket", dict(labels, le="0.005")))
+    """)
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    assert out.stdout.split() == ["1.0", "None"]
+
+
+def test_buckets_fixed_after_first_use(caplog):
+    metrics.task_duration()
+    with caplog.at_level("WARNING", logger="novapipe"):
+        metrics.set_duration_buckets([123.0])
+    assert "ignoring" in caplog.text
+    assert metrics.TASK_DURATION is metrics.task_duration()
+
+
+def test_invalid_buckets_rejected():
+    with pytest.raises(ValueError):
+        PipelineRunner({"metrics": {"duration_buckets": [1, -1]},
+                        "tasks": [{"name": "x", "task": "metered"}]})
+
+
+def test_instrumentation_overhead():
+    instruments = TaskInstruments("metrics_bench", "bench")
+    instruments.record("success", 0.01)
+    n = 50_000
+    start = time.perf_counter()
+    for _ in range(n):
+        instruments.record("success", 0.01)
+    per_call_us = (time.perf_counter() - start) / n * 1e6
+    assert per_call_us < BUDGET_US, f"{per_call_us:.2f} µs per recorded outcome"
@@ -0,0 +1,107 @@
+import json
+import threading
+import time
+import urllib.request
+
+import yaml
+from click.testing import CliRunner
+
+from novapipe.cli import cli
+from novapipe.metrics import MetricsExporter
+from novapipe.runner import PipelineRunner
+from novapipe.tasks import task
+
+_release = threading.Event()
+
+
+@task
+def wait_for_release(params):
+    _release.wait(5)
+
+
+@task
+def exporter_noop(params):
+    return None
+
+
+def _scrape(exporter, accept=None):
+    req = urllib.request.Request(f"http://127.0.0.1:{exporter.port}/metrics")
+    if accept:
+        req.add_header("Accept", accept)
+    with urllib.request.urlopen(req, timeout=5) as resp:
+        return resp.headers["Content-Type"], resp.read().decode()
+
+
+def _sample(text, line_prefix):
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_live_gauges_and_final_scrape():
+    exporter = MetricsExporter(port=0, addr="127.0.0.1", linger=5)
+    exporter.start()
+    try:
+        runner = PipelineRunner(yaml.safe_load("""
+        tasks:
+          - name: slow
+            task: wait_for_release
+        """), pipeline_name="exporter_live")
+        _release.clear()
+        thread = threading.Thread(target=runner.run)
+        thread.start()
+
+        deadline = time.monotonic() + 5
+        running = None
+        while running != 1.0 and time.monotonic() < deadline:
+            _, text = _scrape(exporter)
+            running = _sample(text, 'novapipe_tasks_running{pipeline="exporter_live"}')
+        assert running == 1.0
+
+        _release.set()
+        thread.join()
+        # a scrape after the run lets finish() return straight away
+        threading.Timer(0.1, _scrape, args=(exporter,)).start()
+        start = time.monotonic()
+        assert exporter.finish() is True
+        assert time.monotonic() - start < 4
+        _, text = _scrape(exporter)
+        assert _sample(text, 'novapipe_tasks_running{pipeline="exporter_live"}') == 0.0
+    finally:
+        exporter.close()
+
+
+def test_openmetrics_negotiation_and_404():
+    exporter = MetricsExporter(port=0, addr="127.0.0.1")
+    exporter.start()
+    try:
+        content_type, text = _scrape(exporter, accept="application/openmetrics-text")
+        assert content_type.startswith("application/openmetrics-text")
+        assert text.rstrip().endswith("# EOF")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{exporter.port}/other", timeout=5)
+        except urllib.error.HTTPError as e:
+            assert e.code == 404
+        else:
+            raise AssertionError("expected a 404")
+        assert exporter.finish() is True  # linger=0: no waiting
+    finally:
+        exporter.close()
+
+
+def test_cli_textfile_and_summary(tmp_path):
+    pipeline = tmp_path / "textfile_demo.yaml"
+    pipeline.write_text("tasks:\n  - name: one\n    task: exporter_noop\n")
+    prom = tmp_path / "novapipe.prom"
+    summary = tmp_path / "summary.json"
+    start = time.monotonic()
+    result = CliRunner().invoke(cli, [
+        "run", str(pipeline), "--metrics-textfile", str(prom), "--summary-json", str(summary),
+    ])
+    assert result.exit_code == 0, result.output
+    assert time.monotonic() - start < 5
+    text = prom.read_text()
+    assert 'novapipe_pipeline_status_total{pipeline="textfile_demo",status="success"}' in text
+    assert json.loads(summary.read_text())["tasks"][0]["name"] == "one"
+    assert not list(tmp_path.glob(".novapipe-*"))
@@ -0,0 +1,64 @@
+import os
+
+from prometheus_client import Counter, Histogram
+
+from novapipe import metrics
+from novapipe.runner import PipelineRunner
+from novapipe.tasks import task
+
+ROWS = Counter("novapipe_test_worker_rows", "Rows processed in workers", ["table"])
+ROW_SIZE = Histogram("novapipe_test_worker_row_bytes", "Row sizes", buckets=[10, 100, 1000])
+
+
+@task(kind="cpu")
+def count_rows_in_worker(params):
+    ROWS.labels(table=params["table"]).inc(params["rows"])
+    ROW_SIZE.observe(50)
+    return os.getpid()
+
+
+def _value(name, labels=None):
+    return metrics.PUBLISHED.get_sample_value(name, labels) or 0.0
+
+
+def test_worker_metrics_reach_the_coordinator():
+    before_rows = _value("novapipe_test_worker_rows_total", {"table": "orders"})
+    before_hist = _value("novapipe_test_worker_row_bytes_bucket", {"le": "100.0"})
+    data = {"tasks": [
+        {"name": f"part{i}", "task": "count_rows_in_worker", "params": {"table": "orders", "rows": 10}}
+        for i in range(6)
+    ]}
+    runner = PipelineRunner(data)
+    summary = runner.run()
+    assert all(t.status == "success" for t in summary.tasks.values())
+    assert os.getpid() not in {runner.context[f"part{i}"] for i in range(6)}
+    assert _value("novapipe_test_worker_rows_total", {"table": "orders"}) - before_rows == 60
+    assert _value("novapipe_test_worker_row_bytes_bucket", {"le": "100.0"}) - before_hist == 6
+
+
+def test_deltas_are_reported_once():
+    metrics.init_worker_metrics()
+    ROWS.labels(table="deltas").inc(3)
+    ROW_SIZE.observe(500)
+    deltas = metrics.take_worker_deltas()
+    rows = "novapipe_test_worker_rows"
+    assert deltas[(rows, rows + "_total", (("table", "deltas"),))] == 3
+    row_bytes = "novapipe_test_worker_row_bytes"
+    assert deltas[(row_bytes, row_bytes + "_bucket", (("le", "1000.0"),))] == 1
+    assert deltas[(row_bytes, row_bytes + "_sum", ())] == 500
+    assert (row_bytes, row_bytes + "_bucket", (("le", "100.0"),)) not in deltas
+    assert metrics.take_worker_deltas() == {}
+
+    # applying them here (as the coordinator would) adds to the published series
+    metrics.apply_metric_deltas(deltas)
+    assert _value("novapipe_test_worker_rows_total", {"table": "deltas"}) == 6
+    assert _value("novapipe_test_worker_row_bytes_bucket", {"le": "1000.0"}) >= 2
+
+
+def test_worker_only_children_are_published():
+    metrics.apply_metric_deltas({
+        ("novapipe_test_worker_rows", "novapipe_test_worker_rows_total", (("table", "only_in_worker"),)): 4,
+        ("novapipe_test_undefined", "novapipe_test_undefined_total", ()): 1,
+    })
+    assert _value("novapipe_test_worker_rows_total", {"table": "only_in_worker"}) == 4
+    assert metrics.PUBLISHED.get_sample_value("novapipe_test_undefined_total") is None
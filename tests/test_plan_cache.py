@@ -0,0 +1,92 @@
+from click.testing import CliRunner
+
+from novapipe.cli import cli
+from novapipe import plan as plan_module
+from novapipe.plan import CompiledPlan, load_plan, plan_cache_path
+from novapipe.runner import PipelineRunner
+
+PIPELINE = """
+tasks:
+  - name: produce
+    task: return_value
+    params:
+      value: "{{ base }}-x"
+  - name: consume
+    task: wrap_text
+    depends_on: [produce]
+    params:
+      input: "{{ produce }}"
+"""
+
+
+def test_load_plan_writes_and_reuses_cache(tmp_path):
+    path = tmp_path / "pipeline.yaml"
+    path.write_text(PIPELINE)
+    cache = plan_cache_path(path.read_bytes())
+    assert not cache.exists()
+
+    first = load_plan(str(path))
+    assert cache.exists()
+    assert set(first.template_code) == {"{{ base }}-x", "{{ produce }}"}
+
+    second = load_plan(str(path))
+    assert isinstance(second, CompiledPlan)
+    assert second.graph.names == ["produce", "consume"]
+
+    runner = PipelineRunner(second, pipeline_name="cached")
+    runner.context["base"] = "b"
+    runner.run()
+    assert runner.context["consume"] == "WRAPPED: 'b-x'"
+
+
+def test_cache_key_follows_content(tmp_path):
+    path = tmp_path / "pipeline.yaml"
+    path.write_text(PIPELINE)
+    load_plan(str(path))
+    path.write_text(PIPELINE.replace("-x", "-y"))
+    plan = load_plan(str(path))
+    assert "{{ base }}-y" in plan.template_code
+
+
+def test_no_cache_env_skips_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("NOVAPIPE_NO_CACHE", "1")
+    path = tmp_path / "pipeline.yaml"
+    path.write_text(PIPELINE)
+    load_plan(str(path))
+    assert not plan_cache_path(path.read_bytes()).exists()
+
+
+def test_corrupt_cache_is_rebuilt(tmp_path):
+    path = tmp_path / "pipeline.yaml"
+    path.write_text(PIPELINE)
+    cache = plan_cache_path(path.read_bytes())
+    cache.parent.mkdir(parents=True, exist_ok=True)
+    cache.write_bytes(b"not a pickle")
+    plan = load_plan(str(path))
+    assert plan.graph.names == ["produce", "consume"]
+
+
+def test_compile_command(tmp_path):
+    path = tmp_path / "pipeline.yaml"
+    path.write_text(PIPELINE)
+    result = CliRunner().invoke(cli, ["compile", str(path)])
+    assert result.exit_code == 0
+    assert plan_cache_path(path.read_bytes()).exists()
+
+
+def test_cache_key_follows_model_code(tmp_path, monkeypatch):
+    content = PIPELINE.encode()
+    before = plan_cache_path(content)
+    # e.g. a new TaskModel field without a version bump
+    monkeypatch.setattr(plan_module, "_model_source_digest", "changed")
+    assert plan_cache_path(content) != before
+
+
+def test_cache_key_follows_jinja2_version(monkeypatch):
+    import jinja2
+
+    content = PIPELINE.encode()
+    before = plan_cache_path(content)
+    # marshalled template code is tied to the Jinja2 runtime
+    monkeypatch.setattr(jinja2, "__version__", "0.0-test")
+    assert plan_cache_path(content) != before
@@ -56,13 +56,15 @@ def fake_distributions(monkeypatch):
         _fake_distributions,
         raising=True,
     )
-    # Ensure task_registry is clean before each test
+    # Ensure task_registry is clean before each test (restored afterwards)
+    saved_registry = dict(task_registry)
     task_registry.clear()
     # Also clear any previous pins
     set_plugin_pins({})
     yield
     # cleanup
     task_registry.clear()
+    task_registry.update(saved_registry)
     set_plugin_pins({})
     for m in ("fake_mod_a", "fake_mod_b"):
         sys.modules.pop(m, None)
@@ -0,0 +1,77 @@
+import os
+import sys
+
+import pytest
+from importlib.metadata import EntryPoint
+
+from novapipe import tasks
+from novapipe.tasks import task_registry, load_plugins, plugin_index, plugin_origin, set_plugin_pins
+
+
+class DummyDist:
+    def __init__(self, name, version, entry_points):
+        self.name = name
+        self.version = version
+        self.metadata = {"Name": name}
+        self.entry_points = entry_points
+
+
+@pytest.fixture
+def lazy_plugin(tmp_path, monkeypatch):
+    """
+    A real plugin module on sys.path, exposed through a fake distribution that
+    counts how often distributions() is scanned.
+    """
+    (tmp_path / "lazy_plugin_mod.py").write_text("def shout(params):\n    return 'LOUD'\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    ep = EntryPoint(name="shout", value="lazy_plugin_mod:shout", group="novapipe.plugins")
+    scans = []
+
+    def fake_distributions():
+        scans.append(1)
+        return [DummyDist("novapipe-lazy", "0.3.0", [ep])]
+
+    monkeypatch.setattr("novapipe.tasks.distributions", fake_distributions)
+    saved = dict(task_registry)
+    set_plugin_pins({})
+    yield tmp_path, scans
+    task_registry.clear()
+    task_registry.update(saved)
+    tasks._plugin_sources.pop("shout", None)
+    sys.modules.pop("lazy_plugin_mod", None)
+
+
+def test_index_is_persisted_and_reused(lazy_plugin):
+    _, scans = lazy_plugin
+    assert plugin_index() == [("shout", "novapipe-lazy", "0.3.0", "lazy_plugin_mod:shout")]
+    # A new process would start with an empty memo; the file on disk is enough
+    tasks._plugin_index_memo.clear()
+    assert plugin_index() == [("shout", "novapipe-lazy", "0.3.0", "lazy_plugin_mod:shout")]
+    assert len(scans) == 1
+
+
+def test_index_is_rebuilt_when_site_packages_change(lazy_plugin):
+    plugin_dir, scans = lazy_plugin
+    plugin_index()
+    st = os.stat(plugin_dir)
+    os.utime(plugin_dir, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    plugin_index()
+    assert len(scans) == 2
+
+
+def test_no_cache_env_always_rescans(lazy_plugin, monkeypatch):
+    _, scans = lazy_plugin
+    monkeypatch.setenv("NOVAPIPE_NO_CACHE", "1")
+    plugin_index()
+    plugin_index()
+    assert len(scans) == 2
+
+
+def test_plugin_module_is_imported_on_first_use(lazy_plugin):
+    load_plugins()
+    assert "shout" in task_registry
+    assert "lazy_plugin_mod" not in sys.modules
+    assert plugin_origin("shout") == ("novapipe-lazy", "0.3.0", "lazy_plugin_mod:shout")
+
+    assert task_registry["shout"]({}) == "LOUD"
+    assert "lazy_plugin_mod" in sys.modules
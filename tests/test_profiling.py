@@ -0,0 +1,86 @@
+import pstats
+
+import pytest
+import yaml
+from click.testing import CliRunner
+
+from novapipe.cli import cli
+from novapipe.profiling import TaskProfiler
+from novapipe.runner import PipelineRunner
+from novapipe.tasks import task
+
+
+def _busy_loop(n):
+    total = 0
+    for i in range(n):
+        total += i * i
+    return total
+
+
+@task
+def crunch(params):
+    return _busy_loop(params["n"])
+
+
+@task(kind="cpu")
+def crunch_in_process(params):
+    return _busy_loop(params["n"])
+
+
+@task(trivial=True)
+def not_profiled(params):
+    return None
+
+
+def _function_names(path):
+    return {func for (_, _, func) in pstats.Stats(str(path)).stats}
+
+
+def test_matching_tasks_are_profiled_and_aggregated(tmp_path):
+    profiler = TaskProfiler("shard_*", str(tmp_path), top=5)
+    data = {"tasks": [{"name": f"shard_{i}", "task": "crunch", "params": {"n": 20000}}
+                      for i in range(3)] + [{"name": "other", "task": "not_profiled"}]}
+    PipelineRunner(data, profiler=profiler).run()
+
+    assert sorted(p.name for _, _, p in profiler.records) == [
+        "shard_0.pstats", "shard_1.pstats", "shard_2.pstats"]
+    assert "_busy_loop" in _function_names(tmp_path / "shard_0.pstats")
+
+    report = profiler.write_report()
+    text = report.read_text()
+    assert "=== crunch: 3 execution(s)" in text
+    assert "_busy_loop" in text
+    combined = pstats.Stats(str(tmp_path / "crunch.combined.pstats"))
+    busy = [v for k, v in combined.stats.items() if k[2] == "_busy_loop"][0]
+    assert busy[1] == 3  # calls across all three tasks
+
+
+def test_process_tasks_and_retries_get_their_own_files(tmp_path):
+    profiler = TaskProfiler("crunch_in_process", str(tmp_path))
+    PipelineRunner(yaml.safe_load("""
+    tasks:
+      - name: heavy
+        task: crunch_in_process
+        params: {n: 1000}
+    """), profiler=profiler).run()
+    assert "_busy_loop" in _function_names(tmp_path / "heavy.pstats")
+
+    assert profiler.next_path("heavy", "crunch_in_process").name == "heavy.2.pstats"
+
+
+def test_unknown_profiler_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        TaskProfiler(directory=str(tmp_path), backend="perf")
+
+
+def test_cli_profile_flag(tmp_path):
+    pipeline = tmp_path / "p.yaml"
+    pipeline.write_text("tasks:\n  - name: one\n    task: crunch\n    params: {n: 100}\n")
+    out_dir = tmp_path / "profiles"
+    result = CliRunner().invoke(
+        cli, ["run", str(pipeline), "--profile", "--profile-dir", str(out_dir)]
+    )
+    assert result.exit_code == 0, result.output
+    assert "1 profile(s) written" in result.output
+    assert (out_dir / "one.pstats").exists()
+    assert (out_dir / "hotspots.txt").exists()
@@ -0,0 +1,115 @@
+import time
+
+import pytest
+import yaml
+from prometheus_client import REGISTRY
+
+from novapipe.ratelimit import AdaptiveRateLimiter
+from novapipe.runner import PipelineRunner
+from novapipe.tasks import task, RateLimited
+
+
+def test_aimd_increase_and_decrease():
+    limiter = AdaptiveRateLimiter(rate=10, min_rate=2, max_rate=10.2, increase=1.0, decrease=0.5)
+    limiter.on_success(latency=0.01, started_at=time.monotonic())
+    assert limiter.rate == pytest.approx(10.1)
+    limiter.on_success(latency=0.01, started_at=time.monotonic())
+    limiter.on_success(latency=0.01, started_at=time.monotonic())
+    assert limiter.rate == pytest.approx(10.2)  # capped at max_rate
+
+    before = time.monotonic()
+    limiter.on_overload(started_at=before)
+    assert limiter.rate == pytest.approx(5.1)
+    # A call that was already in flight when we backed off doesn't count again
+    limiter.on_overload(started_at=before)
+    assert limiter.rate == pytest.approx(5.1)
+    limiter.on_overload(started_at=time.monotonic())
+    limiter.on_overload(started_at=time.monotonic())
+    assert limiter.rate == pytest.approx(2)  # floored at min_rate
+
+
+def test_slow_calls_count_as_overload():
+    limiter = AdaptiveRateLimiter(rate=8, latency_target=0.5)
+    limiter.on_success(latency=2.0, started_at=time.monotonic())
+    assert limiter.rate == pytest.approx(4)
+
+
+def test_retry_after_pauses_and_backs_off():
+    calls = []
+
+    @task
+    def throttled_api(params):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise RateLimited("429 Too Many Requests", retry_after=0.3)
+        return "ok"
+
+    pipeline = yaml.safe_load("""
+    tasks:
+      - name: fetch
+        task: throttled_api
+        retries: 1
+        rate_limit: 50
+        rate_limit_key: adaptive-api
+        rate_limit_adaptive:
+          min_rate: 1
+    """)
+    runner = PipelineRunner(pipeline, pipeline_name="adaptive")
+    runner.run()
+
+    assert runner.context["fetch"] == "ok"
+    assert calls[1] - calls[0] >= 0.29
+    limiter = runner._rate_limiters["adaptive-api"]
+    # halved once, then nudged up by the successful retry
+    assert limiter.rate == pytest.approx(25 + 1 / 25)
+    gauge = REGISTRY.get_sample_value(
+        "novapipe_rate_limit_effective_per_second", {"pipeline": "adaptive", "key": "adaptive-api"}
+    )
+    assert gauge == pytest.approx(limiter.rate)
+
+
+class UpstreamBusy(Exception):
+    pass
+
+
+def test_listed_errors_back_off_and_others_do_not():
+    @task
+    def busy_api(params):
+        raise UpstreamBusy() if params["busy"] else ValueError("bad input")
+
+    pipeline = yaml.safe_load("""
+    tasks:
+      - name: busy
+        task: busy_api
+        params: {busy: true}
+        ignore_failure: true
+        rate_limit: 10
+        rate_limit_key: api
+        rate_limit_adaptive:
+          errors: [UpstreamBusy]
+      - name: invalid
+        task: busy_api
+        params: {busy: false}
+        ignore_failure: true
+        depends_on: [busy]
+        rate_limit: 10
+        rate_limit_key: api
+    """)
+    runner = PipelineRunner(pipeline, pipeline_name="adaptive")
+    runner.run()
+    assert runner._rate_limiters["api"].rate == pytest.approx(5)
+
+
+def test_adaptive_shorthand():
+    @task
+    def adaptive_noop(params):
+        return None
+
+    runner = PipelineRunner(yaml.safe_load("""
+    tasks:
+      - name: a
+        task: adaptive_noop
+        rate_limit: 5
+        rate_limit_adaptive: true
+    """))
+    assert isinstance(runner._rate_limiters["a"], AdaptiveRateLimiter)
@@ -0,0 +1,100 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+import yaml
+
+from novapipe.ratelimit import (
+    FileBackend,
+    MemoryBackend,
+    RateLimitServer,
+    RemoteBackend,
+    make_backend,
+)
+from novapipe.runner import PipelineRunner
+from novapipe.tasks import task
+
+
+def _reserve_many(directory, n, out):
+    backend = FileBackend(directory)
+    out.put([backend.reserve("api", 10, 1.0, 1) for _ in range(n)])
+
+
+def test_file_backend_shares_quota_across_processes(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    out = ctx.Queue()
+    procs = [ctx.Process(target=_reserve_many, args=(str(tmp_path), 25, out)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    delays = sorted(d for _ in procs for d in out.get(timeout=30))
+    for p in procs:
+        p.join()
+
+    # 100 slots at 10/s: no two processes got the same slot, so the last one
+    # is ~9.9s out (minus however long the processes took to reserve)
+    assert len(delays) == 100
+    assert delays[0] == 0.0
+    assert 9.0 < delays[-1] <= 9.9 + 1e-6
+
+
+def test_remote_backend_against_local_server():
+    server = RateLimitServer("127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    try:
+        results = []
+
+        def client():
+            backend = RemoteBackend(host, port)
+            results.extend(backend.reserve("api", 10, 1.0, 5) for _ in range(20))
+            backend.close()
+
+        threads = [threading.Thread(target=client) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        delays = sorted(results)
+        # burst of 5 immediately, then the remaining 55 slots paced at 10/s
+        assert delays[:5] == [0.0] * 5 and delays[5] > 0.0
+        assert 5.0 < delays[-1] <= 5.5 + 1e-6
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_runners_share_a_backend():
+    @task
+    def shared_stamp(params):
+        return time.monotonic()
+
+    pipeline = yaml.safe_load("""
+    tasks:
+      - name: call
+        task: shared_stamp
+        rate_limit: 1
+        rate_limit_key: shared-api
+    """)
+    backend = MemoryBackend()
+    runners = [PipelineRunner(pipeline, pipeline_name=f"p{i}", rate_limit_backend=backend)
+               for i in range(2)]
+    threads = [threading.Thread(target=r.run) for r in runners]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stamps = sorted(r.context["call"] for r in runners)
+    assert stamps[1] - stamps[0] >= 0.9
+
+
+def test_make_backend_specs(tmp_path):
+    assert make_backend("local") is None
+    assert make_backend("memory") is make_backend("memory")
+    assert isinstance(make_backend(f"file:{tmp_path}"), FileBackend)
+    remote = make_backend("tcp://127.0.0.1:7070")
+    assert (remote.host, remote.port) == ("127.0.0.1", 7070)
+    with pytest.raises(ValueError):
+        make_backend("tcp://nohost")
@@ -0,0 +1,165 @@
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from novapipe import reporting
+from novapipe.cli import cli
+from novapipe.reporting import aggregate, iter_summary_tasks, percentile
+from novapipe.runner import PipelineRunner
+from novapipe.tasks import task
+
+
+@task
+def report_noop(params):
+    return None
+
+
+def _record(name, task, duration, attempts=1, status="success", tag=None):
+    return {"name": name, "task": task, "resource_tag": tag, "status": status,
+            "attempts": attempts, "duration_secs": duration, "error": None}
+
+
+@pytest.fixture
+def summary_file(tmp_path):
+    tasks = [_record(f"fetch_{i}", "fetch", (i + 1) / 100, attempts=1 + i % 3) for i in range(100)]
+    tasks += [_record(f"load_{i}", "load", 2.0, tag="db") for i in range(3)]
+    tasks += [_record("gated", "load", 0.0, attempts=0, status="skipped", tag="db")]
+    path = tmp_path / "summary.json"
+    path.write_text(json.dumps({"version": 1, "tasks": tasks, "meta": {"tasks": [1]}}, indent=2))
+    return path, tasks
+
+
+def test_streaming_parse_matches_json_load(summary_file, monkeypatch):
+    path, tasks = summary_file
+    # tiny chunks: values and numbers are split across reads
+    monkeypatch.setattr(reporting, "_CHUNK", 7)
+    assert list(iter_summary_tasks(str(path))) == tasks
+
+
+def test_streaming_parse_rejects_garbage(tmp_path):
+    path = tmp_path / "bad.json"
+    path.write_text('{"tasks": [{"name": "a"} {"name": "b"}]}')
+    with pytest.raises(ValueError):
+        list(iter_summary_tasks(str(path)))
+
+
+def test_group_percentiles(summary_file):
+    _, tasks = summary_file
+    groups = {g.key: g for g in aggregate(tasks, "task")}
+    fetch = groups["fetch"].stats()
+    assert fetch["duration_p50"] == 0.5
+    assert fetch["duration_p95"] == 0.95
+    assert fetch["duration_p99"] == 0.99
+    assert fetch["duration_max"] == 1.0
+    assert fetch["attempts_max"] == 3
+    # skipped tasks are counted but not part of the percentiles
+    assert (groups["load"].count, groups["load"].skipped) == (4, 1)
+    assert groups["load"].stats()["duration_p50"] == 2.0
+    assert percentile([1, 2, 3, 4], 50) == 2
+
+
+def test_report_group_by_top_and_sort(summary_file):
+    path, _ = summary_file
+    out = CliRunner().invoke(cli, ["report", str(path), "--group-by", "resource_tag"]).output
+    assert "db" in out and "-" in out and "p95(s)" in out
+
+    out = CliRunner().invoke(cli, ["report", str(path), "--top", "2"]).output
+    assert out.count("load_") == 2 and "fetch_" not in out
+    assert "(top 2 of 104 tasks)" in out
+
+    out = CliRunner().invoke(cli, ["report", str(path), "--top", "1", "--sort", "attempts"]).output
+    assert "fetch_98" in out  # 3 attempts, the slowest of those
+
+    result = CliRunner().invoke(cli, ["report", str(path), "--sort", "count"])
+    assert result.exit_code != 0
+
+
+def test_report_streams_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr("novapipe.cli._REPORT_CHUNK", 40)
+    tasks = [_record(f"t{i}", "fetch", 0.1) for i in range(100)]
+    path = tmp_path / "summary.json"
+    path.write_text(json.dumps({"tasks": tasks}))
+
+    seen = []
+    real = reporting.iter_summary_tasks
+
+    def watched(p):
+        for t in real(p):
+            seen.append(t["name"])
+            yield t
+
+    printed = []
+    monkeypatch.setattr(reporting, "iter_summary_tasks", watched)
+    monkeypatch.setattr("novapipe.cli._echo_table",
+                        lambda headers, rows: printed.append((len(seen), [r[0] for r in rows])))
+    result = CliRunner().invoke(cli, ["report", str(path)])
+    assert result.exit_code == 0
+    # each block is printed before the rest of the file is read
+    assert [n for n, _ in printed] == [40, 80, 100]
+    assert [name for _, rows in printed for name in rows] == [t["name"] for t in tasks]
+
+
+def test_summary_records_task_function_and_resource_tag():
+    summary = PipelineRunner({"tasks": [
+        {"name": "a", "task": "report_noop", "resource_tag": "db"},
+    ]}).run()
+    (a,) = summary.to_list()
+    assert (a["task"], a["resource_tag"]) == ("report_noop", "db")
+
+
+def _timed(name, ready, started, finished, depends_on=()):
+    return {"name": name, "status": "success", "attempts": 1, "duration_secs": finished - started,
+            "depends_on": list(depends_on), "ready_at": 1000 + ready, "started_at": 1000 + started,
+            "finished_at": 1000 + finished}
+
+
+@pytest.fixture
+def timeline_records():
+    return [
+        _timed("extract", 0.0, 0.0, 1.0),
+        _timed("config", 0.0, 0.0, 0.2),
+        # transform waited 0.1s for a resource; publish for the layer barrier
+        _timed("transform", 1.0, 1.1, 3.1, ["extract"]),
+        _timed("publish", 1.0, 1.0, 1.5, ["config"]),
+        _timed("load", 3.1, 3.1, 3.6, ["publish"]),
+        _timed("notify", 3.1, 3.1, 3.2, ["transform"]),
+        {"name": "cut_off", "status": None, "attempts": 0, "duration_secs": None},
+    ]
+
+
+def test_timeline_critical_path_and_parallelism(timeline_records):
+    timeline = reporting.Timeline(timeline_records)
+    assert timeline.makespan == pytest.approx(3.6)
+    assert timeline.work == pytest.approx(4.3)
+    assert timeline.ideal_makespan == pytest.approx(3.1)
+    assert timeline.theoretical_parallelism > timeline.achieved_parallelism
+    assert timeline.barrier_wait == pytest.approx(2.4)
+    assert timeline.queue_wait == pytest.approx(0.1)
+
+    path = [(s.name, s.blocked_by, s.via) for s in timeline.critical_path]
+    assert path == [("extract", None, None), ("transform", "extract", "dependency"),
+                    ("load", "transform", "layer barrier")]
+    assert timeline.critical_path[1].queue_wait == pytest.approx(0.1)
+
+    speedups = timeline.speedups(top=2)
+    assert [(c["name"], c["layer"]) for c in speedups] == [("transform", 1), ("extract", 0)]
+    assert speedups[0]["saved_if_2x"] == pytest.approx(1.0)
+    assert speedups[0]["saved_if_instant"] == pytest.approx(1.5)
+
+    with pytest.raises(ValueError):
+        reporting.Timeline([_record("old", "x", 1.0)])
+
+
+def test_report_critical_path(tmp_path, timeline_records):
+    path = tmp_path / "summary.json"
+    path.write_text(json.dumps({"tasks": timeline_records}))
+    result = CliRunner().invoke(cli, ["report", str(path), "--critical-path", "--top", "1"])
+    assert result.exit_code == 0, result.output
+    assert "transform (layer barrier)" in result.output
+    assert "Critical path: 3 tasks" in result.output
+    candidates = result.output.split("Speed-up candidates")[1]
+    assert "transform" in candidates and "extract" not in candidates
+
+    result = CliRunner().invoke(cli, ["report", str(path), "--critical-path", "--group-by", "task"])
+    assert result.exit_code == 2
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+
+import pytest
+import yaml
+
+from novapipe.resources import ResourcePools
+from novapipe.runner import PipelineRunner
+from novapipe.tasks import task
+
+
+def test_admission_never_overcommits_and_bin_packs():
+    pools = ResourcePools({"cpu": 8, "memory_gb": 16})
+    jobs = [{"cpu": 6, "memory_gb": 4}, {"cpu": 2, "memory_gb": 2}, {"cpu": 4, "memory_gb": 12},
+            {"cpu": 2, "memory_gb": 10}, {"cpu": 1, "memory_gb": 1}]
+    admitted = []
+
+    async def job(i, req, go):
+        async with pools.hold(req):
+            admitted.append(i)
+            assert all(v >= -1e-9 for v in pools.available.values())
+            await go.wait()
+
+    async def main():
+        go = asyncio.Event()
+        running = [asyncio.ensure_future(job(i, r, go)) for i, r in enumerate(jobs)]
+        await asyncio.sleep(0.01)
+        first_wave = sorted(admitted)
+        go.set()
+        await asyncio.gather(*running)
+        return first_wave
+
+    first_wave = asyncio.run(main())
+    # Largest dominant share first (6 cpu), then the 10 GB job fills the last 2 cpus
+    assert first_wave == [0, 3]
+    assert sorted(admitted) == [0, 1, 2, 3, 4]
+    assert pools.available == pools.capacities
+
+
+def test_requests_are_checked_against_pools():
+    pools = ResourcePools({"db": 2})
+    with pytest.raises(ValueError, match="undefined resource pool 'gpu'"):
+        pools.check({"gpu": 1}, "Task 'x'")
+    with pytest.raises(ValueError, match="only has 2"):
+        pools.check({"db": 3}, "Task 'x'")
+
+
+def _concurrency_probe():
+    state = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def probe(params):
+        with lock:
+            state["now"] += params["weight"]
+            state["peak"] = max(state["peak"], state["now"])
+        time.sleep(0.05)
+        with lock:
+            state["now"] -= params["weight"]
+
+    return state, probe
+
+
+def test_pipeline_pools_limit_weighted_concurrency():
+    state, probe = _concurrency_probe()
+    task(name="weighted_probe")(probe)
+
+    tasks = [{"name": f"t{i}", "task": "weighted_probe", "params": {"weight": w},
+              "resources": {"db_connections": w}}
+             for i, w in enumerate([3, 2, 2, 1, 1, 3])]
+    runner = PipelineRunner({"resources": {"db_connections": 4}, "tasks": tasks})
+    runner.run()
+    assert state["peak"] <= 4
+    assert state["peak"] >= 3
+
+
+def test_resource_tag_limit_is_shared_not_replaced():
+    state, probe = _concurrency_probe()
+    task(name="tagged_probe")(probe)
+
+    # Disagreeing max_concurrency used to replace the semaphore; the smallest wins
+    tasks = [{"name": f"t{i}", "task": "tagged_probe", "params": {"weight": 1},
+              "resource_tag": "http", "max_concurrency": 3 if i % 2 else 2}
+             for i in range(6)]
+    runner = PipelineRunner({"tasks": tasks})
+    runner.run()
+    assert runner._resources.capacities["http"] == 2
+    assert state["peak"] == 2
+
+
+def test_hint_defaults_and_unknown_pool():
+    @task(kind="cpu", memory_estimate=3 * 2**30)
+    def hinted_cpu(params):
+        return None
+
+    runner = PipelineRunner(yaml.safe_load("""
+    resources: {cpu: 4, memory_gb: 8}
+    tasks:
+      - name: crunch
+        task: hinted_cpu
+    """))
+    assert runner._task_requests["crunch"] == {"cpu": 1, "memory_gb": 3}
+
+    with pytest.raises(ValueError, match="undefined resource pool"):
+        PipelineRunner(yaml.safe_load("""
+        tasks:
+          - name: crunch
+            task: hinted_cpu
+            resources: {gpu: 1}
+        """))
@@ -0,0 +1,147 @@
+import json
+import os
+import pickle
+import tracemalloc
+
+import pytest
+from click.testing import CliRunner
+
+from novapipe import usage
+from novapipe.cli import cli
+from novapipe.runner import PipelineRunner
+from novapipe.tasks import task
+from novapipe.usage import ResourceUsage
+
+needs_proc_io = pytest.mark.skipif(
+    not os.path.exists("/proc/thread-self/io"), reason="per-thread I/O counters are Linux-only"
+)
+
+
+def _busy_loop(n):
+    total = 0
+    for i in range(n):
+        total += i * i
+    return total
+
+
+@task
+def burn_and_write(params):
+    with open(params["path"], "wb") as f:
+        f.write(b"x" * params["size"])
+    return _busy_loop(params["n"])
+
+
+@task(kind="cpu")
+def burn_in_process(params):
+    return _busy_loop(params["n"])
+
+
+@task
+def allocate(params):
+    chunks = [bytearray(1 << 20) for _ in range(params["mib"])]
+    return len(chunks)
+
+
+@task
+def read_then_fail(params):
+    with open(params["path"], "rb") as f:
+        f.read()
+    raise RuntimeError("boom")
+
+
+@task(executor="inline")
+def on_the_loop(params):
+    return None
+
+
+def _by_name(summary):
+    return {t["name"]: t for t in summary.to_list()}
+
+
+def test_usage_is_folded_across_attempts():
+    total = ResourceUsage(cpu_user_secs=1.0, max_rss_delta_bytes=100, read_bytes=10)
+    total.add(ResourceUsage(cpu_user_secs=0.5, cpu_system_secs=0.25,
+                            max_rss_delta_bytes=50, read_bytes=5))
+    assert total.to_dict() == {
+        "cpu_user_secs": 1.5, "cpu_system_secs": 0.25, "max_rss_delta_bytes": 100,
+        "alloc_peak_bytes": None, "read_bytes": 15, "write_bytes": None,
+    }
+    assert pickle.loads(pickle.dumps(total)).to_dict() == total.to_dict()
+
+
+@needs_proc_io
+def test_thread_task_cpu_and_io(tmp_path):
+    summary = PipelineRunner({"tasks": [{
+        "name": "work", "task": "burn_and_write",
+        "params": {"path": str(tmp_path / "out.bin"), "size": 300_000, "n": 300_000},
+    }]}).run()
+    work = _by_name(summary)["work"]
+    assert work["cpu_user_secs"] + work["cpu_system_secs"] > 0
+    assert work["write_bytes"] >= 300_000
+    assert work["max_rss_delta_bytes"] >= 0
+
+
+def test_process_task_cpu():
+    summary = PipelineRunner({"tasks": [
+        {"name": "work", "task": "burn_in_process", "params": {"n": 300_000}},
+    ]}).run()
+    work = _by_name(summary)["work"]
+    assert work["cpu_user_secs"] > 0
+    assert work["alloc_peak_bytes"] is None
+
+
+@needs_proc_io
+def test_failed_attempts_are_counted(tmp_path):
+    src = tmp_path / "in.bin"
+    src.write_bytes(b"y" * 50_000)
+    summary = PipelineRunner({"tasks": [{
+        "name": "flaky", "task": "read_then_fail", "params": {"path": str(src)},
+        "retries": 1, "retry_delay": 0, "ignore_failure": True,
+    }]}).run()
+    flaky = _by_name(summary)["flaky"]
+    assert flaky["attempts"] == 2
+    assert flaky["read_bytes"] >= 100_000
+
+
+def test_trace_malloc_records_peak_allocations():
+    data = {"tasks": [{"name": "big", "task": "allocate", "params": {"mib": 8}}]}
+    assert _by_name(PipelineRunner(data).run())["big"]["alloc_peak_bytes"] is None
+
+    big = _by_name(PipelineRunner(data, trace_malloc=True).run())["big"]
+    assert big["alloc_peak_bytes"] >= 8 << 20
+
+
+def test_trace_malloc_without_reset_peak(monkeypatch, caplog):
+    # Python 3.8's tracemalloc has no reset_peak()
+    monkeypatch.delattr(tracemalloc, "reset_peak")
+    data = {"tasks": [{"name": "big", "task": "allocate", "params": {"mib": 1}}]}
+    with caplog.at_level("WARNING", logger="novapipe"):
+        summary = PipelineRunner(data, trace_malloc=True).run()
+    big = _by_name(summary)["big"]
+    assert big["status"] == "success" and big["alloc_peak_bytes"] is None
+    assert "Python 3.9+" in caplog.text
+
+    token = usage.start(trace_malloc=True)
+    assert usage.stop(token).alloc_peak_bytes is None
+
+
+def test_inline_tasks_are_not_measured():
+    summary = PipelineRunner({"tasks": [{"name": "quick", "task": "on_the_loop"}]}).run()
+    quick = _by_name(summary)["quick"]
+    assert quick["cpu_user_secs"] is None and quick["read_bytes"] is None
+
+
+def test_report_shows_usage_columns(tmp_path):
+    summary = {"tasks": [
+        {"name": "a", "status": "success", "attempts": 1, "duration_secs": 1.0, "error": None,
+         "cpu_user_secs": 0.75, "cpu_system_secs": 0.125, "max_rss_delta_bytes": 3 << 20,
+         "alloc_peak_bytes": None, "read_bytes": 2048, "write_bytes": 10},
+        {"name": "b", "status": "success", "attempts": 1, "duration_secs": 0.0, "error": None,
+         "cpu_user_secs": None},
+    ]}
+    p = tmp_path / "sum.json"
+    p.write_text(json.dumps(summary))
+    out = CliRunner().invoke(cli, ["report", str(p)]).output
+    assert "CPU user(s)" in out and "0.75" in out and "0.125" in out
+    assert "3.0MiB" in out and "2.0KiB" in out and "10B" in out
+    assert "Alloc peak" not in out
@@ -0,0 +1,177 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import yaml
+
+from novapipe.environ import task_env, task_environ
+from novapipe.runner import PipelineRunner
+from novapipe.tasks import task
+
+_barrier = threading.Barrier(2, timeout=5)
+
+
+@task
+def read_env_together(params, env):
+    # both tasks are inside their env at the same moment
+    _barrier.wait()
+    return {params["out"]: env.get("REGION")}
+
+
+@task
+def env_in_subprocess(params):
+    return subprocess.run(
+        [sys.executable, "-c", "import os; print(os.environ['REGION'])"],
+        capture_output=True, text=True, check=True,
+    ).stdout.strip()
+
+
+@task
+def env_passed_to_subprocess(params, env):
+    return subprocess.run(
+        [sys.executable, "-c", "import os; print(os.environ['REGION'])"],
+        capture_output=True, text=True, check=True, env=env,
+    ).stdout.strip()
+
+
+@task(kind="cpu")
+def env_in_child_process(params):
+    return subprocess.run(
+        [sys.executable, "-c", "import os; print(os.environ['REGION'])"],
+        capture_output=True, text=True, check=True,
+    ).stdout.strip()
+
+
+def test_concurrent_tasks_see_only_their_own_env():
+    runner = PipelineRunner(yaml.safe_load("""
+    tasks:
+      - name: a
+        task: read_env_together
+        env: {REGION: eu}
+        params: {out: a_region}
+      - name: b
+        task: read_env_together
+        env: {REGION: us}
+        params: {out: b_region}
+    """))
+    runner.run()
+    assert runner.context["a_region"] == "eu"
+    assert runner.context["b_region"] == "us"
+    assert "REGION" not in os.environ
+
+
+def test_async_tasks_and_retries_keep_their_env():
+    seen = []
+
+    @task(executor="inline")
+    async def flaky_env_reader(params):
+        await asyncio.sleep(0.01)
+        seen.append(task_environ().get("REGION"))
+        if len(seen) == 1:
+            raise RuntimeError("once")
+
+    runner = PipelineRunner(yaml.safe_load("""
+    tasks:
+      - name: a
+        task: flaky_env_reader
+        env: {REGION: "{{ region }}"}
+        retries: 1
+    """))
+    runner.context["region"] = "ap"
+    runner.run()
+    assert seen == ["ap", "ap"]
+    assert "REGION" not in os.environ
+
+
+def test_process_workers_get_a_real_environment():
+    runner = PipelineRunner(yaml.safe_load("""
+    tasks:
+      - name: child
+        task: env_in_child_process
+        env: {REGION: sa}
+    """))
+    runner.run()
+    assert runner.context["child"] == "sa"
+
+
+def test_subprocesses_see_the_env():
+    runner = PipelineRunner(yaml.safe_load("""
+    tasks:
+      - name: plain
+        task: env_in_subprocess
+        env: {REGION: eu}
+      - name: passed
+        task: env_passed_to_subprocess
+        env: {REGION: us}
+    """))
+    runner.run()
+    # a plain sync task keeps its placement; the variables are set in os.environ
+    assert runner._placement["plain"] == "thread"
+    assert runner.context["plain"] == "eu"
+    # one taking `env` stays in a thread and hands it on itself
+    assert runner._placement["passed"] == "thread"
+    assert runner.context["passed"] == "us"
+    assert "REGION" not in os.environ
+
+
+def test_task_env_never_touches_os_environ(monkeypatch):
+    monkeypatch.setenv("NOVAPIPE_TEST_BASE", "1")
+    with task_env({"REGION": "eu"}):
+        assert "REGION" not in os.environ
+        assert task_environ()["REGION"] == "eu"
+        assert task_environ()["NOVAPIPE_TEST_BASE"] == "1"
+    assert "REGION" not in task_environ()
+
+
+@task
+def read_os_environ_together(params):
+    seen = os.environ.get("REGION")
+    time.sleep(0.05)
+    # nobody else changed it meanwhile
+    assert os.environ.get("REGION") == seen
+    return seen
+
+
+def test_tasks_reading_os_environ_take_turns():
+    runner = PipelineRunner(yaml.safe_load("""
+    tasks:
+      - name: a
+        task: read_os_environ_together
+        env: {REGION: eu}
+      - name: b
+        task: read_os_environ_together
+        env: {REGION: us}
+    """))
+    started = time.monotonic()
+    runner.run()
+    assert (runner.context["a"], runner.context["b"]) == ("eu", "us")
+    assert time.monotonic() - started >= 0.1
+    assert "REGION" not in os.environ
+
+
+def test_unpicklable_and_async_tasks_still_see_os_environ():
+    seen = {}
+
+    @task
+    def local_reader(params):
+        seen["sync"] = os.environ.get("REGION")
+
+    @task
+    async def async_reader(params):
+        await asyncio.sleep(0)
+        seen["async"] = os.environ.get("REGION")
+
+    PipelineRunner(yaml.safe_load("""
+    tasks:
+      - name: sync
+        task: local_reader
+        env: {REGION: eu}
+      - name: async
+        task: async_reader
+        env: {REGION: us}
+    """)).run()
+    assert seen == {"sync": "eu", "async": "us"}
+    assert "REGION" not in os.environ
@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+import pytest
+import yaml
+from click.testing import CliRunner
+
+from novapipe.cli import cli
+from novapipe.models import TaskModel
+from novapipe.runner import PipelineRunner
+from novapipe.tasks import task
+
+
+def test_hedge_after_validation():
+    assert TaskModel(name="a", task="t", hedge_after="p95").hedge_after == "p95"
+    assert TaskModel(name="a", task="t", hedge_after=1.5).hedge_after == 1.5
+    for bad in ("95", "p100", "fast", -1):
+        with pytest.raises(ValueError):
+            TaskModel(name="a", task="t", hedge_after=bad)
+
+
+def test_hedge_after_rejected_for_thread_unsafe_tasks():
+    @task(thread_safe=False)
+    def not_reentrant(params):
+        return None
+
+    with pytest.raises(ValueError, match="thread_safe=False"):
+        PipelineRunner({"tasks": [{"name": "t", "task": "not_reentrant", "hedge_after": 1.0}]})
+
+
+def test_hedge_wins_over_straggler():
+    calls = []
+
+    @task(executor="inline")
+    async def straggles_once(params):
+        calls.append(len(calls))
+        # the first attempt hangs; the hedge returns at once
+        await asyncio.sleep(5 if len(calls) == 1 else 0)
+        return {"attempt": len(calls)}
+
+    runner = PipelineRunner(yaml.safe_load("""
+    tasks:
+      - name: fetch
+        task: straggles_once
+        hedge_after: 0.05
+    """))
+    summary = runner.run()
+    fetch = summary.tasks["fetch"]
+    assert fetch.status == "success"
+    assert (fetch.hedges, fetch.hedge_wins) == (1, 1)
+    assert fetch.duration_secs < 1
+    assert runner.context["attempt"] == 2
+
+
+def test_fast_task_is_not_hedged():
+    @task
+    async def quick(params):
+        return None
+
+    runner = PipelineRunner(yaml.safe_load("""
+    tasks:
+      - name: q
+        task: quick
+        hedge_after: 1
+    """))
+    assert runner.run().tasks["q"].hedges == 0
+
+
+def test_percentile_needs_siblings():
+    durations = iter([0.0] * 5 + [5.0, 0.0])
+
+    @task(executor="inline")
+    async def fetch_part(params):
+        await asyncio.sleep(next(durations))
+
+    data = {"tasks": [{"name": f"part{i}", "task": "fetch_part", "hedge_after": "p50",
+                       "depends_on": [f"part{i - 1}"] if i else []} for i in range(6)]}
+    summary = PipelineRunner(data).run()
+    # five quick siblings finished before part5, so its 5s attempt was hedged
+    assert [summary.tasks[f"part{i}"].hedges for i in range(6)] == [0] * 5 + [1]
+    assert summary.tasks["part5"].duration_secs < 1
+
+
+def test_both_attempts_failing_fails_the_task(tmp_path):
+    @task
+    async def slow_failure(params):
+        await asyncio.sleep(0.1)
+        raise RuntimeError("boom")
+
+    runner = PipelineRunner(yaml.safe_load("""
+    tasks:
+      - name: s
+        task: slow_failure
+        hedge_after: 0.01
+        ignore_failure: true
+    """))
+    summary = runner.run()
+    assert summary.tasks["s"].status == "failed_ignored"
+    assert summary.tasks["s"].hedges == 1
+
+    path = tmp_path / "summary.json"
+    path.write_text(json.dumps({"tasks": summary.to_list()}))
+    out = CliRunner().invoke(cli, ["report", str(path)]).output
+    assert "Hedged attempts: 1 (0 finished first)" in out
@@ -0,0 +1,73 @@
+import threading
+import time
+import yaml
+
+from novapipe.runner import PipelineRunner
+from novapipe.tasks import task
+
+
+def test_trivial_task_runs_on_loop_thread():
+    @task(trivial=True)
+    def trivial_ident(params):
+        return threading.get_ident()
+
+    pipeline = """
+    tasks:
+      - name: quick
+        task: trivial_ident
+    """
+    runner = PipelineRunner(yaml.safe_load(pipeline), pipeline_name="inline")
+    runner.run()
+    assert runner._placement["quick"] == "inline"
+    assert runner.context["quick"] == threading.get_ident()
+
+
+def test_trivial_task_with_limits_uses_thread_pool():
+    @task(trivial=True)
+    def limited_ident(params):
+        return threading.get_ident()
+
+    pipeline = """
+    tasks:
+      - name: timed
+        task: limited_ident
+        timeout: 5
+    """
+    runner = PipelineRunner(yaml.safe_load(pipeline), pipeline_name="inline")
+    runner.run()
+    assert runner._placement["timed"] == "thread"
+    assert runner.context["timed"] != threading.get_ident()
+
+
+def test_measured_trivial_task_is_promoted_inline():
+    @task
+    def measured_ident(params):
+        return threading.get_ident()
+
+    # A chain, so each run is observed before the next one is dispatched
+    tasks = [{"name": "t0", "task": "measured_ident"}]
+    for i in range(1, 10):
+        tasks.append({"name": f"t{i}", "task": "measured_ident", "depends_on": [f"t{i - 1}"]})
+    runner = PipelineRunner({"tasks": tasks}, pipeline_name="inline")
+    runner.run()
+
+    assert runner._placement["t9"] == "thread"
+    assert runner.context["t0"] != threading.get_ident()
+    assert "measured_ident" in runner._promoted
+    assert runner.context["t9"] == threading.get_ident()
+
+
+def test_slow_task_is_not_promoted():
+    @task
+    def measured_sleep(params):
+        time.sleep(0.002)
+        return threading.get_ident()
+
+    tasks = [{"name": "s0", "task": "measured_sleep"}]
+    for i in range(1, 8):
+        tasks.append({"name": f"s{i}", "task": "measured_sleep", "depends_on": [f"s{i - 1}"]})
+    runner = PipelineRunner({"tasks": tasks}, pipeline_name="inline")
+    runner.run()
+
+    assert "measured_sleep" in runner._not_trivial
+    assert runner.context["s7"] != threading.get_ident()
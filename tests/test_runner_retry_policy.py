@@ -0,0 +1,130 @@
+import random
+import time
+
+import pytest
+import yaml
+
+from novapipe.retry import CircuitBreaker, CircuitOpenError, backoff_delay
+from novapipe.runner import PipelineRunner
+from novapipe.tasks import task
+
+
+def test_backoff_grows_caps_and_jitters():
+    assert [backoff_delay(n, 0.5, 2.0, jitter="none") for n in (1, 2, 3)] == [0.5, 1.0, 2.0]
+    assert backoff_delay(10, 0.5, 2.0, max_delay=5.0, jitter="none") == 5.0
+    rng = random.Random(7)
+    samples = [backoff_delay(3, 0.5, 2.0, jitter="full", rng=rng) for _ in range(200)]
+    assert all(0.0 <= d <= 2.0 for d in samples)
+    assert len(set(samples)) > 100
+
+
+def test_circuit_breaker_opens_and_half_opens(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("novapipe.retry.time.monotonic", lambda: clock[0])
+    breaker = CircuitBreaker("db", failure_threshold=2, reset_after=10)
+    breaker.before_call()
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock[0] += 10
+    breaker.before_call()  # the trial call
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only one trial at a time
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_retry_filters():
+    attempts = {"give_up": 0, "retry_on": 0}
+
+    @task
+    def filtered_failure(params):
+        attempts[params["which"]] += 1
+        raise KeyError("permanent") if params["which"] == "give_up" else ValueError("flaky")
+
+    runner = PipelineRunner(yaml.safe_load("""
+    tasks:
+      - name: a
+        task: filtered_failure
+        params: {which: give_up}
+        retries: 3
+        give_up_on: [LookupError]
+        ignore_failure: true
+      - name: b
+        task: filtered_failure
+        params: {which: retry_on}
+        retries: 3
+        retry_on: [ConnectionError]
+        ignore_failure: true
+    """))
+    runner.run()
+    # KeyError is a LookupError; ValueError isn't a ConnectionError: no retries either way
+    assert attempts == {"give_up": 1, "retry_on": 1}
+
+
+def test_pipeline_retry_budget():
+    calls = []
+
+    @task
+    def always_fails(params):
+        calls.append(params["i"])
+        raise RuntimeError("down")
+
+    data = {
+        "retry_budget": 3,
+        "tasks": [{"name": f"t{i}", "task": "always_fails", "params": {"i": i},
+                   "retries": 5, "ignore_failure": True} for i in range(4)],
+    }
+    runner = PipelineRunner(data)
+    runner.run()
+    # 4 first attempts + 3 retries in total, not 4 x 6
+    assert len(calls) == 7
+
+
+def test_circuit_breaker_fails_fast_across_tasks():
+    calls = []
+
+    @task
+    def flaky_dependency(params):
+        calls.append(params["i"])
+        raise ConnectionError("refused")
+
+    tasks = [{"name": f"t{i}", "task": "flaky_dependency", "params": {"i": i},
+              "ignore_failure": True, "circuit_breaker": {"failure_threshold": 2, "reset_after": 60}}
+             for i in range(5)]
+    for i in range(1, 5):
+        tasks[i]["depends_on"] = [f"t{i - 1}"]
+    runner = PipelineRunner({"tasks": tasks})
+    runner.run()
+
+    assert calls == [0, 1]
+    errors = [runner._summary.tasks[f"t{i}"].error for i in range(5)]
+    assert all("Circuit breaker 'flaky_dependency' is open" in e for e in errors[2:])
+
+
+def test_backoff_between_retries():
+    stamps = []
+
+    @task
+    def backoff_probe(params):
+        stamps.append(time.monotonic())
+        if len(stamps) < 3:
+            raise RuntimeError("again")
+        return "ok"
+
+    runner = PipelineRunner(yaml.safe_load("""
+    tasks:
+      - name: probe
+        task: backoff_probe
+        retries: 2
+        retry_delay: 0.1
+        retry_backoff: {multiplier: 3, jitter: none}
+    """))
+    runner.run()
+    assert runner.context["probe"] == "ok"
+    assert stamps[1] - stamps[0] >= 0.1
+    assert stamps[2] - stamps[1] >= 0.3
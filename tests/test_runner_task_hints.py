@@ -0,0 +1,107 @@
+import os
+import time
+import asyncio
+import threading
+import yaml
+import pytest
+
+from novapipe.runner import PipelineRunner
+from novapipe.tasks import task
+
+
+@task(kind="cpu")
+def cpu_pid(params):
+    return os.getpid()
+
+
+_active = 0
+_max_active = 0
+_active_lock = threading.Lock()
+
+
+@task(thread_safe=False)
+def not_thread_safe(params):
+    global _active, _max_active
+    with _active_lock:
+        _active += 1
+        _max_active = max(_max_active, _active)
+    time.sleep(0.05)
+    with _active_lock:
+        _active -= 1
+
+
+def test_cpu_task_runs_in_process_pool():
+    pipeline = """
+    tasks:
+      - name: crunch
+        task: cpu_pid
+    """
+    runner = PipelineRunner(yaml.safe_load(pipeline), pipeline_name="hints")
+    runner.run()
+    assert runner.context["crunch"] != os.getpid()
+
+
+def test_unpicklable_cpu_task_falls_back_to_thread():
+    @task(kind="cpu")
+    def local_cpu_pid(params):
+        return os.getpid()
+
+    pipeline = """
+    tasks:
+      - name: crunch
+        task: local_cpu_pid
+    """
+    runner = PipelineRunner(yaml.safe_load(pipeline), pipeline_name="hints")
+    runner.run()
+    assert runner.context["crunch"] == os.getpid()
+
+
+def test_thread_unsafe_task_never_overlaps():
+    pipeline = """
+    tasks:
+      - name: a
+        task: not_thread_safe
+      - name: b
+        task: not_thread_safe
+      - name: c
+        task: not_thread_safe
+    """
+    runner = PipelineRunner(yaml.safe_load(pipeline), pipeline_name="hints")
+    runner.run()
+    assert _max_active == 1
+
+
+def test_longest_expected_duration_starts_first():
+    @task(expected_duration=10.0)
+    def slow_hint(params):
+        pass
+
+    @task(expected_duration=0.1)
+    def fast_hint(params):
+        pass
+
+    pipeline = """
+    tasks:
+      - name: fast
+        task: fast_hint
+      - name: plain
+        task: return_value
+      - name: slow
+        task: slow_hint
+    """
+    runner = PipelineRunner(yaml.safe_load(pipeline), pipeline_name="hints")
+    started = []
+
+    async def record(name):
+        started.append(name)
+
+    runner._run_single_task = record
+    asyncio.run(runner._run_layer(["fast", "plain", "slow"]))
+    assert started == ["slow", "fast", "plain"]
+
+
+def test_invalid_hints_rejected():
+    with pytest.raises(ValueError):
+        task(kind="gpu")
+    with pytest.raises(ValueError):
+        task(executor="cluster")
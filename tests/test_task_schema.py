@@ -0,0 +1,113 @@
+import yaml
+import pytest
+from pydantic import BaseModel, ConfigDict, ValidationError
+from click.testing import CliRunner
+
+from novapipe.cli import cli
+from novapipe.runner import PipelineRunner
+from novapipe.tasks import task, get_task_spec
+
+
+def test_schema_from_dict_coerces_params():
+    @task(schema={"count": int, "label": (str, "none")})
+    def schema_dict_task(params):
+        return params["count"] * 2
+
+    pipeline = """
+    tasks:
+      - name: produce
+        task: return_value
+        params:
+          value: "21"
+      - name: doubled
+        task: schema_dict_task
+        depends_on: [produce]
+        params:
+          count: "{{ produce }}"
+    """
+    runner = PipelineRunner(yaml.safe_load(pipeline), pipeline_name="schema")
+    runner.run()
+    assert runner.context["doubled"] == 42
+
+
+def test_schema_from_annotations_and_model():
+    class AnnotatedParams:
+        path: str
+        mode: str = "r"
+
+    class ModelParams(BaseModel):
+        limit: int
+
+    @task(schema=AnnotatedParams)
+    def annotated_task(params):
+        return params
+
+    @task(schema=ModelParams)
+    def model_task(params):
+        return params
+
+    assert get_task_spec(annotated_task).validate({"path": "/x", "extra": 1}) == {
+        "path": "/x", "mode": "r", "extra": 1,
+    }
+    assert get_task_spec(model_task).validate({"limit": "5"}) == {"limit": 5}
+    # keys the model doesn't declare (and would ignore) still reach the task
+    assert get_task_spec(model_task).validate({"limit": "5", "extra": 1}) == {
+        "limit": 5, "extra": 1,
+    }
+
+
+def test_model_forbidding_extras_rejects_unknown_params():
+    class StrictParams(BaseModel):
+        model_config = ConfigDict(extra="forbid")
+        limit: int
+
+    @task(schema=StrictParams)
+    def strict_task(params):
+        return params
+
+    with pytest.raises(ValidationError):
+        get_task_spec(strict_task).validate({"limit": 1, "extra": 1})
+
+
+def test_static_params_rejected_at_plan_time():
+    @task(schema={"path": str})
+    def needs_path(params):
+        return params["path"]
+
+    pipeline = """
+    tasks:
+      - name: bad
+        task: needs_path
+        params:
+          other: 1
+    """
+    with pytest.raises(ValueError, match="Invalid params for task 'bad'"):
+        PipelineRunner(yaml.safe_load(pipeline), pipeline_name="schema")
+
+
+def test_rendered_params_rejected_before_dispatch():
+    calls = []
+
+    @task(schema={"count": int})
+    def counted(params):
+        calls.append(params)
+
+    pipeline = """
+    tasks:
+      - name: bad
+        task: counted
+        params:
+          count: "{{ not_a_number }}"
+    """
+    runner = PipelineRunner(yaml.safe_load(pipeline), pipeline_name="schema")
+    runner.context["not_a_number"] = "abc"
+    with pytest.raises(RuntimeError, match="Invalid params for task 'bad'"):
+        runner.run()
+    assert calls == []
+
+
+def test_describe_shows_schema():
+    result = CliRunner().invoke(cli, ["describe", "write_text_file"])
+    assert result.exit_code == 0
+    assert "Parameters:" in result.output
+    assert "path: str (required)" in result.output
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+
+import yaml
+from click.testing import CliRunner
+
+from novapipe.cli import cli
+from novapipe.runner import PipelineRunner
+from novapipe.tasks import task
+from novapipe.tracing import Tracer
+
+
+@task(executor="thread")
+def traced_sleep(params):
+    import time
+    time.sleep(params.get("secs", 0.01))
+
+
+@task(kind="cpu")
+def traced_in_process(params):
+    return os.getpid()
+
+
+PIPELINE = """
+tasks:
+  - name: first
+    task: traced_sleep
+    rate_limit: 100
+    params: {secs: 0.02}
+  - name: second
+    task: traced_in_process
+    depends_on: [first]
+"""
+
+
+def test_phase_spans_nest_and_add_up():
+    tracer = Tracer("traced")
+    PipelineRunner(yaml.safe_load(PIPELINE), pipeline_name="traced", tracer=tracer).run()
+    spans = {(s.task, s.name): s for s in tracer.spans}
+    by_id = {s.span_id: s for s in tracer.spans}
+
+    for phase in ("task", "rate_limit", "render", "queue", "attempt", "executor_queue", "body"):
+        assert ("first", phase) in spans, phase
+    assert ("second", "body") in spans
+    assert spans[("second", "body")].attrs["executor"] == "process"
+
+    # body sits inside its attempt, which sits inside the task span
+    body = spans[("first", "body")]
+    attempt = by_id[body.parent_id]
+    assert attempt.name == "attempt" and attempt.attrs["attempt"] == 1
+    task_span = spans[("first", "task")]
+    assert task_span.start_ns <= attempt.start_ns <= body.start_ns
+    assert body.end_ns <= attempt.end_ns <= task_span.end_ns
+    assert (body.end_ns - body.start_ns) / 1e9 >= 0.02
+
+    # the pipeline span encloses everything
+    pipeline = spans[(None, "pipeline")]
+    assert all(pipeline.start_ns <= s.start_ns and s.end_ns <= pipeline.end_ns
+               for s in tracer.spans)
+
+
+def test_failed_attempt_span_records_the_error():
+    @task(executor="inline")
+    async def traced_failure(params):
+        await asyncio.sleep(0)
+        raise ValueError("nope")
+
+    tracer = Tracer()
+    PipelineRunner(yaml.safe_load("""
+    tasks:
+      - name: bad
+        task: traced_failure
+        retries: 1
+        ignore_failure: true
+    """), tracer=tracer).run()
+    attempts = [s for s in tracer.spans if s.name == "attempt"]
+    assert len(attempts) == 2
+    assert all("ValueError" in s.attrs["error"] for s in attempts)
+    assert [s.name for s in tracer.spans].count("retry_wait") == 0  # retry_delay is 0
+
+
+def test_cli_trace_formats(tmp_path):
+    pipeline = tmp_path / "p.yaml"
+    pipeline.write_text(PIPELINE)
+
+    chrome = tmp_path / "trace.json"
+    result = CliRunner().invoke(cli, ["run", str(pipeline), "--trace", str(chrome)])
+    assert result.exit_code == 0, result.output
+    events = json.loads(chrome.read_text())["traceEvents"]
+    complete = [e for e in events if e["ph"] == "X"]
+    names = {e["args"]["name"] for e in events if e["ph"] == "M"}
+    assert {"p", "first", "second"} <= names
+    assert all(e["dur"] >= 0 and e["ts"] >= 0 for e in complete)
+
+    otlp = tmp_path / "trace.otlp.json"
+    result = CliRunner().invoke(
+        cli, ["run", str(pipeline), "--trace", str(otlp), "--trace-format", "otlp"]
+    )
+    assert result.exit_code == 0, result.output
+    spans = json.loads(otlp.read_text())["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    ids = {s["spanId"] for s in spans}
+    assert len({s["traceId"] for s in spans}) == 1
+    assert all(s["parentSpanId"] in ids for s in spans if s["parentSpanId"])
+    assert all(int(s["endTimeUnixNano"]) >= int(s["startTimeUnixNano"]) for s in spans)